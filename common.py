@@ -16,6 +16,7 @@ CoordSystem = Enum('CoordSystem', 'Polar PolarNorm UV')          # used for sky
 SourceExt = Enum('SourceExt', 'JPG TIFF')                        # used for pixel extraction
 ColorModel = Enum('ColorModel', 'RGB HSV HSL LAB')               # used for pixel color components
 PixelWeighting = Enum('PixelWeighting', 'Mean Median Gaussian')  # used during pixel convolution
+ExportDuplicates = Enum('ExportDuplicates', 'Skip Replace Append') # used when exporting samples already exported
 SkyCover = Enum('SkyCover', 'UNK CLR SCT OVC')
 SkyCoverDesc = {SkyCover.UNK: "Unknown", SkyCover.CLR: "Clear", SkyCover.SCT: "Scattered", SkyCover.OVC: "Overcast"}
 HDRRawExts = ['.cr2', '.raw', '.dng']  # types of RAW data
@@ -113,6 +114,7 @@ DefExportOptions = {
     "SpectrumStart": 350,
     "SpectrumEnd": 2500,
     "SpectrumResolution": 1,
+    "Duplicates": ExportDuplicates.Skip.value,
     "Features": [i for i in range(0, len(SampleFeatures))]
 }
 
@@ -136,10 +138,16 @@ DefAppSettings = {
     "ShowUVGrid": False,
     "ShowEXIF": True,
     "ShowStatusBar": True,
+    "ShowTimeline": True,
+    "ShowTimings": False,         # time hot paths of the viewer, and show rolling percentiles in HUD and status bar
+    "TimingsFilename": "res/timings.log",
+    "PixelCacheDirectory": "",    # (optional) local dir to cache decoded photo pixels in, speeds up repeated exports
+    "PixelCacheLimit": 8192,      # (MB) max size of pixel cache, least recently used photos are evicted
+    "EphemerisResolution": 60,    # (seconds) sun positions are computed (as needed) this often per day, and interpolated in between
+    "ExportDecodeThreads": 4,     # max number of exposure photos decoded at once when exporting HDR (bounds memory used)
     "PixelRegion": 1,
     "PixelWeighting": PixelWeighting.Mean.value,
     "AvoidSunAngle": 0,
-    "GraphResolution": 5,
     "GraphLineThickness": 1,
     "HUDTextScale": 60,
 }
@@ -164,6 +172,6 @@ SPASiteData = None        # SPA (sun positioning algorithm) site data
 SamplingPattern = []      # sky sampling pattern coordinates (azimuth, altitude)
 SamplingPatternRads = []  # for convenience
 SamplingPatternAlts = []  # a sorted unique set of just the altitudes
-SkyCoverData = []         # sky cover ranges
+SkyCoverData = []         # sky cover ranges (utility_data.SkyCoverIndex once loaded)
 SpectrumRange = ()        # inclusive range of wavelengths of radiance data
 CaptureEpsilon = 0        # max acceptable time delta between measurements of same capture
@@ -54,6 +54,7 @@ class DialogExport(QDialog):
         self.txtRangeStart.setText(str(self.exportOptions["SpectrumStart"]))
         self.txtRangeEnd.setText(str(self.exportOptions["SpectrumEnd"]))
         self.txtResolution.setText(str(self.exportOptions["SpectrumResolution"]))
+        self.cbxDuplicates.setCurrentText(common.ExportDuplicates(self.exportOptions["Duplicates"]).name)
 
     def initWidgets(self):
         # layout
@@ -199,11 +200,21 @@ class DialogExport(QDialog):
         grpResolution = QGroupBox("Spectral Resolution:", self)
         grpResolution.setLayout(boxResolution)
 
+        # samples already in export file
+        self.cbxDuplicates = QComboBox()
+        self.cbxDuplicates.setSizeAdjustPolicy(QComboBox.AdjustToContents)
+        self.cbxDuplicates.addItems([str(d.name) for d in common.ExportDuplicates])
+        boxDuplicates = QHBoxLayout()
+        boxDuplicates.addWidget(self.cbxDuplicates)
+        grpDuplicates = QGroupBox("Already Exported:", self)
+        grpDuplicates.setLayout(boxDuplicates)
+
         # add final row of options
         boxStuffOptions = QHBoxLayout()
         boxStuffOptions.addWidget(grpCoords, 0, Qt.AlignLeft)
         boxStuffOptions.addWidget(grpRange, 0, Qt.AlignLeft)
-        boxStuffOptions.addWidget(grpResolution, 1)
+        boxStuffOptions.addWidget(grpResolution, 0, Qt.AlignLeft)
+        boxStuffOptions.addWidget(grpDuplicates, 1)
         boxStuffOptions.setContentsMargins(0, 0, 0, 0)
         pnlStuffOptions = QWidget()
         pnlStuffOptions.setLayout(boxStuffOptions)
@@ -268,6 +279,7 @@ class DialogExport(QDialog):
         self.exportOptions["SpectrumStart"] = int(self.txtRangeStart.text())
         self.exportOptions["SpectrumEnd"] = int(self.txtRangeEnd.text())
         self.exportOptions["SpectrumResolution"] = int(self.txtResolution.text())
+        self.exportOptions["Duplicates"] = common.ExportDuplicates[self.cbxDuplicates.currentText()].value
 
         # save selected sample features
         attributes = []
@@ -0,0 +1,276 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: Script to benchmark SpectralSkyViewer data loading, sampling, exporting, and the res scripts.
+# ====================================================================
+import sys
+import os
+import json
+import argparse
+import time
+import shutil
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+from PIL import Image
+# we need our utilities
+sys.path.insert(0, '../')
+import common
+import utility
+import utility_data
+import utility_export
+
+
+ScriptDir = os.path.dirname(os.path.abspath(__file__))
+TemplateConfig = os.path.join(ScriptDir, "example-ddir-config.json")
+FirstDate = datetime(2026, 6, 1)
+FirstCapture = timedelta(hours=9)   # time of first capture of each date
+CaptureInterval = 15                # (minutes) between captures
+ASDOffset = 5                       # (seconds) ASD capture time after HDR capture time
+SkyCovers = ["CLR", "SCT", "OVC"]
+
+
+'''
+Function to generate a synthetic fisheye sky photo (bright disc w/ noise, black outside the lens circle).
+:param height: Photo height (pixels). Width is 1.5x height, like our camera.
+:return: A numpy array (height, width, 3) of uint8 pixels.
+'''
+def SyntheticPhoto(height):
+    width = int(height * 1.5)
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    r = np.sqrt((x - width / 2) ** 2 + (y - height / 2) ** 2) / (height / 2)
+    sky = np.clip(1.0 - r * 0.5, 0, 1) * (r <= 1)
+    rgb = np.stack([sky * 120, sky * 170, sky * 240], axis=2)
+    rgb += rng.normal(0, 8, rgb.shape) * (r <= 1)[..., None]
+    return np.clip(rgb, 0, 255).astype(np.uint8)
+
+'''
+Function to generate the text of a synthetic ViewSpecPro ASD text file (.asd.rad.txt).
+:param start: First wavelength (nm).
+:param end: Last wavelength (nm).
+:return: File contents (str).
+'''
+def SyntheticASDText(start, end):
+    wavelengths = np.arange(start, end + 1)
+    radiances = 0.1 * np.exp(-((wavelengths - 480) / 300.0) ** 2) + 0.002
+    lines = ["Wavelength\tsynthetic.asd.rad"]
+    lines.extend(["{0}\t{1:.6e}".format(w, r) for w, r in zip(wavelengths, radiances)])
+    return "\n".join(lines) + "\n"
+
+'''
+Function to generate a synthetic data directory in the layout SpectralSkyViewer expects:
+<date>/HDR/<time>/ photos (one per exposure, w/ EXIF), <date>/ASD/<time>/ ASD files (one per sample), and config.json
+:param args: ArgumentParser arguments parsed at program startup
+:return: A list of capture (datetime) timestamps generated.
+'''
+def GenerateDataDirectory(args):
+    with open(TemplateConfig, 'r') as file:
+        config = json.load(file)
+    if (args.exposures):
+        config["Exposures"] = config["Exposures"][:args.exposures]
+    config["SkyCover"] = []
+
+    photo = Image.fromarray(SyntheticPhoto(args.resolution))
+    asdtext = SyntheticASDText(config["SpectrumStart"], config["SpectrumEnd"])
+    captures = []
+    for d in range(0, args.dates):
+        date = FirstDate + timedelta(days=d)
+        config["SkyCover"].append([date.strftime("%m/%d/%Y"), "08:00", "18:00", SkyCovers[d % len(SkyCovers)]])
+        for c in range(0, args.captures):
+            capture = date + FirstCapture + timedelta(minutes=c * CaptureInterval)
+            captures.append(capture)
+
+            # photos, one per exposure
+            hdrDir = os.path.join(args.datadir, capture.strftime("%Y-%m-%d"), "HDR", capture.strftime("%H.%M.%S"))
+            os.makedirs(hdrDir, exist_ok=True)
+            for e, exposure in enumerate(config["Exposures"]):
+                exif = Image.Exif()
+                exif[0x0110] = "Synthetic"                                   # Model
+                exif[0x0132] = capture.strftime("%Y:%m:%d %H:%M:%S")         # DateTime
+                exififd = exif.get_ifd(0x8769)
+                exififd[0x9003] = capture.strftime("%Y:%m:%d %H:%M:%S")      # DateTimeOriginal
+                exififd[0x829A] = float(exposure)                            # ExposureTime
+                photo.save(os.path.join(hdrDir, "IMG_{0:04d}.jpg".format(e)), quality=95, exif=exif)
+
+            # ASD files, one per sample of sampling pattern
+            asdTime = capture + timedelta(seconds=ASDOffset)
+            asdDir = os.path.join(args.datadir, capture.strftime("%Y-%m-%d"), "ASD", asdTime.strftime("%H.%M.%S"))
+            os.makedirs(asdDir, exist_ok=True)
+            for s in range(0, len(config["SamplingPattern"])):
+                with open(os.path.join(asdDir, "{0:03d}_{1}.asd.rad.txt".format(s, asdTime.strftime("%H.%M.%S"))), 'w') as file:
+                    file.write(asdtext)
+
+    with open(os.path.join(args.datadir, common.DefDataConfig["Filename"]), 'w') as file:
+        json.dump(config, file, indent=4)
+    return captures
+
+'''
+Function to time a function several times.
+:param func: Function (w/out parameters) to time.
+:param repeat: Number of times to run the function.
+:param items: Number of items processed per run (e.g. files), so per item timings can be compared.
+:return: A dict of timings (seconds).
+'''
+def Time(func, repeat, items=1):
+    timings = []
+    for i in range(0, repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {"repeat": repeat, "items": items, "min": min(timings), "median": median, "mean": statistics.mean(timings), "max": max(timings), "median_per_item": median / max(items, 1)}
+
+'''
+Function to time a res script (run in a separate process, like a user would).
+:param script: Script filename (in res directory).
+:param argv: List of command line arguments.
+:param repeat: Number of times to run the script.
+:param cleanup: (optional) List of files to delete before each run.
+:return: A dict of timings (seconds), and the exit code of the script.
+'''
+def TimeScript(script, argv, repeat, cleanup=[]):
+    codes = []
+    def run():
+        for f in cleanup:
+            if (os.path.exists(f)):
+                os.remove(f)
+        result = subprocess.run([sys.executable, script] + argv, cwd=ScriptDir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        codes.append(result.returncode)
+    result = Time(run, repeat)
+    result["returncode"] = max(codes, key=abs)
+    return result
+
+'''
+Function that runs all benchmarks.
+:param args: ArgumentParser arguments parsed at program startup
+:return: A dict of benchmark results.
+'''
+def Benchmark(args):
+    report = {"timestamp": datetime.now().isoformat(timespec='seconds'), "python": platform.python_version(), "platform": platform.platform(), "commit": None, "params": {}, "results": {}}
+    try:
+        report["commit"] = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ScriptDir, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    results = report["results"]
+
+    # data directory
+    configFile = os.path.join(args.datadir, common.DefDataConfig["Filename"])
+    if (os.path.exists(configFile)):
+        print("Using existing data directory: " + args.datadir, file=sys.stderr)
+    else:
+        print("Generating data directory: " + args.datadir, file=sys.stderr)
+        results["generate"] = Time(lambda: GenerateDataDirectory(args), 1, args.dates * args.captures)
+    common.AppSettings["DataDirectory"] = args.datadir
+    common.AppSettings["PixelCacheDirectory"] = ""
+    if (not utility_data.loadDataConfig()):
+        print("Error: Failed to load data config: " + configFile, file=sys.stderr)
+        sys.exit(2)
+    dateDirs = sorted([d for d in utility.findFiles(args.datadir, mode=2) if utility.verifyDateTime(os.path.basename(d), "%Y-%m-%d")])
+    captures = []
+    for datedir in dateDirs:
+        captures.extend(utility_data.findCaptureTimes(os.path.join(datedir, "HDR"), datetime.strptime(os.path.basename(datedir), "%Y-%m-%d").date()))
+    if (len(captures) <= 0):
+        print("Error: No captures found in: " + args.datadir, file=sys.stderr)
+        sys.exit(2)
+    capture = captures[0]
+    photo = utility_data.findHDRFile(args.datadir, capture, common.Exposures[0], "jpg")
+    asdfiles = utility_data.findASDFiles(args.datadir, capture)
+    with Image.open(photo) as img:
+        resolution = img.size
+    report["params"] = {"dates": len(dateDirs), "captures": len(captures), "exposures": len(common.Exposures), "samples": len(common.SamplingPattern), "resolution": resolution, "repeat": args.repeat}
+    print("Benchmarking " + str(len(captures)) + " captures...", file=sys.stderr)
+
+    # data loading
+    results["findCaptureTimes"] = Time(lambda: [utility_data.findCaptureTimes(os.path.join(d, "HDR"), datetime.strptime(os.path.basename(d), "%Y-%m-%d").date()) for d in dateDirs], args.repeat, len(dateDirs))
+    results["findASDFiles"] = Time(lambda: utility_data.findASDFiles(args.datadir, capture), args.repeat)
+    results["loadASDFile"] = Time(lambda: [utility_data.loadASDFile(f) for f in asdfiles], args.repeat, len(asdfiles))
+    results["imageEXIF"] = Time(lambda: utility_data.imageEXIF(photo), args.repeat)
+    results["imageEXIFDateTime"] = Time(lambda: utility_data.imageEXIFDateTime(photo), args.repeat)
+
+    # pixel sampling
+    points = utility_data.computePointsInImage(photo, common.SamplingPattern)
+    results["computePointsInImage"] = Time(lambda: utility_data.computePointsInImage(photo, common.SamplingPattern), args.repeat, len(common.SamplingPattern))
+    results["loadPhotoPixels"] = Time(lambda: utility_data.loadPhotoPixels(photo), args.repeat)
+    for region in [1, 5]:
+        regions = [region] * len(points)
+        for weighting in [common.PixelWeighting.Mean, common.PixelWeighting.Gaussian]:
+            name = "collectPixels_" + weighting.name + "_" + str(region)
+            results[name] = Time(lambda: utility_data.collectPixels(points, regions, file=photo, weighting=weighting), args.repeat, len(points))
+
+    # exporting (one capture, all samples, all features)
+    options = dict(common.DefExportOptions)
+    options["Features"] = list(range(0, len(common.SampleFeatures)))
+    options["Duplicates"] = common.ExportDuplicates.Append.value
+    exportFile = os.path.join(args.workdir, "export.csv")
+    options["Filename"] = exportFile
+    samples = list(range(0, len(common.SamplingPattern)))
+    def export():
+        utility_export.ExportIndex.delete(exportFile)
+        if (os.path.exists(exportFile)):
+            os.remove(exportFile)
+        utility_export.exportCapture(args.datadir, exportFile, capture, samples, common.Exposures[0], options, log=lambda msg: None, verbose=False)
+    results["exportCapture"] = Time(export, args.repeat, len(samples))
+    results["classifyCaptureSkyCovers"] = Time(lambda: utility_data.classifyCaptureSkyCovers(captures, common.SkyCoverData), args.repeat, len(captures))
+    results["interpolateSunPosition"] = Time(lambda: [utility_data.interpolateSunPosition(common.SPASiteData, c) for c in captures], args.repeat, len(captures))
+
+    # res scripts
+    if (not args.noscripts):
+        datasetFile = os.path.join(args.workdir, "dataset.csv")
+        workers = ["-w", str(args.workers)] if args.workers else []
+        results["script_ddircheck"] = TimeScript("ddircheck.py", [args.datadir, "-f", "-c", os.path.join(args.workdir, "ddircheck.json")] + workers, args.repeat)
+        results["script_ddirfix_correlate"] = TimeScript("ddirfix.py", [args.datadir, "-r", "-cc", str(common.CaptureEpsilon)] + workers, args.repeat)
+        results["script_dsetexport"] = TimeScript("dsetexport.py", [args.datadir, datasetFile] + workers, args.repeat, cleanup=[datasetFile, datasetFile + ".idx", datasetFile + ".ckpt"])
+        results["script_dsetexport"]["items"] = len(captures)
+        results["script_dsetfix_count"] = TimeScript("dsetfix.py", [datasetFile, "-n"], args.repeat)
+        results["script_dsetfix_dups"] = TimeScript("dsetfix.py", [datasetFile, "-d"], args.repeat)
+
+    return report
+
+#---------------------------------------------------------------------
+
+def main():
+    # handle command line args
+    parser = argparse.ArgumentParser(description='Script to benchmark SpectralSkyViewer on a synthetic (or existing) data directory. Results are written as JSON, for comparing across commits.', formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_help = True
+    parser.add_argument('-o', '--output', dest='output', type=str, help='write results to this file (.json) (default: stdout)')
+    parser.add_argument('-d', '--datadir', dest='datadir', type=str, help='data directory to benchmark, generated if it has no config file (default: temp dir)')
+    parser.add_argument('-k', '--keep', dest='keep', action='store_true', help='keep generated temp data directory', default=False)
+    parser.add_argument('-n', '--dates', dest='dates', type=int, help='number of dates to generate', default=2)
+    parser.add_argument('-c', '--captures', dest='captures', type=int, help='number of captures per date to generate', default=4)
+    parser.add_argument('-e', '--exposures', dest='exposures', type=int, help='number of exposures per capture to generate (default: all of example config)')
+    parser.add_argument('-p', '--resolution', dest='resolution', type=int, help='height (pixels) of generated photos', default=1000)
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, help='number of times to run each benchmark', default=5)
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of workers of res scripts (default: CPU count)')
+    parser.add_argument('-x', '--noscripts', dest='noscripts', action='store_true', help='skip benchmarking res scripts', default=False)
+    args = parser.parse_args()
+
+    # temp workspace, data directory generated in it unless specified
+    args.workdir = tempfile.mkdtemp(prefix="ssvbench-")
+    if (not args.datadir):
+        args.datadir = os.path.join(args.workdir, "data")
+    args.datadir = os.path.abspath(args.datadir)
+
+    # do it
+    try:
+        report = Benchmark(args)
+    finally:
+        if (not args.keep):
+            shutil.rmtree(args.workdir, ignore_errors=True)
+        else:
+            print("Kept benchmark files in: " + args.workdir, file=sys.stderr)
+    if (args.output):
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+        print("Results written to: " + args.output, file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
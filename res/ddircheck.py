@@ -0,0 +1,232 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: Script to verify that a data directory is organized the way SpectralSkyViewer expects.
+# ====================================================================
+import sys
+import os
+import json
+import argparse
+import time
+import multiprocessing
+from collections import Counter
+from PIL import Image
+# we need our utilities
+sys.path.insert(0, '../')
+import common
+import utility
+import utility_data
+
+
+CacheVersion = 2
+ASDTolerance = 0.01  # max relative difference of raw ASD files converted to radiance, from ViewSpecPro's conversions
+
+
+'''
+Function that finds all capture directories (HDR and ASD) of a data directory.
+:param directory: The data directory.
+:return: A list of (kind, path) tuples, where kind is "HDR" or "ASD".
+'''
+def FindCaptureDirs(directory):
+    captures = []
+    dateDirs = utility.findFiles(directory, mode=2)
+    dateDirs[:] = [dir for dir in dateDirs if utility.verifyDateTime(os.path.basename(dir), "%Y-%m-%d")]
+    for datedir in sorted(dateDirs):
+        for kind in ["HDR", "ASD"]:
+            kindDir = os.path.join(datedir, kind)
+            if (not os.path.exists(kindDir)):
+                continue
+            timeDirs = utility.findFiles(kindDir, mode=2)
+            timeDirs[:] = [dir for dir in timeDirs if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
+            captures.extend([(kind, dir) for dir in sorted(timeDirs)])
+    return captures
+
+'''
+Function that computes a signature of a capture directory, which changes whenever any of its files change.
+:param dirpath: The capture directory.
+:return: Latest modification time of the directory and all of its files.
+'''
+def CaptureSignature(dirpath):
+    latest = os.stat(dirpath).st_mtime
+    for entry in os.scandir(dirpath):
+        latest = max(latest, entry.stat().st_mtime)
+    return latest
+
+'''
+Function that compares the radiance of a raw ASD file converted by us, to its ViewSpecPro conversion (.asd.rad.txt).
+:param filepath: Path to raw .asd file.
+:return: Max relative difference of channels, or None if file couldn't be converted or compared.
+'''
+def CompareASDConversion(filepath):
+    wavelengths, radiances = utility_data.loadASDBinaryFile(filepath)
+    expwavelengths, expected = utility_data.loadASDTextFile(filepath + ".rad.txt")
+    if (len(radiances) <= 0 or len(radiances) != len(expected)):
+        return None
+    valid = expected > 1e-9
+    if (not valid.any()):
+        return None
+    return float(max(abs(radiances[valid] - expected[valid]) / expected[valid]))
+
+'''
+Function that validates a single capture directory.
+:param task: Tuple of (kind, capture directory, number of exposures, number of samples).
+:return: A dict of the "errors" (list of str) found, and the photo "resolution" ([width, height]) if HDR.
+'''
+def ValidateCapture(task):
+    kind, dirpath, exposures, samples = task
+    result = {"errors": [], "resolution": None}
+    try:
+        if (kind == "HDR"):
+            # one readable photo per exposure, all of the same resolution
+            photos = utility.findFiles(dirpath, mode=1, ext=["jpg"])
+            if (len(photos) != exposures):
+                result["errors"].append("Found " + str(len(photos)) + " photos, expected " + str(exposures) + " exposures")
+            sizes = set()
+            for p in photos:
+                try:
+                    with Image.open(p) as img:
+                        sizes.add(img.size)
+                        img.verify()
+                except Exception as ex:
+                    result["errors"].append("Unreadable photo " + os.path.basename(p) + ": " + str(ex))
+            if (len(sizes) > 1):
+                result["errors"].append("Photos have different resolutions: " + str(sorted(sizes)))
+            if (len(sizes) > 0):
+                result["resolution"] = list(sorted(sizes)[0])
+        else:
+            # one file per sample, named by sample pattern index (see utility_data.findASDFile)
+            asdfiles = utility_data.findASDCaptureFiles(dirpath)
+            if (len(asdfiles) != samples):
+                result["errors"].append("Found " + str(len(asdfiles)) + " ASD files, sampling pattern has " + str(samples))
+            for i, f in enumerate(asdfiles):
+                token = os.path.basename(f).split('_')[0]
+                if (not token.isdigit() or int(token) != i):
+                    result["errors"].append("ASD file " + os.path.basename(f) + " is not sample index " + str(i))
+                # raw ASD files we convert to radiance should match ViewSpecPro's conversion, where there is one
+                if (f.lower().endswith(".asd") and os.path.exists(f + ".rad.txt")):
+                    difference = CompareASDConversion(f)
+                    if (difference is not None and difference > ASDTolerance):
+                        result["errors"].append("ASD file " + os.path.basename(f) + " radiance differs from ViewSpecPro's by " + "{0:.1f}".format(difference * 100) + "%")
+    except Exception as ex:
+        result["errors"].append("Failed to validate: " + str(ex))
+    return result
+
+'''
+Function that validates an entire data directory.
+Capture directories are validated in parallel. Results are cached per capture directory (keyed by modification time),
+so only new or changed captures are validated on subsequent runs.
+:param args: ArgumentParser arguments parsed at program startup
+:return: Number of captures with errors.
+'''
+def ValidateDataDirectory(args):
+    print("Validating data directory:\n" + args.directory)
+    timer = time.time()
+
+    # load data directory config
+    common.AppSettings["DataDirectory"] = args.directory
+    if (not utility_data.loadDataConfig()):
+        print("Error: Failed to load data config: " + os.path.join(args.directory, common.DefDataConfig["Filename"]))
+        return 1
+    exposures = len(common.Exposures)
+    samples = len(common.SamplingPattern)
+    for warning in common.SkyCoverData.warnings:
+        print("Warning: Sky cover " + warning)
+
+    # load cache (discarded if config changed)
+    cacheFile = args.cache if args.cache else os.path.join(args.directory, ".ddircheck.json")
+    cache = {}
+    if (not args.full and os.path.exists(cacheFile)):
+        try:
+            with open(cacheFile, 'r') as file:
+                loaded = json.load(file)
+            if (loaded["version"] == CacheVersion and loaded["exposures"] == exposures and loaded["samples"] == samples):
+                cache = loaded["captures"]
+        except (ValueError, KeyError):
+            print("Warning: Ignoring unreadable cache file: " + cacheFile)
+
+    # figure out which captures need validation
+    captures = FindCaptureDirs(args.directory)
+    if (len(captures) <= 0):
+        print("No capture directories found.")
+        return 0
+    results = {}
+    tasks = []
+    signatures = {}
+    for kind, dir in captures:
+        key = os.path.relpath(dir, args.directory)
+        signatures[key] = CaptureSignature(dir)
+        if (key in cache and cache[key]["signature"] == signatures[key]):
+            results[key] = cache[key]
+        else:
+            tasks.append((key, (kind, dir, exposures, samples)))
+    print("Validating " + str(len(tasks)) + " of " + str(len(captures)) + " captures (" + str(len(captures) - len(tasks)) + " unchanged)")
+
+    # validate
+    workers = args.workers if args.workers else multiprocessing.cpu_count()
+    if (workers > 1 and len(tasks) > 1):
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            validated = pool.map(ValidateCapture, [t[1] for t in tasks], chunksize=max(1, len(tasks) // (workers * 4)))
+    else:
+        validated = [ValidateCapture(t[1]) for t in tasks]
+    for (key, task), result in zip(tasks, validated):
+        result["signature"] = signatures[key]
+        results[key] = result
+
+    # save cache
+    tmp = cacheFile + ".tmp"
+    with open(tmp, 'w') as file:
+        json.dump({"version": CacheVersion, "exposures": exposures, "samples": samples, "captures": results}, file)
+    os.replace(tmp, cacheFile)
+
+    # archive-wide check, all photos should have the same resolution
+    resolutions = Counter([tuple(r["resolution"]) for r in results.values() if r["resolution"]])
+    errors = {key: list(r["errors"]) for key, r in results.items()}
+    if (len(resolutions) > 1):
+        expected = resolutions.most_common(1)[0][0]
+        for key, r in results.items():
+            if (r["resolution"] and tuple(r["resolution"]) != expected):
+                errors[key].append("Photo resolution " + str(tuple(r["resolution"])) + " differs from archive " + str(expected))
+
+    # report
+    failed = sorted([key for key in errors if len(errors[key]) > 0])
+    for key in failed:
+        print(key)
+        for e in errors[key]:
+            print("    " + e)
+    hdr = len([c for c in captures if c[0] == "HDR"])
+    print("HDR captures: " + str(hdr) + ", ASD captures: " + str(len(captures) - hdr))
+    print("Captures with errors: " + str(len(failed)) + ", total errors: " + str(sum([len(errors[key]) for key in failed])))
+    print("Finished in " + "{0:.2f}".format(time.time() - timer) + "s")
+    if (args.report):
+        with open(args.report, 'w') as file:
+            json.dump({key: errors[key] for key in failed}, file, indent=4)
+        print("Report written to: " + args.report)
+    return len(failed)
+
+#---------------------------------------------------------------------
+
+def main():
+    # handle command line args
+    parser = argparse.ArgumentParser(description='Script to verify a sky data directory is organized as SpectralSkyViewer expects. This script does not make any changes to the data. Exit code is 1 if any errors are found.', formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_help = True
+    parser.add_argument('directory', help='a data directory (with config file) to validate')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of worker processes (default: CPU count)')
+    parser.add_argument('-c', '--cache', dest='cache', type=str, help='cache file of previous results (default: <directory>/.ddircheck.json)')
+    parser.add_argument('-f', '--full', dest='full', action='store_true', help='ignore cache and validate every capture', default=False)
+    parser.add_argument('-o', '--report', dest='report', type=str, help='write per-capture errors to this file (.json)')
+    args = parser.parse_args()
+
+    # directory required as parameter
+    if (not args.directory or not os.path.exists(args.directory)):
+        print("Error: data directory not found.")
+        sys.exit(2)
+
+    # do it
+    failed = ValidateDataDirectory(args)
+    sys.exit(1 if failed > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,13 @@ import sys
 import os
 import shutil
 import argparse
+import concurrent.futures
+import csv
+import json
+import time
+import multiprocessing
 from datetime import datetime, timedelta
+import numpy as np
 from PIL import Image
 import imageio
 import rawpy
@@ -119,6 +125,11 @@ def ListSubDirectories(args):
         print(dir)
 
 '''
+Function that correlates HDR captures to ASD captures (by capture time) for every capture date of a directory.
+Captures of each date are matched with a sorted merge (see utility_data.correlateCaptureTimes), and dates are
+processed in parallel worker processes. Optionally writes a report (.csv or .json) of all matched, unmatched,
+and ambiguous captures.
+:param args: ArgumentParser arguments parsed at program startup
 '''
 def CorrelateCaptures(args):
     print("Finding HDR/ASD capture times w/in " + str(args.correlatecaptures) + "s in:\n" + args.directory)
@@ -136,56 +147,65 @@ def CorrelateCaptures(args):
         print("No capture date directories found.")
         return
 
-    # iterate through all capture dates and find all HDR and ASD captures
-    hdrCaptures = []
-    asdCaptures = []
-    correlatedCaptures = []
-    for datedir in dateDirs:
-        #print(datedir)
+    # correlate each capture date (in parallel if there are enough of them)
+    tasks = [(dir, args.correlatecaptures) for dir in dateDirs]
+    workers = args.workers if args.workers else multiprocessing.cpu_count()
+    if (workers > 1 and len(tasks) > 1):
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            results = pool.map(CorrelateCaptureDate, tasks)
+    else:
+        results = [CorrelateCaptureDate(t) for t in tasks]
+
+    # print
+    rows = []
+    for datedir, result in zip(dateDirs, results):
+        date = os.path.basename(datedir)
+        if (result is None):
+            print(date + ": No HDR or ASD captures found.")
+            continue
+        print(date + ": " + str(len(result["matched"])) + " matched, " +
+              str(len(result["unmatched1"])) + " HDR unmatched, " +
+              str(len(result["unmatched2"])) + " ASD unmatched, " +
+              str(len(result["ambiguous"])) + " ambiguous")
+        for hdr, asd in result["matched"]:
+            rows.append(("matched", date, hdr.time(), asd.time(), (asd - hdr).total_seconds()))
+        for hdr in result["unmatched1"]:
+            rows.append(("unmatched_hdr", date, hdr.time(), "", ""))
+        for asd in result["unmatched2"]:
+            rows.append(("unmatched_asd", date, "", asd.time(), ""))
+        for hdr, candidates in result["ambiguous"]:
+            for asd in candidates:
+                rows.append(("ambiguous", date, hdr.time(), asd.time(), (asd - hdr).total_seconds()))
+    matched = len([r for r in rows if r[0] == "matched"])
+    print("Found " + str(matched) + " captures w/in " + str(args.correlatecaptures) + "s")
+
+    # report
+    if (args.report):
+        header = ("status", "date", "hdr", "asd", "delta")
+        rows = [tuple(str(v) for v in r) for r in rows]
+        if (args.report.lower().endswith(".json")):
+            with open(args.report, "w") as file:
+                json.dump([dict(zip(header, r)) for r in rows], file, indent=4)
+        else:
+            with open(args.report, "w", newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+                writer.writerows(rows)
+        print("Report written to: " + args.report)
 
-        # grab all capture HDR captures
-        hdrDir = os.path.join(datedir, "HDR")
-        hdrCaptures = utility.findFiles(hdrDir, mode=2)
-        if (len(hdrCaptures) <= 0):
-            print("No HDR directories found at all.")
-            return
-        hdrCaptures = [(datetime.strptime(os.path.basename(datedir) + " " + os.path.basename(dir), '%Y-%m-%d %H.%M.%S'), dir) for dir in hdrCaptures if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
-        if (len(hdrCaptures) <= 0):
-            print("No HDR captures found.")
-            return
-        #for capture in hdrCaptures:
-        #    print(capture[0], capture[1])
-
-        # grab all capture ASD captures
-        asdDir = os.path.join(datedir, "ASD")
-        asdCaptures = utility.findFiles(asdDir, mode=2)
-        if (len(asdCaptures) <= 0):
-            print("No ASD directories found at all.")
-            return
-        asdCaptures = [(datetime.strptime(os.path.basename(datedir) + " " + os.path.basename(dir), '%Y-%m-%d %H.%M.%S'), dir) for dir in asdCaptures if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
-        if (len(asdCaptures) <= 0):
-            print("No ASD captures found.")
-            return
-        #for capture in asdCaptures:
-        #    print(capture[0], capture[1])
-
-        # correlate HDR to ASD captures
-        for i in range(0, len(hdrCaptures)):
-            for j in range(0, len(asdCaptures)):
-                diff = abs((hdrCaptures[i][0] - asdCaptures[j][0]).total_seconds())
-                #print(hdrCaptures[i][0], asdCaptures[j][0], diff)
-                if (diff <= args.correlatecaptures):
-                    correlatedCaptures.append((hdrCaptures[i][0], hdrCaptures[i][1], asdCaptures[j][0], asdCaptures[j][1]))
-
-    print("Found " + str(len(correlatedCaptures)) + " captures w/in " + str(args.correlatecaptures) + "s")
-    prev = None
-    for capture in correlatedCaptures:
-        if prev != capture[0].date():
-            print(capture[1])
-            print(capture[3])
-            prev = capture[0].date()
-        print("HDR:", capture[0], "ASD:", capture[2])
-    print("Found " + str(len(correlatedCaptures)) + " captures w/in " + str(args.correlatecaptures) + "s")
+'''
+Function that correlates HDR captures to ASD captures of a single capture date.
+:param task: Tuple of (capture date directory, max seconds between correlated captures).
+:return: Result of utility_data.correlateCaptureTimes(), or None if the date has no HDR nor ASD captures.
+'''
+def CorrelateCaptureDate(task):
+    datedir, epsilon = task
+    date = datetime.strptime(os.path.basename(datedir), "%Y-%m-%d").date()
+    hdrCaptures = utility_data.findCaptureTimes(os.path.join(datedir, "HDR"), date)
+    asdCaptures = utility_data.findCaptureTimes(os.path.join(datedir, "ASD"), date)
+    if (len(hdrCaptures) <= 0 and len(asdCaptures) <= 0):
+        return None
+    return utility_data.correlateCaptureTimes(hdrCaptures, asdCaptures, epsilon)
 
 '''
 Function that offsets capture directories (times of day) by a specific amount.
@@ -357,6 +377,10 @@ def HDRRotatePhotos(args):
 
 '''
 Function that postprocesses RAW (CR2) photos to digital positives, with minimal processing options.
+Photos are processed across a pool of worker processes. Photos whose TIFF is already newer than the RAW are skipped,
+and each TIFF is written to a temp file and renamed when complete, so an interrupted run can simply be run again.
+TIFFs can optionally be written tiled (-ht), compressed (-hz), 16-bit linear (-h16), and with an embedded reduced
+resolution overview (-hv), so later readers can read regions and previews w/out decoding the entire photo.
 :param args: ArgumentParser arguments parsed at program startup
 '''
 def HDRPostProcessPhotos(args):
@@ -371,24 +395,110 @@ def HDRPostProcessPhotos(args):
         print("No photos found in this directory.")
         return
 
-    prevdir = os.path.dirname(photos[0])
-    print(prevdir)
-    for p in photos:
-        pName, pExt = os.path.basename(p).split(".")
-        pNameNew = pName + ".tiff"
-        pNew = os.path.join(os.path.dirname(p), pNameNew)
-        if (os.path.dirname(p) != prevdir):
-            prevdir = os.path.dirname(p)
-            print(prevdir)
-        print("Postprocess " + p)
-        if (not args.readonly):
-            with rawpy.imread(p) as raw:
-                rgb = raw.postprocess(no_auto_bright=True, user_wb=raw.camera_whitebalance, gamma=(1, 1))
-                imageio.imsave(pNew, rgb)
+    # skip photos already postprocessed (TIFF newer than RAW)
+    tasks = []
+    skipped = 0
+    for p in sorted(photos):
+        pNew = os.path.splitext(p)[0] + ".tiff"
+        if (os.path.exists(pNew) and os.path.getmtime(pNew) >= os.path.getmtime(p)):
+            skipped += 1
+            continue
+        tasks.append((p, pNew))
+    print("Found " + str(len(photos)) + " raw photos, " + str(skipped) + " already postprocessed, " + str(len(tasks)) + " to do")
+
+    # TIFF layout options
+    layout = {"tile": args.hdrtile, "compression": args.hdrcompress, "bits": 16 if args.hdr16 else 8, "overview": args.hdroverview}
+    if (layout["tile"] and (layout["tile"] <= 0 or layout["tile"] % 16 != 0)):
+        print("Error: TIFF tile size must be a positive multiple of 16.")
+        return
+    if (layout["overview"] and layout["overview"] < 2):
+        print("Error: TIFF overview reduction must be at least 2.")
+        return
+    tasks = [(p, pNew, layout) for p, pNew in tasks]
+
+    # dry run
+    if (args.readonly):
+        for p, pNew, layout in tasks:
+            print("Postprocess " + p)
+        return
+    if (len(tasks) <= 0):
+        return
+
+    # postprocess in parallel
+    workers = args.workers if args.workers and args.workers > 0 else multiprocessing.cpu_count()
+    done = 0
+    failed = 0
+    nbytes = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+        for p, size, error in pool.imap_unordered(HDRPostProcessPhoto, tasks):
+            if error is not None:
+                failed += 1
+                print("Error: " + p + ": " + error)
+                continue
+            done += 1
+            nbytes += size
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            print("Postprocess [{0}/{1}] {2} ({3:.2f} files/s, {4:.2f} MB/s)".format(done + failed, len(tasks), p, done / elapsed, nbytes / elapsed / 1e6))
+
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    print("Postprocessed {0} photos ({1} failed) in {2:.1f}s with {3} workers ({4:.2f} files/s, {5:.2f} MB/s)".format(done, failed, elapsed, workers, done / elapsed, nbytes / elapsed / 1e6))
+
+'''
+Worker function that postprocesses a single RAW photo to a TIFF. Runs in a separate process.
+:param task: Tuple of (raw photo path, tiff photo path, TIFF layout options dict)
+:return: Tuple of (raw photo path, raw photo bytes, error message or None)
+'''
+def HDRPostProcessPhoto(task):
+    p, pNew, layout = task
+    tmp = pNew + ".tmp"
+    try:
+        with rawpy.imread(p) as raw:
+            rgb = raw.postprocess(no_auto_bright=True, user_wb=raw.camera_whitebalance, gamma=(1, 1), output_bps=layout["bits"])
+        if (layout["tile"] or layout["compression"] or layout["overview"] or layout["bits"] != 8):
+            HDRWriteTIFF(tmp, rgb, layout)
+        else:
+            imageio.imsave(tmp, rgb, format='TIFF')
+        os.replace(tmp, pNew)
+        return p, os.path.getsize(p), None
+    except Exception as ex:
+        if (os.path.exists(tmp)):
+            os.unlink(tmp)
+        return p, 0, str(ex)
 
 '''
-Function that reorganizes HDR photos into capture directories (timestamps) based on a capture interval.
-The interval between captures has a default (below), but can also be specified to this script.
+Function that writes a photo to a TIFF, optionally tiled and compressed, with an optional reduced resolution overview.
+The overview is stored as a SubIFD of the photo, so readers that only read the first image still see the full photo.
+:param path: Path of TIFF to write
+:param rgb: Photo pixels, numpy array (height, width, channels) of uint8 or uint16
+:param layout: Dict of TIFF layout options ("tile" size, "compression", "overview" reduction factor)
+:note: tifffile is only required (and imported) when using these options.
+'''
+def HDRWriteTIFF(path, rgb, layout):
+    import tifffile
+    options = {"photometric": "rgb"}
+    if (layout["tile"]):
+        options["tile"] = (layout["tile"], layout["tile"])
+    if (layout["compression"]):
+        options["compression"] = layout["compression"]
+    with tifffile.TiffWriter(path) as tiff:
+        if (not layout["overview"]):
+            tiff.write(rgb, **options)
+            return
+        # overview is a block average of the photo
+        factor = layout["overview"]
+        h = (rgb.shape[0] // factor) * factor
+        w = (rgb.shape[1] // factor) * factor
+        overview = rgb[:h, :w].reshape(h // factor, factor, w // factor, factor, rgb.shape[2]).mean(axis=(1, 3))
+        overview = np.around(overview).astype(rgb.dtype)
+        tiff.write(rgb, subifds=1, **options)
+        tiff.write(overview, subfiletype=1, **options)
+
+'''
+Function that organizes loose HDR photos into capture time directories.
+Photos are organized in two phases. First, EXIF timestamps of all photos are read in parallel (reading only up to the
+timestamp tag). Then photos are sorted by timestamp (not filename), clustered into captures by interval, and a move plan
+is built. The plan is printed, optionally saved (-p), and applied unless in readonly mode.
 :param args: ArgumentParser arguments parsed at program startup
 '''
 def HDROrganizePhotos(args):
@@ -403,35 +513,65 @@ def HDROrganizePhotos(args):
         print("No photos found in this directory.")
         return
 
-    # we want to separate photos into directories for each capture
-    captures = []
-    captureIntervals = [utility_data.imageEXIFDateTime(photos[0])] # start with first photo timestamp
+    # phase 1: scan all EXIF timestamps
+    timer = time.time()
+    workers = args.workers if args.workers else min(32, multiprocessing.cpu_count() * 4)  # I/O bound
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        timestamps = list(executor.map(utility_data.imageEXIFDateTime, photos))
+    print("Scanned " + str(len(photos)) + " photos in " + "{0:.2f}".format(time.time() - timer) + "s")
+    stamped = []
+    for p, t in zip(photos, timestamps):
+        if (t == datetime.min):
+            print("Skipping (no EXIF timestamp): " + p)
+            continue
+        stamped.append((t, p))
+    if (len(stamped) <= 0):
+        print("No photos with EXIF timestamps found.")
+        return
+
+    # phase 2: plan moves
     threshold = 4       # look for next timestamp after this amount of time (next capture interval)
     if (args.interval): # user can specify capture interval
         threshold = args.interval
-    captureFolder = os.path.join(args.directory, str(captureIntervals[-1].time()).replace(':', '.'))
-    print(captureFolder)
-    if (not args.readonly):
-        os.mkdir(captureFolder)
+    plan = HDRPlanCaptures(args.directory, stamped, threshold)
+    captureFolders = sorted(set([os.path.dirname(dest) for src, dest in plan]))
+    for src, dest in plan:
+        print("Move " + os.path.basename(src) + " to " + dest)
+    print("Planned " + str(len(plan)) + " moves into " + str(len(captureFolders)) + " capture directories")
+    if (args.plan):
+        with open(args.plan, "w", newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(("source", "destination"))
+            writer.writerows(plan)
+        print("Plan written to: " + args.plan)
+    if (args.readonly):
+        return
 
-    # for each loose photo
-    for p in photos:
-        last = captureIntervals[-1]
-        next = utility_data.imageEXIFDateTime(p)
+    # phase 3: apply moves
+    for folder in captureFolders:
+        os.makedirs(folder, exist_ok=True)
+    for src, dest in plan:
+        shutil.move(src, dest)
 
+'''
+Function that clusters timestamped photos into captures and plans where to move each photo.
+A new capture starts at the first photo taken at least threshold minutes after the start of the current capture.
+:param directory: Directory the capture time directories are created in.
+:param stamped: List of (datetime, filepath) tuples.
+:param threshold: Capture interval (in minutes).
+:return: A list of (source, destination) filepath tuples, in timestamp order.
+'''
+def HDRPlanCaptures(directory, stamped, threshold):
+    plan = []
+    start = None
+    captureFolder = None
+    for t, p in sorted(stamped):
         # we've encountered next capture interval
-        if ((next - last).total_seconds() / 60.0 >= threshold):
-            captureIntervals.append(next)
-            captureFolder = os.path.join(args.directory, str(next.time()).replace(':', '.'))
-            print(captureFolder)
-            if (not args.readonly):
-                os.mkdir(captureFolder)
-
-        # put photo in folder
-        destPath = os.path.join(captureFolder, os.path.basename(p))
-        print("Move " + os.path.basename(p) + " to " + destPath)
-        if (not args.readonly):
-            shutil.move(p, destPath)
+        if (start is None or (t - start).total_seconds() / 60.0 >= threshold):
+            start = t
+            captureFolder = os.path.join(directory, str(t.time()).replace(':', '.'))
+        plan.append((p, os.path.join(captureFolder, os.path.basename(p))))
+    return plan
 
 #-ASD-----------------------------------------------------------------
 
@@ -652,6 +792,8 @@ def main():
     parser.add_argument('-l', '--listdirs', dest='listdirs', action='store_true', help='list sub dirs of directory', default=False)
     parser.add_argument('-t', '--timeoffset', dest='timeoffset', type=int, help='offset capture dirs by this number of hours +/-')
     parser.add_argument('-cc', '--correlate', dest='correlatecaptures', type=int, help='find HDR captures w/in #s of ASD captures')
+    parser.add_argument('-cr', '--report', dest='report', type=str, help='write correlation report to this file (.csv or .json)')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of workers (default: based on CPU count)')
     # specifies HDR or ASD specific operations
     parser.add_argument('-hdr', '--hdr', dest='hdr', action='store_true', help='HDR mode - working w/ HDR photos')
     parser.add_argument('-asd', '--asd', dest='asd', action='store_true', help='ASD mode - working w/ ASD files')
@@ -660,10 +802,15 @@ def main():
     parser.add_argument('-f', '--renamefiles', dest='renamefiles', action='store_true', help='cleanup file names', default=False)
     parser.add_argument('-o', '--organize', dest='organize', action='store_true', help='organize files into dirs by capture interval', default=False)
     parser.add_argument('-n', '--interval', dest='interval', type=int, help='time interval (in minutes) between captures')
+    parser.add_argument('-p', '--plan', dest='plan', type=str, help='save organize move plan to this file (.csv)')
     # arguments specific to HDR
     parser.add_argument('-hc', '--hdrcounter', dest='hdrcounter', type=int, help='rename HDR photos starting from counter')
     parser.add_argument('-hr', '--hdrrotate', dest='hdrrotate', type=int, help='rotate HDR photos by some +/- degrees')
     parser.add_argument('-hp', '--hdrpositive', dest='hdrpositive', action='store_true', help='postprocess raw photos to digital positive')
+    parser.add_argument('-ht', '--hdrtile', dest='hdrtile', type=int, help='postprocess to tiled TIFFs w/ tiles of this size (multiple of 16)')
+    parser.add_argument('-hz', '--hdrcompress', dest='hdrcompress', type=str, choices=['zlib', 'lzma'], help='postprocess to TIFFs w/ lossless compression')
+    parser.add_argument('-h16', '--hdr16', dest='hdr16', action='store_true', help='postprocess to 16-bit linear TIFFs', default=False)
+    parser.add_argument('-hv', '--hdroverview', dest='hdroverview', type=int, help='embed an overview reduced by this factor in postprocessed TIFFs')
     parser.add_argument('-hx', '--hdrextension', dest='hdrextension', type=str, help='file extension of image', default='jpg')
     # arguments specific to ASD
     parser.add_argument('-af', '--asdfill', dest='asdfill', type=float, help='fill a new .asd.rad.txt file w/ literal')
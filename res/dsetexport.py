@@ -0,0 +1,255 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: Script to export samples of every capture of a data directory, w/out SpectralSkyViewer.
+# ====================================================================
+import sys
+import os
+import json
+import argparse
+import time
+import multiprocessing
+from datetime import datetime
+# we need our utilities
+sys.path.insert(0, '../')
+import common
+import utility
+import utility_data
+import utility_export
+
+
+'''
+Function to load export options. Options not specified are set from defaults.
+:param args: ArgumentParser arguments parsed at program startup
+:return: A dict of export options.
+'''
+def LoadOptions(args):
+    options = dict(common.DefExportOptions)
+    if args.options:
+        with open(args.options, 'r') as file:
+            loaded = json.load(file)
+        # either a settings file of SpectralSkyViewer or just export options
+        loaded = loaded.get("ExportOptions", loaded)
+        options.update({key: loaded[key] for key in loaded if key in options})
+    options["Filename"] = args.file
+    options["Features"] = sorted(options["Features"])
+    return options
+
+'''
+Function to find all captures of a data directory that pass the filters specified to this script.
+:param args: ArgumentParser arguments parsed at program startup
+:return: A sorted list of capture (datetime) timestamps.
+'''
+def FindCaptures(args):
+    captures = []
+    dateDirs = utility.findFiles(args.directory, mode=2)
+    dateDirs[:] = [dir for dir in dateDirs if utility.verifyDateTime(os.path.basename(dir), "%Y-%m-%d")]
+    for datedir in sorted(dateDirs):
+        date = os.path.basename(datedir)
+        if (args.start and date < args.start) or (args.end and date > args.end):
+            continue
+        captures.extend(utility_data.findCaptureTimes(os.path.join(datedir, "HDR"), datetime.strptime(date, "%Y-%m-%d").date()))
+
+    # sky cover
+    if args.skycover:
+        skycover = common.SkyCover[args.skycover.upper()]
+        skycovers = utility_data.classifyCaptureSkyCovers(captures, common.SkyCoverData)
+        captures[:] = [c for c, sc in zip(captures, skycovers) if sc == skycover]
+    # solar altitude
+    if args.sunalt:
+        filtered = []
+        for c in captures:
+            altitude = utility_data.interpolateSunPosition(common.SPASiteData, c)[1]
+            if args.sunalt[0] <= altitude <= args.sunalt[1]:
+                filtered.append(c)
+        captures = filtered
+    return captures
+
+'''
+Function to initialize a worker process (data directory config is needed to export).
+:return: True if data directory config was loaded.
+'''
+def InitWorker(directory, cachedir, cachelimit, decodethreads):
+    common.AppSettings["DataDirectory"] = directory
+    common.AppSettings["PixelCacheDirectory"] = cachedir
+    common.AppSettings["PixelCacheLimit"] = cachelimit
+    common.AppSettings["ExportDecodeThreads"] = decodethreads
+    return utility_data.loadDataConfig()
+
+'''
+Function that computes the export rows of a single capture.
+:param task: Tuple of (data directory, capture, samples, exposures, photos, options).
+:return: A tuple of (capture, rows, error).
+'''
+def ExportTask(task):
+    directory, capture, samples, exposures, expphotos, options = task
+    try:
+        asdfiles = utility_data.findASDFiles(directory, capture)
+        if len(asdfiles) != len(common.SamplingPattern):
+            return capture, [], "Found " + str(len(asdfiles)) + " ASD files. Sample pattern should have " + str(len(common.SamplingPattern))
+        return capture, utility_export.computeExportRows(capture, samples, exposures, expphotos, asdfiles, options), None
+    except Exception as ex:
+        return capture, [], str(ex)
+
+'''
+Function to load the captures already exported, recorded in a checkpoint file by a previous (interrupted) export.
+The checkpoint is discarded if it was made with different export options, samples or exposure, or if it can't be trusted.
+:param checkpoint: Path to checkpoint file.
+:param header: First line of checkpoint, describing what is exported.
+:param valid: False if export file is missing or its index was rebuilt, so checkpoint can't be trusted.
+:return: A set of captures (str) already exported.
+'''
+def LoadCheckpoint(checkpoint, header, valid):
+    if not os.path.exists(checkpoint):
+        return set()
+    with open(checkpoint, 'r') as file:
+        lines = [line.strip() for line in file if len(line.strip()) > 0]
+    if not valid or len(lines) <= 0 or lines[0] != header:
+        print("Warning: Discarding checkpoint " + checkpoint + ", export file or what is exported changed since.")
+        os.unlink(checkpoint)
+        return set()
+    return set(lines[1:])
+
+'''
+Function that exports samples of all captures of a data directory.
+Captures are computed in parallel worker processes, and written to the export file (in capture order) by this process.
+Every capture written is recorded in a checkpoint file (<export file>.ckpt), so a job that is killed resumes at the
+next unprocessed capture when run again. Captures that failed are retried.
+If export options replace samples already exported (Duplicates is Replace), the old rows of every capture left to do are
+removed in one pass before any capture is exported (rewriting the file once, rather than once per capture). The file and
+its index stay in step, but if the job is killed (or a capture fails) those captures have no rows until run again.
+:param args: ArgumentParser arguments parsed at program startup
+'''
+def ExportAll(args):
+    print("Exporting samples of all captures in:\n" + args.directory)
+
+    # load data directory config
+    if not InitWorker(args.directory, args.pixelcache if args.pixelcache else "", args.pixelcachelimit, args.threads if args.threads else common.DefAppSettings["ExportDecodeThreads"]):
+        print("Error: Failed to load data config: " + os.path.join(args.directory, common.DefDataConfig["Filename"]))
+        sys.exit(2)
+    if len(common.SkyCoverData.warnings) > 0:
+        print("Warning: " + str(len(common.SkyCoverData.warnings)) + " problem(s) with sky cover assessments, first listed is used where they overlap (see ddircheck.py)")
+    options = LoadOptions(args)
+    exposure = args.exposure if args.exposure else common.Exposures[0]
+    samples = sorted(set(args.samples)) if args.samples else list(range(0, len(common.SamplingPattern)))
+    if any([s < 0 or s >= len(common.SamplingPattern) for s in samples]):
+        print("Error: Sample pattern indices must be 0 to " + str(len(common.SamplingPattern) - 1))
+        sys.exit(2)
+
+    # index of samples already in export file
+    index = utility_export.ExportIndex(args.file, options)
+    if not index.valid:
+        print("Error: " + args.file + " is not an export file (no Date and Time columns)")
+        sys.exit(2)
+    if index.rebuilt:
+        print("Rebuilt export index of " + args.file)
+    if len(index.warning()) > 0 and common.ExportDuplicates(options["Duplicates"]) != common.ExportDuplicates.Append:
+        print(index.warning())
+
+    # captures left to do
+    checkpoint = args.file + ".ckpt"
+    header = "#" + json.dumps({"options": index.optionsHash, "samples": samples, "exposure": exposure}, sort_keys=True)
+    done = LoadCheckpoint(checkpoint, header, os.path.exists(args.file) and not index.rebuilt)
+    captures = FindCaptures(args)
+    todo = [c for c in captures if str(c) not in done]
+    print("Found " + str(len(captures)) + " captures, " + str(len(captures) - len(todo)) + " already exported (" + checkpoint + ")")
+
+    # prepare tasks, skip or replace samples already in export file
+    duplicates = common.ExportDuplicates(options["Duplicates"])
+    tasks = []
+    tasksamples = {}
+    replace = []
+    for c in todo:
+        exposures, expphotos, error = utility_export.findExportPhotos(args.directory, c, exposure, options)
+        if error:
+            print(str(c) + ": " + error + " Skipping.")
+            continue
+        keys = {s: index.key(c, s, exposures) for s in samples}
+        pending = samples
+        if duplicates == common.ExportDuplicates.Skip:
+            pending = [s for s in samples if keys[s] not in index]
+        elif duplicates == common.ExportDuplicates.Replace:
+            replace.extend([keys[s] for s in samples if keys[s] in index])
+        if len(pending) > 0:
+            tasks.append((args.directory, c, pending, exposures, expphotos, options))
+            tasksamples[c] = [keys[s] for s in pending]
+    if len(replace) > 0:
+        print("Replacing " + str(index.remove(replace)) + " samples already exported (removed now, re-run if interrupted)")
+    if len(tasks) <= 0:
+        print("Nothing to export.")
+        if os.path.exists(checkpoint):
+            os.unlink(checkpoint)
+        return
+
+    # export
+    timer = time.time()
+    exported = 0
+    failed = 0
+    workers = args.workers if args.workers else multiprocessing.cpu_count()
+    threads = args.threads if args.threads else 1  # worker processes already keep every CPU busy
+    pool = multiprocessing.Pool(min(workers, len(tasks)), initializer=InitWorker, initargs=(args.directory, common.AppSettings["PixelCacheDirectory"], args.pixelcachelimit, threads)) if workers > 1 else None
+    try:
+        results = pool.imap(ExportTask, tasks) if pool else map(ExportTask, tasks)
+        newckpt = not os.path.exists(checkpoint)
+        with open(checkpoint, 'a') as ckpt:
+            if newckpt:
+                ckpt.write(header + "\n")
+            for i, (capture, rows, error) in enumerate(results):
+                if error:
+                    failed += 1
+                    print(str(capture) + ": Error: " + error)
+                else:
+                    utility_export.appendExportRows(args.file, options, index, tasksamples[capture], rows)
+                    exported += len(rows)
+                    ckpt.write(str(capture) + "\n")
+                    ckpt.flush()
+
+                # progress
+                elapsed = time.time() - timer
+                rate = (i + 1) / elapsed if elapsed > 0 else 0
+                eta = (len(tasks) - i - 1) / rate if rate > 0 else 0
+                print("[" + str(i + 1) + "/" + str(len(tasks)) + "] " + str(capture) + ": " + str(len(rows)) + " samples, " +
+                      "{0:.2f}".format(rate) + " captures/s, ETA " + "{0:.0f}".format(eta) + "s")
+    finally:
+        if pool:
+            pool.terminate()
+    # all done, nothing to resume (failed captures are retried by running again)
+    if failed <= 0 and os.path.exists(checkpoint):
+        os.unlink(checkpoint)
+    print("Exported " + str(exported) + " samples of " + str(len(tasks) - failed) + " captures (" + str(failed) + " failed) in " + "{0:.2f}".format(time.time() - timer) + "s")
+
+#---------------------------------------------------------------------
+
+def main():
+    # handle command line args
+    parser = argparse.ArgumentParser(description='Script to export samples of every capture of a sky data directory. Re-run the same command to resume an interrupted export.', formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_help = True
+    parser.add_argument('directory', help='a data directory (with config file) to export from')
+    parser.add_argument('file', help='export file (appended to if it exists)')
+    parser.add_argument('-x', '--options', dest='options', type=str, help='export options (.json), or settings file of SpectralSkyViewer')
+    parser.add_argument('-i', '--samples', dest='samples', type=int, nargs='+', help='sample pattern indices to export (default: all)')
+    parser.add_argument('-e', '--exposure', dest='exposure', type=float, help='exposure (seconds) to export if not HDR (default: first)')
+    parser.add_argument('-pc', '--pixelcache', dest='pixelcache', type=str, help='cache decoded photo pixels in this dir (speeds up repeated exports)')
+    parser.add_argument('-pl', '--pixelcachelimit', dest='pixelcachelimit', type=int, help='max size (MB) of pixel cache', default=common.DefAppSettings["PixelCacheLimit"])
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of worker processes (default: CPU count)')
+    parser.add_argument('-t', '--threads', dest='threads', type=int, help='number of exposure photos decoded at once per capture of HDR export\n(default: ' + str(common.DefAppSettings["ExportDecodeThreads"]) + ', or 1 per worker process)')
+    # filters
+    parser.add_argument('-ds', '--start', dest='start', type=str, help='export captures on or after date (YYYY-MM-DD)')
+    parser.add_argument('-de', '--end', dest='end', type=str, help='export captures on or before date (YYYY-MM-DD)')
+    parser.add_argument('-s', '--skycover', dest='skycover', type=str, choices=[sc.name for sc in common.SkyCover], help='export captures of sky cover')
+    parser.add_argument('-sa', '--sunalt', dest='sunalt', type=float, nargs=2, metavar=('MIN', 'MAX'), help='export captures w/ sun altitude in range')
+    args = parser.parse_args()
+
+    # directory required as parameter
+    if not args.directory or not os.path.exists(args.directory):
+        print("Error: data directory not found.")
+        sys.exit(2)
+
+    # do it
+    ExportAll(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,58 +4,203 @@
 # @author: Joe Del Rocco
 # @since: 06/25/2018
 # @summary: Script to search/tweak SpectralSkyViewer exported datasets.
+# @note: Export files are streamed in chunks (-c), loading only the columns needed, so memory stays bounded for any file size.
 # ====================================================================
 import sys
 import os
+import math
 import csv
 import argparse
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 
+MaxChunkValues = 5000000  # max number of values (rows x columns) read at a time
+
+
+'''
+Streaming per-wavelength statistics of spectral radiance, computed in a single pass over any number of samples.
+Mean and variance are merged chunk by chunk (Welford/Chan parallel algorithm). Percentiles come from a mergeable sketch,
+a histogram of logarithmically spaced buckets shared by all chunks, with a relative error of (Gamma-1)/2.
+'''
+class SpectrumSummary:
+
+    Gamma = 1.02            # bucket growth factor (~1% relative error)
+    MinValue = 1e-6         # values at or below this are counted in bucket 0
+    MaxValue = 1e3          # values above this are counted in the last bucket
+
+    def __init__(self, wavelengths):
+        self.count = 0
+        self.mean = np.zeros(wavelengths)
+        self.m2 = np.zeros(wavelengths)
+        self.min = np.full(wavelengths, np.inf)
+        self.max = np.full(wavelengths, -np.inf)
+        self.offset = int(math.floor(math.log(SpectrumSummary.MinValue, SpectrumSummary.Gamma)))
+        self.buckets = int(math.ceil(math.log(SpectrumSummary.MaxValue, SpectrumSummary.Gamma))) - self.offset + 1
+        self.sketch = np.zeros((wavelengths, self.buckets), dtype=np.int64)
+
+    '''
+    Merge a chunk of samples into the summary.
+    :param values: 2D numpy array of radiance, one row per sample, one column per wavelength.
+    '''
+    def add(self, values):
+        n = len(values)
+        if n <= 0:
+            return
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        delta = mean - self.mean
+        total = self.count + n
+        self.mean += delta * (n / total)
+        self.m2 += m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+        np.minimum(self.min, values.min(axis=0), out=self.min)
+        np.maximum(self.max, values.max(axis=0), out=self.max)
+
+        # bucket every value, then count buckets of all wavelengths at once
+        with np.errstate(divide='ignore', invalid='ignore'):
+            idx = np.ceil(np.log(np.maximum(values, SpectrumSummary.MinValue)) / math.log(SpectrumSummary.Gamma))
+        idx = np.clip(idx.astype(np.int64) - self.offset, 0, self.buckets - 1)
+        idx += np.arange(values.shape[1], dtype=np.int64) * self.buckets
+        self.sketch += np.bincount(idx.ravel(), minlength=self.sketch.size).reshape(self.sketch.shape)
+
+    def variance(self):
+        if self.count < 2:
+            return np.full(len(self.mean), np.nan)
+        return self.m2 / (self.count - 1)
+
+    '''
+    :param levels: List of percentiles (0-100).
+    :return: 2D numpy array of approximate percentiles, one row per level, one column per wavelength.
+    '''
+    def percentiles(self, levels):
+        result = np.zeros((len(levels), self.sketch.shape[0]))
+        if self.count <= 0:
+            return result
+        cumulative = np.cumsum(self.sketch, axis=1)
+        for i, q in enumerate(levels):
+            rank = max(1, int(math.ceil(q / 100.0 * self.count)))
+            bucket = (cumulative < rank).sum(axis=1)
+            value = 2.0 * SpectrumSummary.Gamma ** (bucket + self.offset) / (SpectrumSummary.Gamma + 1)
+            value[bucket == 0] = 0.0
+            result[i] = np.clip(value, self.min, self.max)
+        return result
+
+'''
+Function to read the column names of an export file.
+:param args: ArgumentParser arguments parsed at program startup
+:return: A list of column names. Also sets args.wavesidx, the index of the first wavelength column.
+'''
+def ReadHeader(args):
+    header = list(pd.read_csv(args.file, nrows=0).columns)
+    args.wavesidx = next((i for i, c in enumerate(header) if c.isdigit()), len(header))
+    return header
+
+'''
+Function to find the columns required by the filters specified to this script.
+:param args: ArgumentParser arguments parsed at program startup
+:return: A list of column names.
+'''
+def FilterColumns(args):
+    columns = []
+    if args.skycover is not None:
+        columns.append("SkyCover")
+    if args.start or args.end:
+        columns.append("Date")
+    if args.sunalt:
+        columns.append("SunAltitude")
+    if args.sunangle:
+        columns.append("SunPointAngle")
+    if args.index:
+        columns.append("SamplePatternIndex")
+    return columns
+
+'''
+Function to compute which rows of a chunk pass all filters specified to this script (combined w/ logical and).
+:param args: ArgumentParser arguments parsed at program startup
+:param chunk: DataFrame chunk with (at least) the filter columns.
+:return: A boolean numpy array, one per row.
+'''
+def FilterMask(args, chunk):
+    mask = np.ones(len(chunk), dtype=bool)
+    if args.skycover is not None:
+        mask &= pd.to_numeric(chunk["SkyCover"]).values == args.skycover
+    if args.start:
+        mask &= (chunk["Date"] >= args.start).values
+    if args.end:
+        mask &= (chunk["Date"] <= args.end).values
+    if args.sunalt:
+        values = pd.to_numeric(chunk["SunAltitude"]).values
+        mask &= (values >= args.sunalt[0]) & (values <= args.sunalt[1])
+    if args.sunangle:
+        values = pd.to_numeric(chunk["SunPointAngle"]).values
+        mask &= (values >= args.sunangle[0]) & (values <= args.sunangle[1])
+    if args.index:
+        mask &= np.isin(pd.to_numeric(chunk["SamplePatternIndex"]).values, args.index)
+    return mask
+
+'''
+Function to stream an export file in chunks, w/ filters applied.
+:param args: ArgumentParser arguments parsed at program startup
+:param columns: Columns to load (filter columns are added as needed). All columns are loaded if None.
+:param dtype: Column type(s), passed to pandas.read_csv().
+:return: A generator of DataFrame chunks, containing only rows that pass all filters.
+'''
+def ReadChunks(args, columns=None, dtype=None):
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(columns + FilterColumns(args)))
+    # bound number of values per chunk (not just rows), exports can have thousands of wavelength columns
+    ncols = len(usecols) if usecols is not None else len(ReadHeader(args))
+    chunksize = max(1, min(args.chunksize, MaxChunkValues // max(1, ncols)))
+    reader = pd.read_csv(args.file, usecols=usecols, dtype=dtype, chunksize=chunksize, keep_default_na=False)
+    for chunk in reader:
+        mask = FilterMask(args, chunk)
+        yield chunk if mask.all() else chunk[mask]
+
 def FindDuplicates(args):
-    samples = {}
-    with open(args.file, 'r') as f:
-        reader = csv.reader(f, delimiter=',')
-        header = next(reader, None)
-        args.wavesidx = header.index("350")
-        isi = header.index("SamplePatternIndex")
-        idt = header.index("Date")
-        itm = header.index("Time")
-        PrintRow(args, header)
-        for row in reader:
-            key = str(row[idt]) + " " + str(row[itm]) + " " + str(row[isi])
-            if key in samples:
-                #Log(args, samples[key])
-                PrintRow(args, row)
-            else:
-                samples[key] = row
-
-def FindBySky(args):
-    with open(args.file, 'r') as f:
-        reader = csv.reader(f, delimiter=',')
-        header = next(reader, None)
-        args.wavesidx = header.index("350")
-        isc = header.index("SkyCover")
-        if args.count:
-            n = 0
-            n = sum(1 for row in reader if int(row[isc]) == args.skycover)
-            print("Samples: " + str(n))
-        else:
-            PrintRow(args, header)
-            for row in reader:
-                if int(row[isc]) == args.skycover:
-                    PrintRow(args, row)
+    header = ReadHeader(args)
+    keys = ["Date", "Time", "SamplePatternIndex"]
+
+    # pass 1: hash key columns of every row, find the hashes seen more than once
+    hashes = [pd.util.hash_pandas_object(chunk[keys], index=False).values for chunk in ReadChunks(args, keys, dtype=str)]
+    hashes = np.concatenate(hashes) if len(hashes) > 0 else np.zeros(0, dtype=np.uint64)
+    values, counts = np.unique(hashes, return_counts=True)
+    dups = set(values[counts > 1].tolist())
+    del hashes, values, counts
+
+    # pass 2: print every occurrence after the first of duplicated keys
+    PrintRow(args, header)
+    if len(dups) <= 0:
+        return
+    seen = set()
+    columns = PrintColumns(args, header)
+    for chunk in ReadChunks(args, columns, dtype=str):
+        chunkhashes = pd.util.hash_pandas_object(chunk[keys], index=False).values
+        rows = []
+        for i, h in enumerate(chunkhashes.tolist()):
+            if h in dups:
+                if h in seen:
+                    rows.append(i)
+                else:
+                    seen.add(h)
+        PrintChunk(chunk.iloc[rows], columns)
+
+def FindRows(args):
+    header = ReadHeader(args)
+    if args.count:
+        print("Samples: " + str(sum(len(chunk) for chunk in ReadChunks(args, header[0:1]))))
+        return
+    PrintRow(args, header)
+    columns = PrintColumns(args, header)
+    for chunk in ReadChunks(args, columns, dtype=str):
+        PrintChunk(chunk, columns)
 
 def DataDistribution(args):
-    values = []
-    with open(args.file, 'r') as f:
-        reader = csv.reader(f, delimiter=',')
-        header = next(reader, None)
-        idx = header.index(args.variance)
-        for row in reader:
-            values.append(float(row[idx]))
+    values = [chunk[args.variance].values for chunk in ReadChunks(args, [args.variance], dtype={args.variance: np.float64})]
+    values = np.concatenate(values) if len(values) > 0 else np.zeros(0)
 
     variance = np.var(values, ddof=1)
     stddev = np.std(values, ddof=1)
@@ -68,13 +213,60 @@ def DataDistribution(args):
     plt.savefig('dist_'+args.variance, dpi=600, bbox_inches='tight')
     plt.close(fig)
 
-def CountSamples(args):
-    n = 0
-    with open(args.file, 'r') as f:
-        reader = csv.reader(f, delimiter=',')
-        next(reader, None)
-        n = sum(1 for row in reader)
-    print("Samples: " + str(n))
+def Summarize(args):
+    header = ReadHeader(args)
+    waves = header[args.wavesidx:]
+    if len(waves) <= 0:
+        print("Error: data file has no radiance (wavelength) columns.")
+        sys.exit(2)
+    groupcol = None
+    if args.groupby == "skycover":
+        groupcol = "SkyCover"
+    elif args.groupby == "sunalt":
+        groupcol = "SunAltitude"
+    if groupcol and groupcol not in header:
+        print("Error: data file does not have column to group by: " + groupcol)
+        sys.exit(2)
+
+    # stream samples into one summary per group
+    summaries = {}
+    columns = waves + ([groupcol] if groupcol else [])
+    dtype = {c: np.float64 for c in columns}
+    for chunk in ReadChunks(args, columns, dtype=dtype):
+        values = chunk[waves].values.astype(np.float64)
+        if groupcol is None:
+            keys = np.zeros(len(chunk))
+        elif groupcol == "SunAltitude":
+            keys = np.floor(chunk[groupcol].values / args.altbin) * args.altbin
+        else:
+            keys = chunk[groupcol].values
+        for key in np.unique(keys):
+            if key not in summaries:
+                summaries[key] = SpectrumSummary(len(waves))
+            summaries[key].add(values[keys == key])
+
+    # print and save
+    groups = sorted(summaries.keys())
+    for key in groups:
+        label = "all" if groupcol is None else groupcol + " " + str(key)
+        print(label + ": " + str(summaries[key].count) + " samples")
+    np.savez_compressed(args.summary,
+                        wavelengths=np.array([int(w) for w in waves]),
+                        groupby=np.array(groupcol if groupcol else ""),
+                        groups=np.array(groups, dtype=np.float64),
+                        count=np.array([summaries[k].count for k in groups], dtype=np.int64),
+                        mean=np.array([summaries[k].mean for k in groups]),
+                        var=np.array([summaries[k].variance() for k in groups]),
+                        min=np.array([summaries[k].min for k in groups]),
+                        max=np.array([summaries[k].max for k in groups]),
+                        levels=np.array(args.levels, dtype=np.float64),
+                        percentiles=np.array([summaries[k].percentiles(args.levels) for k in groups]))
+    print("Summary written to: " + args.summary)
+
+def PrintColumns(args, header):
+    if args.hidewaves:
+        return header[0:args.wavesidx]
+    return header
 
 def PrintRow(args, row):
     if args.hidewaves:
@@ -82,18 +274,35 @@ def PrintRow(args, row):
     else:
         print(*row, sep=',')
 
+def PrintChunk(chunk, columns):
+    if len(chunk) <= 0:
+        return
+    # csv module rather than DataFrame.to_csv, whose line terminator argument was renamed across pandas versions
+    csv.writer(sys.stdout, lineterminator='\n').writerows(chunk[columns].values.tolist())
+
 #---------------------------------------------------------------------
 
 def main():
     # handle command line args
-    parser = argparse.ArgumentParser(description='Script to search/tweak SpectralSkyViewer exported datasets. This script does not make any changes to the original file. All results are written to standard out.', formatter_class=argparse.RawTextHelpFormatter)
+    parser = argparse.ArgumentParser(description='Script to search/tweak SpectralSkyViewer exported datasets. This script does not make any changes to the original file. All results are written to standard out.\nFilters (-s, -ds, -de, -sa, -sp, -i) can be combined, and apply to all operations.', formatter_class=argparse.RawTextHelpFormatter)
     parser.add_help = True
     parser.add_argument('file', help='a sky data export file')
     parser.add_argument('-w', '--hidewaves', dest='hidewaves', action='store_true', help='hide wavelength data (easier to read)')
     parser.add_argument('-n', '--count', dest='count', action='store_true', help='count number of samples')
     parser.add_argument('-d', '--dups', dest='dups', action='store_true', help='find duplicates')
-    parser.add_argument('-s', '--skycover', dest='skycover', type=int, help='find data by skycover')
     parser.add_argument('-v', '--variance', dest='variance', type=str, help='compute variance, stddev, distibution')
+    parser.add_argument('-m', '--summary', dest='summary', type=str, help='write per-wavelength statistics (count, mean, var, min, max, percentiles) to this file (.npz)')
+    parser.add_argument('-g', '--groupby', dest='groupby', type=str, choices=['skycover', 'sunalt'], help='summary per sky cover or per sun altitude bin')
+    parser.add_argument('-gb', '--altbin', dest='altbin', type=float, help='sun altitude bin size (degrees) of summary', default=15)
+    parser.add_argument('-q', '--levels', dest='levels', type=float, nargs='+', help='percentiles of summary', default=[5, 25, 50, 75, 95])
+    parser.add_argument('-c', '--chunksize', dest='chunksize', type=int, help='max number of rows read at a time', default=100000)
+    # filters
+    parser.add_argument('-s', '--skycover', dest='skycover', type=int, help='find data by skycover')
+    parser.add_argument('-ds', '--start', dest='start', type=str, help='find data captured on or after date (YYYY-MM-DD)')
+    parser.add_argument('-de', '--end', dest='end', type=str, help='find data captured on or before date (YYYY-MM-DD)')
+    parser.add_argument('-sa', '--sunalt', dest='sunalt', type=float, nargs=2, metavar=('MIN', 'MAX'), help='find data by sun altitude range')
+    parser.add_argument('-sp', '--sunangle', dest='sunangle', type=float, nargs=2, metavar=('MIN', 'MAX'), help='find data by sun point angle range')
+    parser.add_argument('-i', '--index', dest='index', type=int, nargs='+', help='find data by sample pattern index(es)')
     args = parser.parse_args()
 
     # file required as parameter
@@ -104,16 +313,21 @@ def main():
     elif not os.path.exists(args.file):
         print("Error: data file not found: '" + args.file + "'")
         sys.exit(2)
+    # filter columns must be in file
+    missing = [c for c in FilterColumns(args) if c not in ReadHeader(args)]
+    if len(missing) > 0:
+        print("Error: data file does not have column(s) to filter by: " + ", ".join(missing))
+        sys.exit(2)
 
     # do it
-    if args.dups:
+    if args.summary:
+        Summarize(args)
+    elif args.dups:
         FindDuplicates(args)
-    elif args.skycover:
-        FindBySky(args)
     elif args.variance:
         DataDistribution(args)
-    elif args.count:
-        CountSamples(args)
+    elif args.count or len(FilterColumns(args)) > 0:
+        FindRows(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: Script to replay a recorded interaction trace of SpectralSkyViewer headless, and report latencies.
+# ====================================================================
+import sys
+import os
+import json
+import argparse
+import time
+import tempfile
+import statistics
+# no window needed, unless specified otherwise
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtCore import Qt, QPoint, QPointF, QEvent
+from PyQt5.QtGui import QMouseEvent, QWheelEvent
+from PyQt5.QtWidgets import QApplication, QAction, QMessageBox
+# we need our utilities (and the viewer, which expects to run from its own directory)
+RootDir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, RootDir)
+import common
+import utility_timing
+
+
+'''
+Function to load an interaction trace recorded by SpectralSkyViewer (Help -> Record Interactions).
+:param filepath: Path to trace file.
+:return: A dict of trace ("datadir", "window", "events").
+'''
+def LoadTrace(filepath):
+    with open(filepath, 'r') as file:
+        trace = json.load(file)
+    if (trace.get("version", 0) != 1):
+        print("Error: Unsupported trace version: " + str(trace.get("version")))
+        sys.exit(2)
+    return trace
+
+'''
+Function to create a SpectralSkyViewer for replay. Settings are not loaded or saved, and message boxes are printed.
+:param datadir: Data directory to load.
+:param window: [width, height] of window.
+:return: The viewer.
+'''
+def CreateViewer(datadir, window):
+    # message boxes would block a headless replay
+    def printMessage(parent, title, text, *args, **kwargs):
+        print(title + ": " + text)
+        return QMessageBox.Ok
+    QMessageBox.critical = printMessage
+    QMessageBox.warning = printMessage
+    QMessageBox.information = printMessage
+
+    os.chdir(RootDir)
+    common.AppSettings["Filename"] = os.path.join(tempfile.gettempdir(), "spectralskyviewer-replay-nonexistent.json")
+    from spectralskyviewer import SpectralSkyViewer
+    viewer = SpectralSkyViewer()
+    viewer.dontSaveSettings = True
+    viewer.resize(window[0], window[1])
+    viewer.show()
+    common.AppSettings["DataDirectory"] = datadir
+    viewer.loadData()
+    return viewer
+
+'''
+Function to replay a single interaction event.
+:param viewer: The SpectralSkyViewer.
+:param event: Recorded event.
+:return: True if replayed, False if event couldn't be replayed (e.g. date missing from data directory).
+'''
+def ReplayEvent(viewer, event):
+    kind = event["event"]
+    if (kind == "date"):
+        index = viewer.cbxDate.findText(event["date"])
+        if (index < 0):
+            return False
+        if (index == viewer.cbxDate.currentIndex()):
+            viewer.dateSelected(index)
+        else:
+            viewer.cbxDate.setCurrentIndex(index)
+    elif (kind == "time"):
+        index = event["index"]
+        if (index < 0 or index > viewer.sldTime.maximum()):
+            return False
+        if (index == viewer.sldTime.value()):
+            viewer.sldTime.valueChanged.emit(index)
+        else:
+            viewer.sldTime.setValue(index)
+    elif (kind == "timeline"):
+        viewer.timelineSelected(event["index"])
+    elif (kind == "exposure"):
+        index = event["index"] + 1  # because combobox first element is not a valid value
+        if (index < 1 or index >= viewer.cbxExposure.count()):
+            return False
+        if (index == viewer.cbxExposure.currentIndex()):
+            viewer.exposureSelected(index)
+        else:
+            viewer.cbxExposure.setCurrentIndex(index)
+    elif (kind == "wheel"):
+        fisheye = viewer.wgtFisheye
+        center = QPointF(fisheye.viewCenter[0], fisheye.viewCenter[1])
+        wheel = QWheelEvent(center, fisheye.mapToGlobal(center.toPoint()), QPoint(0, 0), QPoint(0, event["delta"]), Qt.NoButton, Qt.NoModifier, Qt.NoScrollPhase, False)
+        QApplication.sendEvent(fisheye, wheel)
+    elif (kind == "select"):
+        fisheye = viewer.wgtFisheye
+        start = QPointF(*fisheye.viewPoint(event["start"]))
+        end = QPointF(*fisheye.viewPoint(event["end"]))
+        modifiers = Qt.KeyboardModifiers(event["modifiers"])
+        QApplication.sendEvent(fisheye, QMouseEvent(QEvent.MouseButtonPress, start, Qt.LeftButton, Qt.LeftButton, modifiers))
+        QApplication.sendEvent(fisheye, QMouseEvent(QEvent.MouseMove, end, Qt.NoButton, Qt.LeftButton, modifiers))
+        QApplication.sendEvent(fisheye, QMouseEvent(QEvent.MouseButtonRelease, end, Qt.LeftButton, Qt.NoButton, modifiers))
+    elif (kind == "samples"):
+        viewer.selectSamples(event["message"])
+    elif (kind == "toggle"):
+        actions = [a for a in viewer.findChildren(QAction) if a.text() == event["action"]]
+        if (len(actions) <= 0):
+            return False
+        if (actions[0].isChecked() != event["state"]):
+            actions[0].trigger()
+    else:
+        return False
+    return True
+
+'''
+Function to summarize latencies.
+:param latencies: List of latencies (seconds).
+:return: A dict of latency stats (milliseconds).
+'''
+def Summarize(latencies):
+    ms = sorted([l * 1000 for l in latencies])
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    return {"count": len(ms), "mean": statistics.mean(ms), "p50": statistics.median(ms), "p95": p95, "max": ms[-1]}
+
+'''
+Function to replay an interaction trace and report latency of every kind of event.
+Each event is replayed as fast as possible. Latency is measured from the event until all events it caused (e.g. repaints)
+have been processed. Timing spans of the viewer (see utility_timing) are collected as well.
+:param args: ArgumentParser arguments parsed at program startup
+:return: A dict of results.
+'''
+def Replay(args):
+    trace = LoadTrace(args.trace)
+    datadir = os.path.abspath(args.datadir) if args.datadir else trace["datadir"]
+    if (not os.path.exists(datadir)):
+        print("Error: data directory not found: " + datadir)
+        sys.exit(2)
+    print("Replaying " + str(len(trace["events"])) + " interactions " + str(args.repeat) + "x on:\n" + datadir)
+
+    app = QApplication(sys.argv)
+    viewer = CreateViewer(datadir, args.window if args.window else trace["window"])
+    app.processEvents()
+    utility_timing.Window = 100000  # keep every timing
+    utility_timing.reset()
+    utility_timing.enable(True)     # after viewer, which enables per its settings
+
+    latencies = {}
+    skipped = 0
+    start = time.perf_counter()
+    for r in range(0, args.repeat):
+        for event in trace["events"]:
+            timer = time.perf_counter()
+            replayed = ReplayEvent(viewer, event)
+            app.processEvents()
+            if (not replayed):
+                skipped += 1
+                continue
+            latencies.setdefault(event["event"], []).append(time.perf_counter() - timer)
+    elapsed = time.perf_counter() - start
+
+    # done, let background work (thumbnails) finish before quitting
+    viewer.wgtTimeline.pool.waitForDone()
+    viewer.close()
+
+    results = {
+        "trace": os.path.abspath(args.trace),
+        "datadir": datadir,
+        "repeat": args.repeat,
+        "elapsed": elapsed,
+        "skipped": skipped,
+        "events": {kind: Summarize(l) for kind, l in sorted(latencies.items())},
+        "spans": {name: Summarize(list(stats.timings)) for name, stats in sorted(utility_timing.Spans.items())}
+    }
+    return results
+
+'''
+Function to print results as tables.
+:param results: Results of Replay.
+'''
+def PrintResults(results):
+    for section in ["events", "spans"]:
+        print("")
+        print("{0:<34} {1:>7} {2:>9} {3:>9} {4:>9} {5:>9}".format(section, "count", "mean ms", "p50 ms", "p95 ms", "max ms"))
+        for name, s in results[section].items():
+            print("{0:<34} {1:>7} {2:>9.2f} {3:>9.2f} {4:>9.2f} {5:>9.2f}".format(name, s["count"], s["mean"], s["p50"], s["p95"], s["max"]))
+    print("")
+    print("Replayed in " + "{0:.2f}".format(results["elapsed"]) + "s, " + str(results["skipped"]) + " interactions skipped")
+
+#---------------------------------------------------------------------
+
+def main():
+    # handle command line args
+    parser = argparse.ArgumentParser(description='Script to replay an interaction trace recorded by SpectralSkyViewer (Help -> Record Interactions) w/out a display, reporting the latency of each kind of interaction.', formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_help = True
+    parser.add_argument('trace', help='interaction trace file (.json)')
+    parser.add_argument('-d', '--datadir', dest='datadir', type=str, help='data directory to replay against (default: the one recorded)')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, help='number of times to replay trace', default=1)
+    parser.add_argument('-s', '--window', dest='window', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help='window size (default: the one recorded)')
+    parser.add_argument('-o', '--output', dest='output', type=str, help='write results to this file (.json)')
+    args = parser.parse_args()
+
+    # trace required as parameter
+    if (not args.trace or not os.path.exists(args.trace)):
+        print("Error: trace file not found.")
+        sys.exit(2)
+    args.trace = os.path.abspath(args.trace)
+    if (args.output):
+        args.output = os.path.abspath(args.output)
+
+    # do it
+    results = Replay(args)
+    PrintResults(results)
+    if (args.output):
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+        print("Results written to: " + args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,20 +8,22 @@
 import sys
 import os
 import json
-import csv
-import math
+import copy
+import time
 from datetime import datetime
-from PyQt5.QtCore import Qt, QDir
+from PyQt5.QtCore import Qt, QDir, QTimer, QThreadPool
 from PyQt5.QtGui import QIcon, QFont
 from PyQt5.QtWidgets import *
 import pyqtgraph as pg
-from colormath.color_objects import sRGBColor, HSVColor, HSLColor, LabColor
-from colormath.color_conversions import convert_color
 import common
 import utility
 import utility_data
 import utility_angles
+import utility_export
+import utility_timing
 from view_fisheye import ViewFisheye
+from view_timeline import ViewTimeline
+from task_export import ExportSignals, ExportTask
 from dialog_export import DialogExport
 from dialog_converter import DialogConverter
 from dialog_slider import DialogSlider
@@ -36,11 +38,21 @@ class SpectralSkyViewer(QMainWindow):
         self.capture = datetime.min
         self.captureTimeHDRDirs = []   # some number of these per day
         self.captureTimeASDFiles = []  # length should be equal to sampling pattern length
+        self.graphCurves = {}          # sample index -> plotted radiance curve
         self.exposure = 0
         self.dontSaveSettings = False
+        self.trace = None              # interactions recorded (see toggleRecording), None if not recording
+        self.traceStart = 0
+        self.traceFile = ""
+        self.traceMuted = False        # don't record interactions caused by another recorded interaction
+        self.exportTasks = []          # exports running or waiting (see startExport)
+        self.exportIndex = None        # index of last export file, reused by next export (see utility_export.ExportIndex)
+        self.exportPool = QThreadPool()
+        self.exportPool.setMaxThreadCount(1)
 
         # load application settings
         utility_data.loadAppSettings()
+        utility_timing.enable(common.AppSettings["ShowTimings"])
 
         # init
         QToolTip.setFont(QFont('SansSerif', 8))
@@ -52,6 +64,9 @@ class SpectralSkyViewer(QMainWindow):
         self.setWindowTitle("SpectralSkyViewer")
         self.setWindowIcon(QIcon('img/icon.png'))
         self.statusBar().showMessage('Ready')
+        self.lblTimings = QLabel()
+        self.lblTimings.setVisible(common.AppSettings["ShowTimings"])
+        self.statusBar().addPermanentWidget(self.lblTimings)
         if common.AppSettings["ShowStatusBar"]:
             self.statusBar().show()
         else:
@@ -83,6 +98,20 @@ class SpectralSkyViewer(QMainWindow):
         self.actStatusBar.setChecked(common.AppSettings["ShowStatusBar"])
         self.actStatusBar.setStatusTip('Toggle display of status bar')
         self.actStatusBar.triggered.connect(self.toggleStatusBar)
+        self.actTimeline = QAction(QIcon(), 'Show &Timeline', self)
+        self.actTimeline.setCheckable(True)
+        self.actTimeline.setChecked(common.AppSettings["ShowTimeline"])
+        self.actTimeline.setStatusTip('Toggle display of capture timeline thumbnails')
+        self.actTimeline.triggered.connect(self.toggleTimeline)
+        self.actTimings = QAction(QIcon(), 'Show Ti&mings', self)
+        self.actTimings.setCheckable(True)
+        self.actTimings.setChecked(common.AppSettings["ShowTimings"])
+        self.actTimings.setStatusTip('Toggle timing of loading and drawing (shown in HUD and status bar)')
+        self.actTimings.triggered.connect(self.toggleTimings)
+        self.actDumpTimings = QAction(QIcon(), '&Dump Timings', self)
+        self.actDumpTimings.setEnabled(common.AppSettings["ShowTimings"])
+        self.actDumpTimings.setStatusTip('Append timings collected so far to ' + common.AppSettings["TimingsFilename"])
+        self.actDumpTimings.triggered.connect(self.dumpTimings)
         self.actHUD = QAction(QIcon(), 'Show &HUD', self)
         self.actHUD.setCheckable(True)
         self.actHUD.setChecked(common.AppSettings["ShowHUD"])
@@ -138,9 +167,6 @@ class SpectralSkyViewer(QMainWindow):
         self.actPixelGaussian.setCheckable(True)
         self.actPixelGaussian.setStatusTip('Apply Gaussian weighting to pixels')
         self.actPixelGaussian.triggered.connect(lambda: self.togglePixelOptions(self.actPixelGaussian))
-        self.actGraphRes = QAction(QIcon(), 'Graph Resolution', self)
-        self.actGraphRes.setStatusTip('Specify radiance graph resolution')
-        self.actGraphRes.triggered.connect(lambda: self.toggleGraphOptions(self.actGraphRes))
         self.actGraphLine = QAction(QIcon(), 'Graph Line Thickness', self)
         self.actGraphLine.setStatusTip('Specify radiance graph line thickness')
         self.actGraphLine.triggered.connect(lambda: self.toggleGraphOptions(self.actGraphLine))
@@ -197,6 +223,11 @@ class SpectralSkyViewer(QMainWindow):
         actDontSave.setChecked(False)
         actDontSave.setStatusTip('Use this to prevent the application from stomping your settings')
         actDontSave.triggered.connect(self.toggleDontSave)
+        self.actRecord = QAction(QIcon(), '&Record Interactions', self)
+        self.actRecord.setCheckable(True)
+        self.actRecord.setChecked(False)
+        self.actRecord.setStatusTip('Record date, time, exposure, selection and view changes to a trace file (see res/replay.py)')
+        self.actRecord.triggered.connect(self.toggleRecording)
 
         # menubar
         menubar = self.menuBar()
@@ -207,6 +238,9 @@ class SpectralSkyViewer(QMainWindow):
         menu = menubar.addMenu('&View')
         menu.addAction(self.actEXIF)
         menu.addAction(self.actStatusBar)
+        menu.addAction(self.actTimeline)
+        menu.addAction(self.actTimings)
+        menu.addAction(self.actDumpTimings)
         menu.addSeparator()
         menu.addAction(self.actHUD)
         menu.addAction(self.actMask)
@@ -223,7 +257,6 @@ class SpectralSkyViewer(QMainWindow):
         submenu.addAction(self.actPixelMedian)
         submenu.addAction(self.actPixelGaussian)
         menu.addSeparator()
-        menu.addAction(self.actGraphRes)
         menu.addAction(self.actGraphLine)
         menu.addSeparator()
         menu.addAction(self.actHUDTextScale)
@@ -241,6 +274,12 @@ class SpectralSkyViewer(QMainWindow):
         menu = menubar.addMenu('&Help')
         menu.addAction(actAbout)
         menu.addAction(actDontSave)
+        menu.addAction(self.actRecord)
+
+        # record view toggles
+        for act in [self.actEXIF, self.actStatusBar, self.actTimeline, self.actHUD, self.actMask, self.actCompass,
+                    self.actLensWarp, self.actSunPath, self.actSamples, self.actShadows, self.actUVGrid]:
+            act.triggered.connect(lambda state, a=act: self.recordInteraction("toggle", action=a.text(), state=state))
 
         # # toolbar
         # toolbar = self.addToolBar('Toolbar')
@@ -270,6 +309,12 @@ class SpectralSkyViewer(QMainWindow):
         self.sldTime.setTickInterval(1)
         self.sldTime.setPageStep(1)
         self.sldTime.valueChanged.connect(self.timeSelected)
+        self.cbxDate.activated.connect(lambda index: self.recordInteraction("date", date=self.cbxDate.itemText(index)))
+        self.cbxTime.activated.connect(lambda index: self.recordInteraction("time", index=index - 1))
+        self.cbxExposure.activated.connect(lambda index: self.recordInteraction("exposure", index=index - 1))
+        self.sldTime.actionTriggered.connect(lambda action: self.recordInteraction("time", index=self.sldTime.sliderPosition()))
+        self.wgtTimeline = ViewTimeline(self)
+        self.wgtTimeline.setVisible(common.AppSettings["ShowTimeline"])
         gridData = QGridLayout()
         #gridData.setVerticalSpacing(5)
         #gridData.setHorizontalSpacing(5)
@@ -281,6 +326,7 @@ class SpectralSkyViewer(QMainWindow):
         gridData.addWidget(self.cbxTime, 1, 1)
         gridData.addWidget(self.cbxExposure, 1, 2)
         gridData.addWidget(self.sldTime, 1, 3)
+        gridData.addWidget(self.wgtTimeline, 2, 0, 1, 4)
         pnlData = QWidget()
         pnlData.setLayout(gridData)
 
@@ -381,11 +427,12 @@ class SpectralSkyViewer(QMainWindow):
         self.cbxTime.clear()
         self.cbxTime.addItem("-time-")
         self.sldTime.setRange(0, 0)
+        self.wgtTimeline.setCaptures([], -1)
         self.tblEXIF.clearContents()
         self.wgtFisheye.setPhoto(None)
         self.wgtFisheye.resetRotation()
         self.wgtFisheye.repaint()
-        self.wgtGraph.clear()
+        self.clearGraph()
         self.resetGraph()
 
     def resetViewPressed(self):
@@ -409,6 +456,10 @@ class SpectralSkyViewer(QMainWindow):
         #                         minYRange=0.05, maxYRange=YAxisMax-YAxisMin)
         self.wgtGraph.getPlotItem().getAxis('left').enableAutoSIPrefix(enable=False)
         self.wgtGraph.getPlotItem().getAxis('bottom').enableAutoSIPrefix(enable=False)
+        # curves keep full resolution spectra, but only render a min/max (peak) decimated view of the visible
+        # wavelength range sized to the plot's pixel width, refining as the user zooms in
+        self.wgtGraph.getPlotItem().setClipToView(True)
+        self.wgtGraph.getPlotItem().setDownsampling(auto=True, mode='peak')
         #self.wgtGraph.setAspectLocked(True, None)
 
     def loadData(self):
@@ -429,12 +480,15 @@ class SpectralSkyViewer(QMainWindow):
         self.exposure = -1
         self.sldTime.setRange(0, 0)
         self.tblEXIF.clearContents()
-        self.wgtGraph.clear()
+        self.clearGraph()
         self.resetGraph()
 
         # load data directory configuration
         if not utility_data.loadDataConfig():
             QMessageBox.critical(self, "Error", "Data directory config.json file did not load properly. This is a problem. Double-check the config file to make sure it is accurate, and then reload the data directory.", QMessageBox.Ok)
+        elif len(common.SkyCoverData.warnings) > 0:
+            warnings = common.SkyCoverData.warnings
+            QMessageBox.warning(self, "Warning", "Data directory config.json has " + str(len(warnings)) + " problem(s) with sky cover assessments. Where assessments overlap, the first listed is used.\n\n" + "\n".join(warnings[:10]), QMessageBox.Ok)
 
         # add exposures to GUI
         self.cbxExposure.addItems([str(x) for x in common.Exposures])
@@ -458,6 +512,7 @@ class SpectralSkyViewer(QMainWindow):
             common.AppSettings["DataDirectory"] = directory
             self.loadData()
 
+    @utility_timing.timed("dateSelected")
     def dateSelected(self, index):
         if index < 0 or index >= self.cbxDate.count():
             return
@@ -475,8 +530,9 @@ class SpectralSkyViewer(QMainWindow):
             return
 
         # find all capture time dirs
-        self.captureTimeHDRDirs = utility.findFiles(pathHDR, mode=2)
-        self.captureTimeHDRDirs[:] = [dir for dir in self.captureTimeHDRDirs if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
+        with utility_timing.span("dateSelected.findCaptures"):
+            self.captureTimeHDRDirs = utility.findFiles(pathHDR, mode=2)
+            self.captureTimeHDRDirs[:] = [dir for dir in self.captureTimeHDRDirs if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
         if len(self.captureTimeHDRDirs) <= 0:
             QMessageBox.critical(self, "Error", "No HDR capture folders found.\nFormat is time of capture (e.g. 08.57.23).", QMessageBox.Ok)
             return
@@ -490,9 +546,9 @@ class SpectralSkyViewer(QMainWindow):
         #data = utility_data.loadSPASiteData(pathDate) # reload site info per date directory if exists
         #if data != None:
         #    common.SPASiteData = data
-        utility_data.fillSPADateTime(common.SPASiteData, self.capture)
-        sunpath = utility_data.computeSunPath(common.SPASiteData)
-        self.wgtFisheye.setSunPath(sunpath)
+        with utility_timing.span("dateSelected.sunPath"):
+            ephemeris = utility_data.findSolarEphemeris(common.SPASiteData, self.capture.date())
+            self.wgtFisheye.setSunPath(ephemeris.path(), (ephemeris.sunrise, ephemeris.transit, ephemeris.sunset))
 
         # update datetime panel
         self.cbxTime.blockSignals(True) # prevent calling event handlers until we're ready
@@ -507,6 +563,8 @@ class SpectralSkyViewer(QMainWindow):
         self.cbxTime.blockSignals(False)
         self.sldTime.blockSignals(False)
         self.cbxExposure.blockSignals(False) # ok, we're ready
+        with utility_timing.span("dateSelected.timeline"):
+            self.wgtTimeline.setCaptures(self.captureTimeHDRDirs, self.exposure)
 
         # trigger event for selecting first capture time
         self.sldTime.valueChanged.emit(0)
@@ -514,13 +572,13 @@ class SpectralSkyViewer(QMainWindow):
         # reset sample selection
         self.wgtFisheye.selectSamples("none")
 
+    @utility_timing.timed("timeSelected")
     def timeSelected(self, index):
         if index < 0 or index >= self.cbxTime.count():
             return
 
         # reset
         self.captureTimeASDFiles = []
-        self.wgtGraph.clear()
 
         # get sender of event
         # both capture time choicebox and slider route to this event handler, so we need to know who sent the event
@@ -532,21 +590,25 @@ class SpectralSkyViewer(QMainWindow):
         if index < 0 or self.exposure < 0 or len(self.captureTimeHDRDirs) <= 0:
             self.wgtFisheye.setPhoto(None)
             self.wgtFisheye.repaint()
+            self.clearGraph()
             return
 
         # At this point we are assuming the photos are sorted (increasing) by exposure time!!!
         # TODO: A safer method would be to gather all EXIF DateTimeOriginal fields and sort manually
 
         # gather all exposure photos taken at time selected
-        photos = utility.findFiles(self.captureTimeHDRDirs[index], mode=1, ext=["jpg"])
+        with utility_timing.span("timeSelected.findPhotos"):
+            photos = utility.findFiles(self.captureTimeHDRDirs[index], mode=1, ext=["jpg"])
         if len(photos) <= 0:
             self.log("Error: No photos found in:\n" + self.captureTimeHDRDirs[index])
+            self.clearGraph()
             return
 
         # is there a photo for the currently selected exposure?
         if self.exposure >= len(photos):
             self.wgtFisheye.setPhoto(None)
             self.wgtFisheye.repaint()
+            self.clearGraph()
             return
 
         # cache capture datetime
@@ -556,7 +618,8 @@ class SpectralSkyViewer(QMainWindow):
         self.statusBar().showMessage("Capture: " + str(self.capture) + ", Exposure: " + str(common.Exposures[self.exposure]) + "s")
 
         # extract EXIF data from photo
-        exif = utility_data.imageEXIF(photos[self.exposure])
+        with utility_timing.span("timeSelected.exif"):
+            exif = utility_data.imageEXIF(photos[self.exposure])
         #exif = {k: v for k, v in exif.items() if k.startswith("EXIF")} # filter down to EXIF tags only
 
         # update datetime panel
@@ -570,117 +633,133 @@ class SpectralSkyViewer(QMainWindow):
             self.cbxTime.blockSignals(True)       # prevent calling this event handler again
             self.cbxTime.setCurrentIndex(index+1) # because combobox first element is not a valid value
             self.cbxTime.blockSignals(False)
+        self.wgtTimeline.setCurrentCapture(index)
 
         # exif panel
-        self.tblEXIF.setRowCount(len(exif.keys()))
-        row = 0
-        for key in sorted(exif.keys()):
-            self.tblEXIF.setItem(row, 0, QTableWidgetItem(str(key)))
-            self.tblEXIF.setItem(row, 1, QTableWidgetItem(str(exif[key])))
-            row += 1
-        self.tblEXIF.resizeColumnToContents(0)
+        with utility_timing.span("timeSelected.exifPanel"):
+            self.tblEXIF.setRowCount(len(exif.keys()))
+            row = 0
+            for key in sorted(exif.keys()):
+                self.tblEXIF.setItem(row, 0, QTableWidgetItem(str(key)))
+                self.tblEXIF.setItem(row, 1, QTableWidgetItem(str(exif[key])))
+                row += 1
+            self.tblEXIF.resizeColumnToContents(0)
 
         # render pane
-        utility_data.fillSPADateTime(common.SPASiteData, self.capture)
-        sunpos = utility_data.computeSunPosition(common.SPASiteData)
-        self.wgtFisheye.setSunPosition(sunpos)
+        with utility_timing.span("timeSelected.sun"):
+            sunpos = utility_data.interpolateSunPosition(common.SPASiteData, self.capture)
+            self.wgtFisheye.setSunPosition(sunpos)
         self.wgtFisheye.setPhoto(photos[self.exposure], exif=exif)
         self.wgtFisheye.setSkycover(utility_data.findCaptureSkyCover(self.capture, common.SkyCoverData))
-        self.wgtFisheye.repaint()
+        with utility_timing.span("timeSelected.repaint"):
+            self.wgtFisheye.repaint()
+
+        # graph ASD data (curves already plotted are updated in place)
+        with utility_timing.span("timeSelected.findASD"):
+            self.captureTimeASDFiles = self.findCaptureASDFiles()
+        self.graphSamples(self.wgtFisheye.samplesSelected, refresh=True)
+        QTimer.singleShot(0, self.updateTimings)  # after this event handler is timed
 
+    def findCaptureASDFiles(self):
         # find ASD data path
         pathDate = os.path.join(common.AppSettings["DataDirectory"], str(self.capture.date()))
         if not os.path.exists(pathDate):
-            return
+            return []
         pathASD = os.path.join(pathDate, "ASD")
         if not os.path.exists(pathASD):
             self.log("Error: No ASD data found for: " + str(self.capture.date()))
-            return
+            return []
 
-        # find all capture time dirs
-        captureTimeASDDirs = utility.findFiles(pathASD, mode=2)
-        captureTimeASDDirs[:] = [dir for dir in captureTimeASDDirs if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
-        if len(captureTimeASDDirs) <= 0:
+        # find all capture times
+        captureTimesASD = utility_data.findCaptureTimes(pathASD, self.capture.date())
+        if len(captureTimesASD) <= 0:
             self.log("Error: No ASD capture time dirs found: " + str(self.capture.date()))
-            return
+            return []
 
-        # find an ASD capture time within small threshold of HDR capture time
-        asdTime = None
+        # find the ASD capture time closest to HDR capture time (within small threshold)
         threshold = common.DataConfig["CaptureEpsilon"]  # seconds
-        for dir in captureTimeASDDirs:
-            timestr = str(self.capture.date()) + " " + os.path.basename(dir)
-            time = datetime.strptime(timestr, "%Y-%m-%d %H.%M.%S")
-            delta = (self.capture - time).total_seconds()
-            if abs(delta) <= threshold:
-                asdTime = time
-                break
+        asdTime = utility_data.findClosestCaptureTime(captureTimesASD, self.capture, threshold)
 
         # is there an equivalent ASD capture?
         if asdTime is None:
             self.log("Error: No ASD capture time dir found within " + str(threshold) + "s of HDR capture time: " + str(self.capture))
-            return
+            return []
 
         # gather all ASD files for capture time
         asdTimeDir = os.path.join(pathASD, str(asdTime.time()).replace(":", "."))
-        self.captureTimeASDFiles = utility.findFiles(asdTimeDir, mode=1, ext=[".txt"])
-        if len(self.captureTimeASDFiles) <= 0:
-            self.log("Error: No ASD .txt files found for: " + str(asdTime))
-            return
-        if len(self.captureTimeASDFiles) != len(common.SamplingPattern):
-            self.log("Error: Found " + str(len(self.captureTimeASDFiles)) + " ASD files. Sampling pattern should have " + str(len(common.SamplingPattern)))
-            return
+        asdfiles = utility_data.findASDCaptureFiles(asdTimeDir)
+        if len(asdfiles) <= 0:
+            self.log("Error: No ASD files found for: " + str(asdTime))
+            return []
+        if len(asdfiles) != len(common.SamplingPattern):
+            self.log("Error: Found " + str(len(asdfiles)) + " ASD files. Sampling pattern should have " + str(len(common.SamplingPattern)))
+            return []
 
-        # graph ASD data
-        self.graphSamples(self.wgtFisheye.samplesSelected)
+        return asdfiles
 
     def timeChangeWheelEvent(self, event):
+        self.recordInteraction("wheel", delta=event.angleDelta().y())
+        self.traceMuted = True
         self.sldTime.event(event)
+        self.traceMuted = False
 
     def exposureSelected(self, index):
         index -= 1 # -1 because combobox first element is not a valid value
         self.exposure = index
         if self.captureTimeHDRDirs is not None and len(self.captureTimeHDRDirs) > 0:
+            self.wgtTimeline.setCaptures(self.captureTimeHDRDirs, self.exposure)
             self.sldTime.valueChanged.emit(self.sldTime.value())
 
-    def graphSamples(self, indices):
-        # clear the graph
+    def timelineSelected(self, index):
+        if index < 0 or index >= len(self.captureTimeHDRDirs):
+            return
+        self.recordInteraction("timeline", index=index)
+        self.sldTime.setValue(index)  # routes to timeSelected
+
+    def clearGraph(self):
         self.wgtGraph.clear()
+        self.graphCurves.clear()
 
+    @utility_timing.timed("graphSamples")
+    def graphSamples(self, indices, refresh=False):
         # nothing to graph
-        if len(indices) <= 0:
-            return
         if len(self.captureTimeHDRDirs) <= 0:   # no HDR photo
+            self.clearGraph()
             return
         if len(self.captureTimeASDFiles) <= 0:  # no ASD files
+            self.clearGraph()
             return
+        indices = [i for i in indices if i < len(self.captureTimeASDFiles)]
+
+        # remove curves of samples no longer selected
+        selected = set(indices)
+        for i in [i for i in self.graphCurves if i not in selected]:
+            self.wgtGraph.removeItem(self.graphCurves.pop(i))
 
-        # load and plot data
+        # plot newly selected samples, and reload curves already plotted if capture changed
         for i in indices:
-            if i >= len(self.captureTimeASDFiles):
-                break
-            wavelengths, radiances = utility_data.loadASDFile(self.captureTimeASDFiles[i], common.AppSettings["GraphResolution"])
-            #wavelengths = wavelengths[::common.AppSettings["GraphResolution"]]
-            #radiances = radiances[::common.AppSettings["GraphResolution"]]
-            self.wgtGraph.plot(y=radiances, x=wavelengths, pen=pg.mkPen(color=self.wgtFisheye.getSamplePatternRGB(i), width=common.AppSettings["GraphLineThickness"])) # pen=(i, len(indices))
-            #self.wgtGraph.addItem() # add a label/icon to graph with number of samples available
+            curve = self.graphCurves.get(i)
+            if curve is not None and not refresh:
+                continue
+            with utility_timing.span("graphSamples.loadASD"):
+                wavelengths, radiances = utility_data.loadASDFile(self.captureTimeASDFiles[i])
+            with utility_timing.span("graphSamples.plot"):
+                if curve is None:
+                    self.graphCurves[i] = self.wgtGraph.plot(y=radiances, x=wavelengths, pen=self.graphPen(i))
+                else:
+                    curve.setData(y=radiances, x=wavelengths)
+
+    def graphPen(self, index):
+        return pg.mkPen(color=self.wgtFisheye.getSamplePatternRGB(index), width=common.AppSettings["GraphLineThickness"])
 
     def selectSamples(self, message):
+        self.recordInteraction("samples", message=message)
         self.wgtFisheye.selectSamples(message)
 
-    def exportSamples(self, message, extra=None):
+    def exportSamples(self, message):
         xoptions = common.AppSettings["ExportOptions"]
-
-        # handle differences between export and convert
-        if message != 'convert':
-            fileout = xoptions["Filename"]
-            samples = self.wgtFisheye.samplesSelected
-            capture = self.capture
-            exposure = common.Exposures[self.exposure]
-        else:
-            fileout = extra["DatasetOut"]
-            samples = extra["SamplesSelected"]
-            capture = extra["Capture"]
-            exposure = extra["Exposure"] if extra["Exposure"] > 0 else common.Exposures[self.exposure] if self.exposure > -1 else common.Exposures[0]
+        fileout = xoptions["Filename"]
+        samples = self.wgtFisheye.samplesSelected
 
         # we shouldn't be here if export file hasn't been configured
         if len(fileout) <= 0:
@@ -691,234 +770,12 @@ class SpectralSkyViewer(QMainWindow):
             self.log("Info: No samples selected. Nothing to export.")
             return
 
-        if message != 'convert':
-            self.log("Export preparations... ")
-
-        # find photos for every exposure we intend to export
-        exposures = []  # list of exposures to export
-        expphotos = []  # list of photos per exposure
-        if not xoptions["IsHDR"]:
-            photo = utility_data.findHDRFile(common.AppSettings["DataDirectory"], capture, exposure, common.SourceExt(xoptions["SourceExt"]).name.lower())
-            if not photo or len(photo) <= 0:
-                self.log("Error: Photo for " + exposure + "s exposure not found. Export canceled.")
-                return
-            exposures.append(exposure)
-            expphotos.append(photo)
-        else:
-            for exp in common.Exposures:
-                photo = utility_data.findHDRFile(common.AppSettings["DataDirectory"], capture, exp, common.SourceExt(xoptions["SourceExt"]).name.lower())
-                if not photo or len(photo) <= 0:
-                    self.log("Error: Photo for exposure '" + str(exp) + "' not found. Export canceled.")
-                    return
-                exposures.append(exp)
-                expphotos.append(photo)
-
-        # find ASD files for every sample in sampling pattern (otherwise indexing will be off)
-        asdfiles = []  # list of asd files for current capture
-        if message != 'convert':
-            asdfiles = self.captureTimeASDFiles  # we already found them when user scrolled to capture time
-        else:
-            asdfiles = utility_data.findASDFiles(common.AppSettings["DataDirectory"], capture)
-        if len(asdfiles) <= 0:
-            self.log("Error: No ASD .txt files found for " + str(capture) + ". Export canceled.")
-            return
-        if len(asdfiles) != len(common.SamplingPattern):
-            self.log("Error: Found " + str(len(asdfiles)) + " ASD files for " + str(capture) +". Sample pattern should have " + str(len(common.SamplingPattern)) + ". Export canceled.")
-            return
-
-        # compute sun position
-        spa = utility_data.deepcopySPAData(common.SPASiteData)
-        if message == 'convert':
-            utility_data.fillSPADateTime(spa, capture)
-        sunpos = utility_data.computeSunPosition(spa)
-
-        # compute locations in photo to sample from
-        # NOTE: assumes same positions for all files! (speed up) could be recomputed per file
-        filesamplepoints = utility_data.computePointsInImage(expphotos[0], common.SamplingPattern)
-        points = [filesamplepoints[i] for i in samples]
-        coords = [common.SamplingPattern[i] for i in samples]  # sample coordinates
-
-        # determine pixel regions and weighting
-        pixweight = common.PixelWeighting(xoptions["PixelWeighting"])
-        pixregions = []
-        if xoptions["ComputePixelRegion"]:
-            pixregions = [common.AltitudeRegionMap[c[1]] for c in coords]
-        else:
-            reg = xoptions["PixelRegion"]
-            pixregions = [reg for i in range(0, len(points))]
-
-        # compute pixels
-        exppixels = []  # list of lists of pixels per exposure
-        for i in range(0, len(exposures)):
-            exppixels.append(utility_data.collectPixels(points, pixregions, file=expphotos[i], weighting=pixweight))
-
-        # modify pixels per color model
-        color = common.ColorModel(xoptions["ColorModel"])
-        if color == common.ColorModel.HSV:
-            for pixels in exppixels:
-                for i in range(0, len(samples)):
-                    rgb = sRGBColor(pixels[i][0], pixels[i][1], pixels[i][2], is_upscaled=True)
-                    hsv = convert_color(rgb, HSVColor)
-                    pixels[i] = hsv.get_value_tuple()
-        elif color == common.ColorModel.HSL:
-            for pixels in exppixels:
-                for i in range(0, len(samples)):
-                    rgb = sRGBColor(pixels[i][0], pixels[i][1], pixels[i][2], is_upscaled=True)
-                    hsl = convert_color(rgb, HSLColor)
-                    pixels[i] = hsl.get_value_tuple()
-        elif color == common.ColorModel.LAB:
-            for pixels in exppixels:
-                for i in range(0, len(samples)):
-                    rgb = sRGBColor(pixels[i][0], pixels[i][1], pixels[i][2], is_upscaled=True)
-                    lab = convert_color(rgb, LabColor)
-                    pixels[i] = lab.get_value_tuple()
-
-        # modify coordinates per coordinate system
-        coordsys = common.CoordSystem(xoptions["CoordSystem"])
-        if coordsys == common.CoordSystem.Polar:
-            coordsfinal = coords
-            sunposfinal = sunpos
-        elif coordsys == common.CoordSystem.PolarNorm:
-            coordsfinal = [(c[0]/360.0, c[1]/90.0) for c in coords]
-            sunposfinal = (sunpos[0]/360.0, sunpos[1]/90.0)
-        elif coordsys == common.CoordSystem.UV:
-            coordsfinal = [(utility_angles.SkyCoord2FisheyeUV(c[0], c[1])) for c in coords]
-            sunposfinal = (utility_angles.SkyCoord2FisheyeUV(sunpos[0], sunpos[1]))
-        if message != 'convert':
-            self.log("Exporting... ")
+        self.log("Export preparations... ")
 
-        # init
-        sampleidx = 0
-        delimiter = ","
-        speccount = xoptions["SpectrumEnd"] - xoptions["SpectrumStart"] + 1
-        resolution = xoptions["SpectrumResolution"]
-        skycover = utility_data.findCaptureSkyCover(capture, common.SkyCoverData)
-
-        # create file if not exists
-        if not os.path.exists(fileout):
-            # create dirs if not exists
-            if not os.path.exists(os.path.dirname(fileout)):
-                os.makedirs(os.path.dirname(fileout))
-            # write header
-            with open(fileout, "w") as file:
-                for fidx in xoptions["Features"]:
-                    feature = DialogExport.attributeFromIndex(fidx)
-                    if feature == "Exposure":
-                        if xoptions["IsHDR"]:
-                            for j in range(0, len(common.Exposures)):
-                                file.write("Exposure" + str(j+1) + delimiter)
-                        else:
-                            file.write("Exposure" + delimiter)
-                    elif feature == "PixelColor":
-                        if xoptions["IsHDR"]:
-                            for j in range(0, len(common.Exposures)):
-                                file.write("ColorA" + str(j+1) + delimiter + "ColorB" + str(j+1) + delimiter + "ColorC" + str(j+1) + delimiter)
-                        else:
-                            file.write("ColorA" + delimiter + "ColorB" + delimiter + "ColorC" + delimiter)
-                    elif feature == "Radiance":
-                        file.write(str(xoptions["SpectrumStart"]))  # first wavelength, no delimiter
-                        for w in range(xoptions["SpectrumStart"] + resolution, xoptions["SpectrumEnd"] + 1, resolution):
-                            file.write(delimiter + str(w))  # delimiter plus next wavelength
-                    else:
-                        file.write(feature)
-                        file.write(delimiter)
-                file.write("\n")
-        # otherwise count existing samples
-        else:
-            with open(fileout, 'r') as file:
-                reader = csv.reader(file, delimiter=',')
-                next(reader, None) # skip header
-                sampleidx = sum(1 for row in reader)
-
-        # append export to existing file
-        with open(fileout, "a") as file:
-            # export each selected sample
-            for i, sIdx in enumerate(samples):
-
-                # export each required attribute
-                # date
-                file.write(str(capture.date()))
-                file.write(delimiter)
-                # time
-                file.write(str(capture.time()))
-                file.write(delimiter)
-                # space
-                file.write(str(coordsys.value))
-                file.write(delimiter)
-
-                # export each optional attribute
-                for aIdx in xoptions["Features"]:
-                    feature = common.SampleFeatures[aIdx][0]
-
-                    # export sun azimuth
-                    if feature == "SunAzimuth":
-                        file.write('{0:.4f}'.format(sunposfinal[0]))
-                        file.write(delimiter)
-                    # export sun altitude
-                    elif feature == "SunAltitude":
-                        file.write('{0:.4f}'.format(sunposfinal[1]))
-                        file.write(delimiter)
-                    # export sky cover
-                    elif feature == "SkyCover":
-                        file.write(str(skycover.value))
-                        file.write(delimiter)
-                    # export index
-                    elif feature == "SamplePatternIndex":
-                        file.write(str(sIdx))
-                        file.write(delimiter)
-                    # export sample azimuth
-                    elif feature == "SampleAzimuth":
-                        file.write('{0:.4f}'.format(coordsfinal[i][0]))
-                        file.write(delimiter)
-                    # export sample altitude
-                    elif feature == "SampleAltitude":
-                        file.write('{0:.4f}'.format(coordsfinal[i][1]))
-                        file.write(delimiter)
-                    # export sun point/sample angle
-                    elif feature == "SunPointAngle":
-                        angle = utility_angles.CentralAngle(sunpos, coords[i])
-                        angle = math.degrees(angle)
-                        file.write('{0:.3f}'.format(angle))
-                        file.write(delimiter)
-                    # export pixel neighborhood
-                    elif (feature == "PixelRegion"):
-                        file.write(str(pixregions[i]))
-                        file.write(delimiter)
-                    # export pixel weighting method
-                    elif feature == "PixelWeighting":
-                        file.write(str(pixweight.value))
-                        file.write(delimiter)
-                    # export pixel color model
-                    elif feature == "ColorModel":
-                        file.write(str(color.value))
-                        file.write(delimiter)
-                    # export photo exposure time(s)
-                    elif feature == "Exposure":
-                        for exp in exposures:
-                            file.write(str(exp))
-                            file.write(delimiter)
-                    # export sample pixel color(s)
-                    elif feature == "PixelColor":
-                        for pixels in exppixels:
-                            file.write(str(pixels[i][0]))  # color component 1
-                            file.write(delimiter)
-                            file.write(str(pixels[i][1]))  # color component 2
-                            file.write(delimiter)
-                            file.write(str(pixels[i][2]))  # color component 3
-                            file.write(delimiter)
-                    # export spectral radiance
-                    elif feature == "Radiance":
-                        xs, ys = utility_data.loadASDFile(asdfiles[sIdx])
-                        file.write(str(max(ys[0],0)))  # first wavelength, no delimiter
-                        for j in range(resolution, speccount, resolution):
-                            file.write(delimiter + str(max(ys[j],0)))  # delimiter plus next wavelength
-
-                # next sample
-                file.write("\n")
-                sampleidx += 1
-
-        if message != 'convert':
-            self.log("Exported " + str(len(samples)) + " sample(s) of capture " + str(capture))
+        # export in background (ASD files were already found when user scrolled to capture time)
+        task = ExportTask(ExportSignals(), common.AppSettings["DataDirectory"], fileout, copy.deepcopy(xoptions), common.Exposures[self.exposure],
+                          captures=[[self.capture, list(samples), 0]], asdfiles=list(self.captureTimeASDFiles), index=self.exportIndex)
+        self.startExport(task, "Exporting")
 
     def convertSamples(self):
         dialog = DialogConverter()
@@ -926,50 +783,53 @@ class SpectralSkyViewer(QMainWindow):
         if (code != QDialog.Accepted):
             return
 
-        # init
-        count = 0
-        currtime = datetime.min
-        extra = {
-            "DatasetOut": dialog.datasetOut,
-            "SamplesSelected": [],
-            "Capture": datetime.min,
-            "Exposure": 0
-        }
-
-        # if output file exists - wipe it out, all of it
-        if os.path.exists(dialog.datasetOut):
-            os.unlink(dialog.datasetOut)
+        # samples w/out exposure are converted w/ current exposure
+        exposure = common.Exposures[self.exposure] if self.exposure > -1 else common.Exposures[0]
+        xoptions = common.AppSettings["ExportOptions"]
 
         self.log("Converting... ")
-        with open(dialog.datasetIn, 'r') as filein:
-            reader = csv.reader(filein, delimiter=",")
-            # read header
-            header = next(reader, None)
-            mapping = {header[i]: i for i in range(0, len(header))}
-            # read first row
-            row = next(reader, None)
-            currtime = datetime.strptime(row[mapping['Date']] + ' ' + row[mapping['Time']], "%m/%d/%Y %H:%M:%S")
-            # reset reader
-            filein.seek(0)
-            next(reader, None)  # skip header this time
-            # read each row/sample
-            for row in reader:
-                ts = datetime.strptime(row[mapping['Date']] + ' ' + row[mapping['Time']], "%m/%d/%Y %H:%M:%S")
-                # new capture timestamp of samples? flush current samples
-                if ts != currtime:
-                    self.exportSamples('convert', extra)
-                    currtime = ts
-                    extra["SamplesSelected"] = []
-                # collect samples to convert
-                count += 1
-                extra["SamplesSelected"].append(int(row[mapping["SamplePatternIndex"]]))
-                extra["Capture"] = ts
-                if "Exposure" in header:
-                    extra["Exposure"] = float(row[mapping["Exposure"]])
-            # flush any remaining samples
-            if len(extra["SamplesSelected"]) > 0:
-                self.exportSamples('convert', extra)
-        self.log("Converted " + str(count) + " sample(s)")
+        task = ExportTask(ExportSignals(), common.AppSettings["DataDirectory"], dialog.datasetOut, copy.deepcopy(xoptions), exposure,
+                          datasetin=dialog.datasetIn)
+        self.startExport(task, "Converting")
+
+    def startExport(self, task, title):
+        # progress is shown only if export takes a while, and doesn't block browsing
+        dialog = QProgressDialog(title + "...", "Cancel", 0, 0, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.NonModal)
+        dialog.setMinimumDuration(1000)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(task.cancel)
+        task.signals.log.connect(self.log)
+        task.signals.progress.connect(lambda done, total, count, elapsed, capture: self.exportProgress(dialog, title, done, total, count, elapsed, capture))
+        task.signals.finished.connect(lambda done, total, count, elapsed, canceled: self.exportFinished(task, dialog, title, done, total, count, elapsed, canceled))
+
+        # one export at a time, others wait their turn (they may write the same file)
+        self.exportTasks.append(task)
+        self.exportPool.start(task)
+
+    def exportProgress(self, dialog, title, done, total, count, elapsed, capture):
+        rate = done / elapsed if elapsed > 0 else 0
+        eta = (total - done) / rate if rate > 0 else 0
+        dialog.setMaximum(total)
+        dialog.setValue(done)
+        dialog.setLabelText(title + " capture " + str(done) + "/" + str(total) + " (" + capture + ")\n" +
+                            str(count) + " sample(s) written, " + "{0:.2f}".format(rate) + " captures/s, ETA " + "{0:.0f}".format(eta) + "s")
+
+    def exportFinished(self, task, dialog, title, done, total, count, elapsed, canceled):
+        dialog.close()
+        self.exportTasks.remove(task)
+        if task.index is not None:
+            self.exportIndex = task.index
+        if canceled and title == "Converting":
+            self.log(title + " canceled after " + str(done) + "/" + str(total) + " captures. " + task.fileout + " was left as it was")
+        elif canceled:
+            self.log(title + " canceled after " + str(done) + "/" + str(total) + " captures. Exported " + str(count) + " sample(s)")
+        elif title == "Converting":
+            self.log("Converted " + str(count) + " sample(s) of " + str(total) + " captures in " + "{0:.2f}".format(elapsed) + "s")
+        elif count > 0:
+            self.log("Exported " + str(count) + " sample(s) of capture " + str(task.captures[0][0]))
 
     def setupExportFile(self):
         dialog = DialogExport(common.AppSettings["ExportOptions"])
@@ -995,7 +855,6 @@ class SpectralSkyViewer(QMainWindow):
             menuCtx.addAction(self.actSamples)
             menuCtx.addAction(self.actShadows)
             menuCtx.addAction(self.actUVGrid)
-            menuCtx.addAction(self.actGraphRes)
             menuCtx.addAction(self.actGraphLine)
             menuCtx.addSeparator()
             menuCtx.addAction(self.actSelectAll)
@@ -1021,6 +880,59 @@ class SpectralSkyViewer(QMainWindow):
             self.statusBar().hide()
             #self.centralWidget().layout().setContentsMargins(10,10,10,10)
 
+    def toggleTimeline(self, state):
+        common.AppSettings["ShowTimeline"] = state
+        self.wgtTimeline.setVisible(state)
+
+    def toggleTimings(self, state):
+        common.AppSettings["ShowTimings"] = state
+        utility_timing.enable(state)
+        self.lblTimings.setVisible(state)
+        self.actDumpTimings.setEnabled(state)
+        self.updateTimings()
+        self.wgtFisheye.repaint()
+
+    def updateTimings(self):
+        if utility_timing.Enabled:
+            self.lblTimings.setText(utility_timing.summary("timeSelected"))
+
+    def dumpTimings(self):
+        utility_timing.dump(common.AppSettings["TimingsFilename"])
+        self.log("Timings written to: " + common.AppSettings["TimingsFilename"])
+
+    def toggleRecording(self, state):
+        if state:
+            path, _ = QFileDialog.getSaveFileName(self, 'Record Interactions', 'trace.json', 'Trace (*.json)')
+            if len(path) <= 0:
+                self.actRecord.setChecked(False)
+                return
+            self.trace = []
+            self.traceStart = time.perf_counter()
+            self.traceFile = path
+            self.log("Recording interactions to: " + path)
+        else:
+            self.saveRecording()
+
+    def recordInteraction(self, event, **args):
+        if self.trace is None or self.traceMuted:
+            return
+        args.update({"t": round(time.perf_counter() - self.traceStart, 4), "event": event})
+        self.trace.append(args)
+
+    def saveRecording(self):
+        if self.trace is None:
+            return
+        trace = {
+            "version": 1,
+            "datadir": common.AppSettings["DataDirectory"],
+            "window": [self.width(), self.height()],
+            "events": self.trace
+        }
+        with open(self.traceFile, 'w') as file:
+            json.dump(trace, file, indent=1)
+        self.log("Recorded " + str(len(self.trace)) + " interactions to: " + self.traceFile)
+        self.trace = None
+
     def toggleHUDView(self, action):
         state = action.isChecked()
 
@@ -1071,18 +983,12 @@ class SpectralSkyViewer(QMainWindow):
     def toggleGraphOptions(self, action):
         ok = True
         value = 0
-        if action == self.actGraphRes:
-            value, ok = QInputDialog.getInt(self, "Radiance Graph Resolution", "Plot every (nm):", 1, 1, 50, 1, Qt.WindowSystemMenuHint | Qt.WindowTitleHint)
-            if ok and value > 0 and value <= 50:
-                common.AppSettings["GraphResolution"] = value
-                self.graphSamples(self.wgtFisheye.samplesSelected)
-            else:
-                QMessageBox.warning(self, "Input Validation", "Radiance graph resolution must be 1-50(nm).", QMessageBox.Ok)
-        elif action == self.actGraphLine:
+        if action == self.actGraphLine:
             value, ok = QInputDialog.getInt(self, "Radiance Graph Line Thickness", "Thickness:", 1, 1, 5, 1, Qt.WindowSystemMenuHint | Qt.WindowTitleHint)
             if ok and value > 0 and value <= 5:
                 common.AppSettings["GraphLineThickness"] = value
-                self.graphSamples(self.wgtFisheye.samplesSelected)
+                for i, curve in self.graphCurves.items():
+                    curve.setPen(self.graphPen(i))
             else:
                 QMessageBox.warning(self, "Input Validation", "Radiance graph line thickness must be between 1-5.", QMessageBox.Ok)
 
@@ -1127,6 +1033,12 @@ class SpectralSkyViewer(QMainWindow):
         #     event.ignore()
         # btn.clicked.connect(QApplication.instance().quit)
         event.accept()
+        self.saveRecording()
+
+        # let export finish capture it's on, so export file is consistent
+        for task in self.exportTasks:
+            task.cancel()
+        self.exportPool.waitForDone()
 
         if self.dontSaveSettings:
             return
@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: Background task for exporting (and converting) samples, so the GUI remains usable while it runs.
+# ====================================================================
+import os
+import time
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+import utility_export
+import utility_timing
+
+
+class ExportSignals(QObject):
+    # captures done, captures total, samples written, seconds elapsed, capture just exported
+    progress = pyqtSignal(int, int, int, float, str)
+    # message
+    log = pyqtSignal(str)
+    # captures done, captures total, samples written, seconds elapsed, canceled
+    finished = pyqtSignal(int, int, int, float, bool)
+
+
+'''
+Task that exports samples of one or more captures, one capture at a time.
+A capture is either entirely exported or not at all (see utility_export.exportCapture), and cancellation takes effect
+between captures, so the export file (and its index) is always consistent. Run at most one task per export file at a time.
+'''
+class ExportTask(QRunnable):
+
+    '''
+    :param signals: ExportSignals to report progress with.
+    :param datadir: The data directory.
+    :param fileout: Path of export file.
+    :param options: Export options (a copy, not to be changed while task runs).
+    :param exposure: Exposure (seconds) to export of captures that don't specify one.
+    :param captures: List of [capture, samples, exposure] to export, where exposure is 0 if not specified.
+    :param datasetin: Path of dataset to convert instead (see utility_export.readDatasetCaptures). Export file is replaced
+                      once conversion is done, and left as is if conversion is canceled or fails.
+    :param asdfiles: List of ASD files of capture, if exporting a single capture whose ASD files were already found.
+    :param index: ExportIndex of export file w/ export options, kept from a previous task (loaded once by this task if not
+                  specified or it doesn't match). It's used for every capture, and can be kept again when the task is done.
+    '''
+    def __init__(self, signals, datadir, fileout, options, exposure, captures=None, datasetin="", asdfiles=None, index=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.signals = signals
+        self.datadir = datadir
+        self.fileout = fileout
+        self.options = options
+        self.exposure = exposure
+        self.captures = captures if captures else []
+        self.datasetin = datasetin
+        self.asdfiles = asdfiles
+        self.index = index if index is not None and index.matches(fileout, options) else None
+        self.canceled = False
+
+    def cancel(self):
+        self.canceled = True
+
+    def run(self):
+        timer = time.time()
+        done = 0
+        exported = 0
+        fileout = self.fileout
+        converted = False
+        try:
+            # convert? dataset is read first, so nothing is touched if it can't be read or task was canceled while waiting
+            if len(self.datasetin) > 0:
+                self.captures = utility_export.readDatasetCaptures(self.datasetin)
+                if self.canceled:
+                    self.signals.finished.emit(done, len(self.captures), exported, time.time() - timer, self.canceled)
+                    return
+                # converted into a temp file, which replaces export file (all of it) only once conversion is done
+                fileout = self.fileout + ".tmp"
+                ExportTask.deleteExport(fileout)
+                self.index = None
+
+            # one index for all captures, rather than loading it for every capture
+            if self.index is None:
+                self.index = utility_export.ExportIndex(fileout, self.options)
+
+            verbose = len(self.datasetin) <= 0 and len(self.captures) <= 1
+            for capture, samples, exposure in self.captures:
+                if self.canceled:
+                    break
+                with utility_timing.span("exportSamples"):
+                    exported += utility_export.exportCapture(self.datadir, fileout, capture, samples, exposure if exposure > 0 else self.exposure,
+                                                             self.options, asdfiles=self.asdfiles, log=self.signals.log.emit, verbose=verbose, index=self.index)
+                done += 1
+                self.signals.progress.emit(done, len(self.captures), exported, time.time() - timer, str(capture))
+
+            # conversion done, replace export file
+            if fileout != self.fileout and not self.canceled:
+                ExportTask.deleteExport(self.fileout)
+                if os.path.exists(fileout):
+                    os.replace(fileout + utility_export.ExportIndex.Extension, self.fileout + utility_export.ExportIndex.Extension)
+                    os.replace(fileout, self.fileout)
+                self.index = None  # it's the index of temp file, export file's is loaded by next export
+                converted = True
+        except Exception as ex:
+            self.signals.log.emit("Error: Export failed: " + str(ex))
+        finally:
+            # conversion canceled or failed, export file is left as it was
+            if fileout != self.fileout and not converted:
+                ExportTask.deleteExport(fileout)
+                self.index = None
+        self.signals.finished.emit(done, len(self.captures), exported, time.time() - timer, self.canceled)
+
+    '''
+    Delete an export file and its index (if they exist).
+    '''
+    @staticmethod
+    def deleteExport(fileout):
+        if os.path.exists(fileout):
+            os.unlink(fileout)
+        utility_export.ExportIndex.delete(fileout)
@@ -95,6 +95,7 @@ Helper function that returns a list of all files, directories, or both, immediat
 :param mode: 0=both, 1=files, 2=dir
 :param recursive: Immediate top-level list or recursive list
 :param ext: List of file extensions to filter by
+:return: A sorted list of paths (photos and ASD files are indexed by their order, so this can't depend on the OS)
 '''
 def findFiles(dirpath, mode=0, recursive=False, ext=[]):
     stuff = []
@@ -136,7 +137,7 @@ def findFiles(dirpath, mode=0, recursive=False, ext=[]):
                 for dir in dirs:
                     fullpath = os.path.join(root, dir)
                     stuff.append(fullpath)
-    return stuff
+    return sorted(stuff)
 
 '''
 Helper function delete all files and folders given a folder.
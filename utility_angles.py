@@ -109,3 +109,15 @@ def CentralAngle(a, b, inRadians=False):
         a = (math.radians(a[0]), math.radians(a[1]))
         b = (math.radians(b[0]), math.radians(b[1]))
     return math.acos( math.sin(a[1]) * math.sin(b[1]) + math.cos(a[1]) * math.cos(b[1]) * math.cos( abs(a[0]-b[0]) ) )
+
+'''
+Vectorized CentralAngle. Take a single (azimuth, altitude) sky coordinate and a list of them and return a numpy array
+of central angles (in radians) between the first and each of the others.
+'''
+def CentralAngles(a, bs, inRadians=False):
+    bs = np.asarray(bs, dtype=np.float64).reshape(-1, 2)
+    if not inRadians:
+        a = (math.radians(a[0]), math.radians(a[1]))
+        bs = np.radians(bs)
+    cosines = math.sin(a[1]) * np.sin(bs[:, 1]) + math.cos(a[1]) * np.cos(bs[:, 1]) * np.cos(np.abs(a[0] - bs[:, 0]))
+    return np.arccos(np.clip(cosines, -1.0, 1.0))
@@ -7,9 +7,15 @@
 # ====================================================================
 import math
 import os
+import io
 import json
+import struct
+import bisect
+import hashlib
+import heapq
 import itertools
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 import numpy as np
 from PIL import Image
 import exifread
@@ -21,6 +27,16 @@ import utility_angles
 
 GaussianKernels = {}
 
+# ASD FieldSpec binary file format (see ASD Inc. "ASD File Format" document)
+ASDHeaderSize = 484                                          # spectrum data immediately follows header
+ASDVersions = {b'ASD': 1, b'as2': 2, b'as3': 3, b'as4': 4, b'as5': 5, b'as6': 6, b'as7': 7, b'as8': 8}
+ASDDataTypeRaw = 0                                           # raw DN
+ASDDataTypeRad = 2                                           # radiance
+ASDDataFormats = {0: '<f4', 1: '<i4', 2: '<f8'}              # float, integer, double
+ASDCalTypeBase = 1                                           # calibration types: 0=absolute 1=base 2=lamp 3=fiber
+ASDCalTypeLamp = 2
+ASDCalHeaderSize = 29                                        # type, name[20], integration time, swir1 gain, swir2 gain
+
 
 # - configuration -------------------------------------------------------------
 # - configuration -------------------------------------------------------------
@@ -36,6 +52,8 @@ def loadAppSettings():
                 common.AppSettings.update({key: loaded[key]})
 
     # validate settings
+    for key in common.DefExportOptions:
+        common.AppSettings["ExportOptions"].setdefault(key, common.DefExportOptions[key])
     common.AppSettings["ExportOptions"]["Features"].sort()
     if len(common.AppSettings["DataDirectory"]) > 0 and not os.path.exists(common.AppSettings["DataDirectory"]):
         common.AppSettings["DataDirectory"] = ""
@@ -96,16 +114,17 @@ def loadDataConfig():
 
     # extract sky cover data
     dtfmtstr = "%m/%d/%Y %H:%M"
-    common.SkyCoverData.clear()
+    skycovers = []
     for sc in common.DataConfig["SkyCover"]:
         try:
-            common.SkyCoverData.append((
+            skycovers.append((
                 datetime.strptime(sc[0] + " " + sc[1], dtfmtstr),
                 datetime.strptime(sc[0] + " " + sc[2], dtfmtstr),
                 common.SkyCover[sc[3]]
             ))
-        except ValueError or IndexError:
+        except (ValueError, IndexError, KeyError):
             return False
+    common.SkyCoverData = SkyCoverIndex(skycovers)  # overlapping assessments are in SkyCoverData.warnings
 
     # extract SPA data
     # create spa data and fill with default values from their example
@@ -235,10 +254,9 @@ def collectPixels(points, regions, file='', pixels=None, weighting=common.PixelW
     if pixels is None:
         if not os.path.exists(file) or not points:
             return []
-        image = Image.open(file)
-        #imgPixels = img.load()
-        pixels = np.array(image)
-        image.close()
+        # only the neighborhoods of points need to be read
+        boxes = [(int(p[0]) - int(r/2), int(p[1]) - int(r/2), int(p[0]) + int(r/2) + 1, int(p[1]) + int(r/2) + 1) for p, r in zip(points, regions)]
+        pixels = loadPhotoPixels(file, boxes)
 
     result = []
     for i, p in enumerate(points):
@@ -253,6 +271,123 @@ def collectPixels(points, regions, file='', pixels=None, weighting=common.PixelW
                 result.append(pixelWeightedGaussian(pixels, p, GaussianKernels[regions[i]]))
     return result
 
+'''
+Function to load the pixels of a photo. If a pixel cache is configured (see PixelCache), pixels are decoded once and
+memory-mapped from the cache afterwards, so only the parts of the photo actually read are paged in.
+:param file: Path to photo.
+:param boxes: (optional) List of (x1, y1, x2, y2) regions of the photo that will be read. If specified, uncompressed
+              TIFF strips/tiles that don't overlap any region are not read or decoded (they are left black).
+:return: A numpy array (height, width, channels) of pixels.
+:note: Compressed TIFFs and JPEGs are always decoded entirely.
+'''
+def loadPhotoPixels(file, boxes=None):
+    cachedir = common.AppSettings["PixelCacheDirectory"]
+    if len(cachedir) > 0:
+        return PixelCache(cachedir, common.AppSettings["PixelCacheLimit"] * 1024 * 1024).load(file)
+    with Image.open(file) as image:
+        if boxes is not None and len(boxes) > 0 and image.format == "TIFF":
+            tiles = regionTiles(image, np.asarray(boxes))
+            if tiles is not None:
+                image.tile = tiles
+                image.load()
+        return np.array(image)
+
+'''
+Function to find the parts of an (unloaded) image that must be decoded to read some regions of it.
+Tiles that don't overlap any region are dropped. Raw (uncompressed) full width strips are split into just the bands of
+rows that overlap regions, using the strip's byte offset and row stride.
+:param image: A PIL image, opened but not loaded yet.
+:param boxes: A numpy array of (x1, y1, x2, y2) regions.
+:return: A new list of PIL image tiles, or None if all of the image must be decoded anyway.
+'''
+def regionTiles(image, boxes):
+    tiles = []
+    for tile in image.tile:
+        decoder, (tx1, ty1, tx2, ty2), offset, args = tile
+        hits = boxes[(boxes[:, 0] < tx2) & (boxes[:, 2] > tx1) & (boxes[:, 1] < ty2) & (boxes[:, 3] > ty1)]
+        if len(hits) <= 0:
+            continue
+        rawmode = args[0] if isinstance(args, tuple) else args
+        if (decoder != "raw" or rawmode != image.mode or image.mode not in ("L", "RGB", "RGBA") or
+                tx1 != 0 or tx2 != image.width or not isinstance(args, tuple) or len(args) < 3 or args[2] != 1):
+            tiles.append(tile)
+            continue
+        # merge overlapping row ranges of regions, then decode just those bands of rows
+        stride = args[1] if args[1] > 0 else image.width * len(image.mode)
+        rows = sorted([(max(int(b[1]), ty1), min(int(b[3]), ty2)) for b in hits])
+        bands = [list(rows[0])]
+        for r1, r2 in rows[1:]:
+            if r1 <= bands[-1][1]:
+                bands[-1][1] = max(bands[-1][1], r2)
+            else:
+                bands.append([r1, r2])
+        for r1, r2 in bands:
+            extents = (tx1, r1, tx2, r2)
+            offset2 = offset + (r1 - ty1) * stride
+            # newer Pillow versions use named tuples for tiles
+            tiles.append(tile._replace(extents=extents, offset=offset2) if hasattr(tile, "_replace") else (decoder, extents, offset2, args))
+    if len(tiles) == len(image.tile) and all([t in image.tile for t in tiles]):
+        return None
+    return tiles
+
+'''
+Cache of decoded photo pixels, stored on local disk as raw numpy arrays (.npy) and memory-mapped when loaded.
+Entries are keyed by photo path, modification time and size, so a changed photo is decoded again. When the cache grows
+over its size limit, least recently used entries (by file modification time, touched on every load) are evicted.
+:note: Safe to use from multiple processes and threads, entries are written to a temp file and then renamed.
+'''
+class PixelCache:
+
+    def __init__(self, dirpath, limit):
+        self.dirpath = dirpath
+        self.limit = limit  # bytes
+
+    def path(self, file):
+        stat = os.stat(file)
+        key = os.path.abspath(file) + "|" + str(stat.st_mtime_ns) + "|" + str(stat.st_size)
+        return os.path.join(self.dirpath, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npy")
+
+    def load(self, file):
+        path = self.path(file)
+        if os.path.exists(path):
+            try:
+                pixels = np.load(path, mmap_mode='r')
+                os.utime(path)
+                return pixels
+            except (ValueError, OSError):
+                pass  # corrupt or evicted by another process, decode again
+
+        # decode and store
+        with Image.open(file) as image:
+            decoded = np.array(image)
+        os.makedirs(self.dirpath, exist_ok=True)
+        tmp = path + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+        stored = np.lib.format.open_memmap(tmp, mode='w+', dtype=decoded.dtype, shape=decoded.shape)
+        stored[...] = decoded
+        stored.flush()
+        del stored
+        os.replace(tmp, path)
+        self.evict()
+        return np.load(path, mmap_mode='r')
+
+    def evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.dirpath):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for mtime, size, path in entries[:-1]:  # never evict most recent
+            if total <= self.limit:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
 def pixelWeightedMean(pixels, coord, dim):
     radius = int(dim / 2)
     scale = 1.0 / (dim * dim)
@@ -319,6 +454,137 @@ def isHDRRawAvailable(hdrImgPath):
             return True
     return False
 
+'''
+Function to compute the filepath of the cached thumbnail of a capture photo.
+Thumbnails are cached under the data directory in: .thumbs/<date>/<time>_<photo name>.jpg
+:param datadir: The data directory.
+:param photo: Filepath to a photo in the HDR folder of a capture date in the data directory.
+'''
+def thumbnailPath(datadir, photo):
+    timedir = os.path.dirname(photo)
+    datedir = os.path.dirname(os.path.dirname(timedir))
+    name = os.path.basename(timedir) + "_" + os.path.splitext(os.path.basename(photo))[0] + ".jpg"
+    return os.path.join(datadir, ".thumbs", os.path.basename(datedir), name)
+
+'''
+Function to create (if necessary) the cached thumbnail of a photo.
+The JPEG thumbnail embedded in the EXIF data is used when present, otherwise the photo is decoded at reduced size.
+:param photo: Filepath to the photo.
+:param thumbfile: Filepath of the thumbnail to create.
+:param size: Max width and height of the thumbnail.
+:return: True if thumbnail exists and is up to date with photo, False otherwise.
+'''
+def makeThumbnail(photo, thumbfile, size):
+    if not os.path.exists(photo):
+        return False
+    if os.path.exists(thumbfile) and os.path.getmtime(thumbfile) >= os.path.getmtime(photo):
+        return True
+
+    # embedded EXIF thumbnail
+    image = None
+    try:
+        with open(photo, 'rb') as f:
+            tags = exifread.process_file(f, details=True)
+        if 'JPEGThumbnail' in tags:
+            image = Image.open(io.BytesIO(tags['JPEGThumbnail']))
+    except Exception:
+        image = None
+    # reduced size decode (JPEG decoders can scale in DCT domain), photo is closed right after
+    if image is None:
+        with Image.open(photo) as src:
+            src.draft('RGB', (size, size))
+            image = src.convert('RGB')
+    else:
+        image = image.convert('RGB')
+    image.thumbnail((size, size))
+
+    # write to temp file and rename, so readers never see a partial thumbnail
+    os.makedirs(os.path.dirname(thumbfile), exist_ok=True)
+    tmpfile = thumbfile + "." + str(os.getpid()) + ".tmp"
+    image.save(tmpfile, format='JPEG', quality=85)
+    os.replace(tmpfile, thumbfile)
+    return True
+
+# - captures ------------------------------------------------------------------
+# - captures ------------------------------------------------------------------
+# - captures ------------------------------------------------------------------
+
+'''
+Function to find all capture time directories (named 'HH.MM.SS') of a directory.
+:param dirpath: Path to an HDR or ASD directory of a capture date.
+:param date: The (date) of the captures.
+:return: A sorted list of (datetime) capture timestamps.
+'''
+def findCaptureTimes(dirpath, date):
+    if not os.path.exists(dirpath):
+        return []
+    times = []
+    for dir in utility.findFiles(dirpath, mode=2):
+        name = os.path.basename(dir)
+        if utility.verifyDateTime(name, "%H.%M.%S"):
+            times.append(datetime.combine(date, datetime.strptime(name, "%H.%M.%S").time()))
+    times.sort()
+    return times
+
+'''
+Function to find the capture timestamp closest to another, within a threshold.
+:param times: A sorted list of (datetime) capture timestamps.
+:param capture: The (datetime) capture timestamp to look for.
+:param epsilon: Max acceptable time delta (seconds).
+:return: The closest (datetime) capture timestamp, or None if none are within threshold.
+'''
+def findClosestCaptureTime(times, capture, epsilon):
+    i = bisect.bisect_left(times, capture)
+    closest = None
+    for j in (i - 1, i):
+        if 0 <= j < len(times):
+            if closest is None or abs((times[j] - capture).total_seconds()) < abs((closest - capture).total_seconds()):
+                closest = times[j]
+    if closest is None or abs((closest - capture).total_seconds()) > epsilon:
+        return None
+    return closest
+
+'''
+Function to correlate two lists of capture timestamps (e.g. HDR and ASD captures) within a threshold.
+The second list is sorted once, then each timestamp of the first is matched to its closest counterpart by bisection,
+so a day of captures costs O(n log n) instead of comparing every pair.
+:param times1: A list of (datetime) capture timestamps (e.g. HDR).
+:param times2: A list of (datetime) capture timestamps (e.g. ASD).
+:param epsilon: Max acceptable time delta (seconds) between correlated captures.
+:return: A dict with the following keys:
+         "matched" list of (time1, time2) pairs, each time1 paired with its closest time2.
+         "unmatched1" list of time1 with no time2 within threshold.
+         "unmatched2" list of time2 not paired with any time1.
+         "ambiguous" list of (time1, [time2, ...]) where several time2 were within threshold of time1, or where time2
+         was also paired with another time1. Ambiguous pairs are still included in "matched".
+'''
+def correlateCaptureTimes(times1, times2, epsilon):
+    times2 = sorted(times2)
+    delta = timedelta(seconds=epsilon)
+    result = {"matched": [], "unmatched1": [], "unmatched2": [], "ambiguous": []}
+    paired = {}  # time2 -> [time1, ...]
+
+    for t in sorted(times1):
+        lo = bisect.bisect_left(times2, t - delta)
+        hi = bisect.bisect_right(times2, t + delta)
+        if lo >= hi:
+            result["unmatched1"].append(t)
+            continue
+        candidates = times2[lo:hi]
+        closest = findClosestCaptureTime(candidates, t, epsilon)
+        result["matched"].append((t, closest))
+        paired.setdefault(closest, []).append(t)
+        if len(candidates) > 1:
+            result["ambiguous"].append((t, candidates))
+
+    result["unmatched2"] = [t for t in times2 if t not in paired]
+    flagged = set([a[0] for a in result["ambiguous"]])
+    for t2, t1s in paired.items():
+        if len(t1s) > 1:
+            result["ambiguous"].extend([(t1, [t2]) for t1 in t1s if t1 not in flagged])
+    result["ambiguous"].sort(key=lambda a: a[0])
+    return result
+
 # - ASD -----------------------------------------------------------------------
 # - ASD -----------------------------------------------------------------------
 # - ASD -----------------------------------------------------------------------
@@ -336,26 +602,31 @@ def findASDFiles(datadir, capture):
     if not os.path.exists(pathASD):
         return []
 
-    # find all capture time dirs
-    captureDirs = utility.findFiles(pathASD, mode=2)
-    captureDirs[:] = [dir for dir in captureDirs if utility.verifyDateTime(os.path.basename(dir), "%H.%M.%S")]
-    if len(captureDirs) <= 0:
+    # find all capture times
+    captureTimes = findCaptureTimes(pathASD, capture.date())
+    if len(captureTimes) <= 0:
         return []
 
-    # find an ASD capture time within small threshold of HDR capture time
-    pathCapture = None
-    for dir in captureDirs:
-        timestr = datestr + " " + os.path.basename(dir)
-        time = datetime.strptime(timestr, "%Y-%m-%d %H.%M.%S")
-        delta = (capture - time).total_seconds()
-        if abs(delta) <= common.CaptureEpsilon:
-            pathCapture = os.path.join(pathASD, os.path.basename(dir))
-            break
-    if not os.path.exists(pathCapture):
+    # find the ASD capture time closest to HDR capture time (within small threshold)
+    time = findClosestCaptureTime(captureTimes, capture, common.CaptureEpsilon)
+    if time is None:
         return []
+    pathCapture = os.path.join(pathASD, datetime.strftime(time, "%H.%M.%S"))
 
-    # gather all .txt versions of ASD files taken at capture timestamp
-    return utility.findFiles(pathCapture, mode=1, ext=["txt"])
+    # gather all ASD files taken at capture timestamp
+    return findASDCaptureFiles(pathCapture)
+
+'''
+Function to gather the ASD files of a single capture directory.
+Binary .asd files are preferred (read natively), otherwise ViewSpecPro's .txt conversions are used.
+:param dirpath: Path to the ASD capture time directory.
+:return: A list of filepaths of the ASD files.
+'''
+def findASDCaptureFiles(dirpath):
+    asdfiles = utility.findFiles(dirpath, mode=1, ext=["asd"])
+    if len(asdfiles) == len(common.SamplingPattern):
+        return asdfiles
+    return utility.findFiles(dirpath, mode=1, ext=["txt"])
 
 '''
 Function to search for and retrieve the filepath of the specified ASD file.
@@ -385,7 +656,31 @@ def findASDFile(datadir, capture, sampleidx):
     return file
 
 '''
-Function to load a ViewSpecPro spectroradiometer ASD file.
+Function to load spectroradiometer ASD data, either a binary ASD file or a ViewSpecPro text conversion of one.
+:param filepath: Path to .asd or .asd.rad (binary) or .asd.rad.txt (text) file with ASD data
+:param step: Indicates which rows of the file to load
+:note: Binary files are read natively (see loadASDBinaryFile). If a binary file can't be converted to radiance, the
+       ViewSpecPro conversions (.asd to .asd.rad to .asd.rad.txt) of the same file are tried instead.
+:return: 2 lists, Xs (wavelengths) and Ys (radiance values)
+'''
+def loadASDFile(filepath, step=1):
+    if not os.path.exists(filepath):
+        return [], []
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == ".asd" or ext == ".rad":
+        wavelengths, radiances = loadASDBinaryFile(filepath)
+        if len(wavelengths) > 0:
+            return wavelengths[::step], radiances[::step]
+        # fallback to ViewSpecPro conversions
+        if ext == ".asd":
+            if os.path.exists(filepath + ".rad"):
+                return loadASDFile(filepath + ".rad", step)
+            return loadASDTextFile(filepath + ".rad.txt", step)
+        return loadASDTextFile(filepath + ".txt", step)
+    return loadASDTextFile(filepath, step)
+
+'''
+Function to load a ViewSpecPro spectroradiometer ASD text file.
 :param filepath: Path to TXT file with ASD data
 :param step: Indicates which rows of the file to load
 :note: File format should be a TXT with the following data per line: Wavelength, Reading
@@ -393,7 +688,7 @@ Function to load a ViewSpecPro spectroradiometer ASD file.
        That may not be a requirement for ASD data of future projects.
 :return: 2 lists, Xs (wavelengths) and Ys (radiance values)        
 '''
-def loadASDFile(filepath, step=1):
+def loadASDTextFile(filepath, step=1):
     if not os.path.exists(filepath):
         return [], []
     wavelengths = []
@@ -406,6 +701,100 @@ def loadASDFile(filepath, step=1):
         #wavelengths, radiances = np.loadtxt(filepath, skiprows=1, unpack=True)
     return wavelengths, radiances
 
+'''
+Function to load a binary ASD FieldSpec file (.asd, or ViewSpecPro's binary radiance .asd.rad) as radiance.
+:param filepath: Path to binary ASD file
+:note: Files already holding radiance are returned as is. Raw DN files are converted to radiance with the base and
+       lamp calibration buffers embedded in the file (file version 7), like ViewSpecPro does:
+       radiance = lamp * normalized(DN) / normalized(base)
+       where VNIR is normalized by integration time, and SWIR1/SWIR2 by their detector gains.
+:return: 2 numpy arrays, Xs (wavelengths) and Ys (radiance values). Both empty if file couldn't be converted.
+'''
+def loadASDBinaryFile(filepath):
+    with open(filepath, 'rb') as f:
+        buffer = f.read()
+    if len(buffer) < ASDHeaderSize or buffer[0:3] not in ASDVersions:
+        return [], []
+
+    # header
+    version = ASDVersions[buffer[0:3]]
+    datatype = buffer[186]
+    ch1wavel, wavelstep = struct.unpack_from('<ff', buffer, 191)
+    dataformat = buffer[199]
+    channels = struct.unpack_from('<H', buffer, 204)[0]
+    inttime = struct.unpack_from('<I', buffer, 390)[0]
+    swir1gain, swir2gain = struct.unpack_from('<HH', buffer, 436)
+    splice1, splice2 = struct.unpack_from('<ff', buffer, 444)
+    if dataformat not in ASDDataFormats or channels <= 0:
+        return [], []
+    dtype = np.dtype(ASDDataFormats[dataformat])
+    if len(buffer) < ASDHeaderSize + channels * dtype.itemsize:
+        return [], []
+
+    # spectrum
+    wavelengths = ch1wavel + np.arange(channels, dtype=np.float64) * wavelstep
+    spectrum = np.frombuffer(buffer, dtype=dtype, count=channels, offset=ASDHeaderSize).astype(np.float64)
+    if datatype == ASDDataTypeRad:
+        return wavelengths, spectrum
+    if datatype != ASDDataTypeRaw or version != 7:
+        return [], []
+
+    # calibration
+    calibration = findASDCalibration(buffer, channels)
+    if ASDCalTypeBase not in calibration or ASDCalTypeLamp not in calibration:
+        return [], []
+    base, baseinttime, baseswir1gain, baseswir2gain = calibration[ASDCalTypeBase]
+    lamp = calibration[ASDCalTypeLamp][0]
+    splices = (splice1, splice2)
+    target = normalizeASDSpectrum(spectrum, wavelengths, splices, inttime, swir1gain, swir2gain)
+    base = normalizeASDSpectrum(base, wavelengths, splices, baseinttime, baseswir1gain, baseswir2gain)
+    radiances = np.divide(lamp * target, base, out=np.zeros(channels), where=base != 0)
+    return wavelengths, radiances
+
+'''
+Function to find the calibration buffers of a version 7 binary ASD file.
+In version 7 files the calibration header and buffers are the last sections of the file. Header is a count followed
+by (type, name, integration time, swir1 gain, swir2 gain) per buffer, then one buffer of doubles per header entry.
+:param buffer: Bytes of entire ASD file.
+:param channels: Number of spectral channels.
+:return: A dict of calibration type to (numpy array, integration time, swir1 gain, swir2 gain).
+'''
+def findASDCalibration(buffer, channels):
+    for count in range(1, 5):
+        offset = len(buffer) - (count * channels * 8) - (count * ASDCalHeaderSize) - 1
+        if offset < ASDHeaderSize or buffer[offset] != count:
+            continue
+        entries = []
+        for i in range(0, count):
+            entry = offset + 1 + i * ASDCalHeaderSize
+            caltype = buffer[entry]
+            inttime, swir1gain, swir2gain = struct.unpack_from('<ihh', buffer, entry + 21)
+            entries.append((caltype, inttime, swir1gain, swir2gain))
+        if any(e[0] > 3 for e in entries):
+            continue
+        calibration = {}
+        dataoffset = offset + 1 + count * ASDCalHeaderSize
+        for i, (caltype, inttime, swir1gain, swir2gain) in enumerate(entries):
+            data = np.frombuffer(buffer, dtype='<f8', count=channels, offset=dataoffset + i * channels * 8)
+            calibration[caltype] = (data, inttime, swir1gain, swir2gain)
+        return calibration
+    return {}
+
+'''
+Function to normalize a raw DN ASD spectrum, so spectra of different integration times and gains can be compared.
+VNIR (up to first splice) is divided by integration time, SWIR1 and SWIR2 are divided by their detector gains
+(DN * 2048 / gain), like ViewSpecPro does.
+'''
+def normalizeASDSpectrum(spectrum, wavelengths, splices, inttime, swir1gain, swir2gain):
+    norm = np.array(spectrum, dtype=np.float64)
+    vnir = wavelengths <= splices[0]
+    swir1 = (wavelengths > splices[0]) & (wavelengths <= splices[1])
+    swir2 = wavelengths > splices[1]
+    norm[vnir] /= max(inttime, 1)
+    norm[swir1] *= 2048.0 / max(swir1gain, 1)
+    norm[swir2] *= 2048.0 / max(swir2gain, 1)
+    return norm
+
 # - sky cover -----------------------------------------------------------------
 # - sky cover -----------------------------------------------------------------
 # - sky cover -----------------------------------------------------------------
@@ -413,17 +802,105 @@ def loadASDFile(filepath, step=1):
 '''
 Function to find the first instance found of sky cover assessment of a particular capture time.
 :param capture: Capture (datetime) timestamp.
-:param skycovers: List of SkyCover conditions.
+:param skycovers: A SkyCoverIndex, or list of (start, end, SkyCover) conditions.
 :return: A sky cover. SkyCover.UNK is returned if none found. 
 '''
 def findCaptureSkyCover(capture, skycovers):
-    capture = capture.replace(second=0)
-    sky = common.SkyCover.UNK
-    for sc in skycovers:
-        if capture >= sc[0] and capture <= sc[1]:
-            sky = sc[2]
-            break
-    return sky
+    if not isinstance(skycovers, SkyCoverIndex):
+        skycovers = SkyCoverIndex(skycovers)
+    return skycovers.find(capture)
+
+'''
+Function to find the sky cover assessment of many capture times at once.
+:param captures: List of capture (datetime) timestamps.
+:param skycovers: A SkyCoverIndex, or list of (start, end, SkyCover) conditions.
+:return: A list of sky covers, one per capture. SkyCover.UNK for captures w/out an assessment.
+'''
+def classifyCaptureSkyCovers(captures, skycovers):
+    if not isinstance(skycovers, SkyCoverIndex):
+        skycovers = SkyCoverIndex(skycovers)
+    return skycovers.classify(captures)
+
+'''
+Class that indexes sky cover assessments for fast lookup by capture time.
+Assessments are (start, end, SkyCover) intervals at minute resolution, inclusive of both ends. They are flattened into
+sorted non-overlapping segments, so lookups are a binary search. Where assessments overlap, the one listed first wins
+(same as a linear search would), and a warning is recorded for each overlap (see warnings).
+'''
+class SkyCoverIndex:
+
+    def __init__(self, skycovers):
+        self.intervals = list(skycovers)
+        self.warnings = []
+        self.starts = np.zeros(0, dtype=np.int64)  # segment start minute (inclusive)
+        self.ends = np.zeros(0, dtype=np.int64)    # segment end minute (exclusive)
+        self.covers = []                           # segment SkyCover
+
+        # intervals as (start minute, end minute (exclusive), priority), sorted by start
+        intervals = []
+        for i, (start, end, sky) in enumerate(self.intervals):
+            if end < start:
+                self.warnings.append(str(start) + " - " + str(end) + " ends before it starts")
+                continue
+            intervals.append((SkyCoverIndex.minute(start), SkyCoverIndex.minute(end) + 1, i))
+        intervals.sort()
+
+        # detect overlaps
+        latest = None
+        for start, end, i in intervals:
+            if latest is not None and start < latest[1]:
+                a = self.intervals[latest[2]]
+                b = self.intervals[i]
+                kind = "overlaps" if a[2] == b[2] else "conflicts with"
+                self.warnings.append(str(b[0]) + " - " + str(b[1]) + " (" + b[2].name + ") " + kind + " " + str(a[0]) + " - " + str(a[1]) + " (" + a[2].name + ")")
+            if latest is None or end > latest[1]:
+                latest = (start, end, i)
+
+        # flatten into non-overlapping segments, the highest priority (first listed) active interval wins
+        bounds = sorted(set([b for start, end, i in intervals for b in (start, end)]))
+        active = []
+        k = 0
+        starts, ends, covers = [], [], []
+        for j in range(0, len(bounds) - 1):
+            while k < len(intervals) and intervals[k][0] <= bounds[j]:
+                heapq.heappush(active, (intervals[k][2], intervals[k][1]))
+                k += 1
+            while len(active) > 0 and active[0][1] <= bounds[j]:  # expired
+                heapq.heappop(active)
+            if len(active) <= 0:
+                continue
+            sky = self.intervals[active[0][0]][2]
+            if len(ends) > 0 and ends[-1] == bounds[j] and covers[-1] == sky:
+                ends[-1] = bounds[j + 1]
+            else:
+                starts.append(bounds[j])
+                ends.append(bounds[j + 1])
+                covers.append(sky)
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+        self.covers = covers
+
+    @staticmethod
+    def minute(dt):
+        return np.datetime64(dt, 'm').astype(np.int64)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def find(self, capture):
+        t = SkyCoverIndex.minute(capture)
+        i = bisect.bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return self.covers[i]
+        return common.SkyCover.UNK
+
+    def classify(self, captures):
+        if len(self.starts) <= 0:
+            return [common.SkyCover.UNK] * len(captures)
+        t = np.array(captures, dtype='datetime64[m]').astype(np.int64)
+        idx = np.searchsorted(self.starts, t, side='right') - 1
+        hit = (idx >= 0) & (t < self.ends[np.maximum(idx, 0)])
+        return [self.covers[i] if h else common.SkyCover.UNK for i, h in zip(idx, hit)]
 
 # - SPA -----------------------------------------------------------------------
 # - SPA -----------------------------------------------------------------------
@@ -495,27 +972,135 @@ def computeSunPosition(spadata):
     return (spadata.azimuth, altitude)
 
 '''
-Function to compute the (azimuth, altitude) points above horizon for each hour of the day using NREL SPA.
+Function to compute the (azimuth, altitude) points above horizon throughout the day using NREL SPA.
 :param spadata: spa_data object with site info and date
 :note: NREL SPA can be found at https://midcdmz.nrel.gov/spa/
-:return: A list of (azimuth, altitude, datetime) tuples with solar position and timestamp
+:return: A list of (azimuth, altitude, datetime) tuples with solar position and timestamp (see SolarEphemeris.path)
 '''
 def computeSunPath(spadata):
-    sunpath = []
-    spadata2 = deepcopySPAData(spadata)
-    spadata2.function = spa.SPA_ZA
-    spadata2.minute = 0
-    spadata2.second = 0
-    # for each hour of the day, compute a sunpath point
-    for i in range(0, 24):
-        spadata2.hour = i
-        spa.spa_calculate(spadata2)
-        altitude = 90 - spadata2.zenith   # this application uses altitude (90 - zenith)
+    return findSolarEphemeris(spadata, datetime(spadata.year, spadata.month, spadata.day).date()).path()
+
+'''
+Function to compute the (azimuth, altitude) position of the sun at a specific date and time, interpolated from the
+(cached) solar ephemeris of that date. This is much faster than computeSunPosition for many captures of the same date.
+:param spadata: spa_data object with site info (date and time are ignored)
+:param dt: datetime object
+:return: A single (azimuth, altitude) tuple of solar position.
+'''
+def interpolateSunPosition(spadata, dt):
+    return findSolarEphemeris(spadata, dt.date()).position(dt)
+
+'''
+Function to find the solar ephemeris of a site and date. Ephemerides are cached (per process), along with the sun
+positions they computed so far.
+:param spadata: spa_data object with site info (date and time are ignored)
+:param day: date object
+:param resolution: (optional) Seconds between sun positions computed. Default is the EphemerisResolution setting.
+:return: A SolarEphemeris object.
+'''
+def findSolarEphemeris(spadata, day, resolution=None):
+    if resolution is None:
+        resolution = common.AppSettings["EphemerisResolution"]
+    key = (spadata.time_zone, spadata.delta_ut1, spadata.delta_t, spadata.longitude, spadata.latitude, spadata.elevation,
+           spadata.pressure, spadata.temperature, spadata.slope, spadata.azm_rotation, spadata.atmos_refract, day, resolution)
+    ephemeris = SolarEphemeris.Cache.get(key)
+    if ephemeris is None:
+        if len(SolarEphemeris.Cache) >= SolarEphemeris.CacheLimit:
+            SolarEphemeris.Cache.clear()
+        ephemeris = SolarEphemeris(spadata, day, resolution)
+        SolarEphemeris.Cache[key] = ephemeris
+    return ephemeris
+
+'''
+Class that holds the sun positions of an entire day of a site, computed with NREL SPA every so many seconds.
+Sun positions at any time of the day are linearly interpolated (the sun moves ~0.25° a minute, so interpolation error
+at minute resolution is negligible). Azimuths are unwrapped between samples, so interpolation across 0°/360° is correct.
+Samples are computed lazily (and kept), so only the times asked for (e.g. captures, daylight sun path) cost SPA calls.
+:note: NREL SPA can be found at https://midcdmz.nrel.gov/spa/
+:note: Safe to use from multiple threads.
+'''
+class SolarEphemeris:
+
+    Cache = {}        # ephemerides already computed, see findSolarEphemeris
+    CacheLimit = 64   # max number of ephemerides cached, cache is cleared when full
+    PathStep = 300    # (seconds) between points of sun path (see path), plus every whole hour
+
+    def __init__(self, spadata, day, resolution):
+        self.date = day
+        self.midnight = datetime.combine(day, datetime.min.time())
+        self.resolution = max(1, int(resolution))
+        self.samples = {}  # seconds since midnight -> (azimuth, altitude)
+        self.lock = threading.Lock()
+        self.spadata = deepcopySPAData(spadata)
+        self.spadata.year = day.year
+        self.spadata.month = day.month
+        self.spadata.day = day.day
+
+        # sunrise, sun transit, sunset (None if sun doesn't rise or set)
+        self.spadata.function = spa.SPA_ZA_RTS
+        self.spadata.hour = 12
+        self.spadata.minute = 0
+        self.spadata.second = 0
+        spa.spa_calculate(self.spadata)
+        self.sunrise = self.hoursToDateTime(self.spadata.sunrise)
+        self.transit = self.hoursToDateTime(self.spadata.suntransit)
+        self.sunset = self.hoursToDateTime(self.spadata.sunset)
+        self.spadata.function = spa.SPA_ZA
+
+    def hoursToDateTime(self, hours):
+        if hours < 0 or hours >= 24:
+            return None
+        return self.midnight + timedelta(seconds=round(hours * 3600))
+
+    def sample(self, sec):
+        # sun position at a whole second of the day, computed once
+        position = self.samples.get(sec)
+        if position is None:
+            with self.lock:
+                self.spadata.hour = int(sec // 3600)
+                self.spadata.minute = int((sec % 3600) // 60)
+                self.spadata.second = int(sec % 60)
+                spa.spa_calculate(self.spadata)
+                position = (self.spadata.azimuth, 90 - self.spadata.zenith)  # this application uses altitude (90 - zenith)
+            self.samples[sec] = position
+        return position
+
+    def position(self, dt):
+        sec = min(max((dt - self.midnight).total_seconds(), 0), 86400)
+        sec0 = int(sec // self.resolution) * self.resolution
+        sec1 = min(sec0 + self.resolution, 86400)
+        azi0, alt0 = self.sample(sec0)
+        azi1, alt1 = self.sample(sec1)
+        if azi1 - azi0 > 180:
+            azi1 -= 360
+        elif azi1 - azi0 < -180:
+            azi1 += 360
+        t = (sec - sec0) / (sec1 - sec0) if sec1 > sec0 else 0
+        return ((azi0 + (azi1 - azi0) * t) % 360, alt0 + (alt1 - alt0) * t)
+
+    def path(self):
+        # only daylight (w/ a step of margin) is computed, whole day if sun doesn't rise or set
+        step = SolarEphemeris.PathStep
+        start, end = 0, 86400
+        seconds = set()
+        if self.sunrise is not None and self.sunset is not None and self.sunrise < self.sunset:
+            risesec = int((self.sunrise - self.midnight).total_seconds())
+            setsec = int((self.sunset - self.midnight).total_seconds())
+            start = max(0, risesec // step * step)
+            end = min(86400, setsec + step)
+            # ephemeris resolution near horizon, so path ends as close to sunrise and sunset as it can
+            seconds.update(range(risesec // self.resolution * self.resolution, min(risesec + step, 86400), self.resolution))
+            seconds.update(range(max(0, setsec - step) // self.resolution * self.resolution, min(setsec + self.resolution, 86400) + 1, self.resolution))
+        seconds.update(range(start, end + 1, step))
+        seconds.update(range((start + 3599) // 3600 * 3600, end + 1, 3600))  # on the hour, so hours can be labeled
+
         # we only care about altitude when sun is visible (not on other side of Earth)
-        if altitude >= 0 and altitude <= 90:
-            dt = datetime(spadata2.year, spadata2.month, spadata2.day, spadata2.hour, spadata2.minute, int(spadata2.second))
-            sunpath.append((spadata2.azimuth, altitude, dt))
-    return sunpath
+        sunpath = []
+        for sec in sorted(seconds):
+            azimuth, altitude = self.sample(sec)
+            if 0 <= altitude <= 90:
+                sunpath.append((azimuth % 360, altitude, self.midnight + timedelta(seconds=sec)))
+        return sunpath
 
 # - EXIF ----------------------------------------------------------------------
 # - EXIF ----------------------------------------------------------------------
@@ -535,11 +1120,12 @@ def imageEXIFDateTime(filepath):
 Function to extract the EXIF value of a particular tag.
 :param filepath: Path to image
 :param tag: EXIF tagname (not code) provided by module exifread
+:note: exifread stops parsing at the short tag name (w/out IFD prefix), so only the headers up to the tag are read.
 '''
 def imageEXIFTag(filepath, tag):
     result = None
     with open(filepath, 'rb') as f:
-        tags = exifread.process_file(f, details=False, stop_tag=tag)
+        tags = exifread.process_file(f, details=False, stop_tag=tag.split(' ', 1)[-1])
         if tag in tags.keys():
             result = tags[tag]
     return str(result) if result is not None else None
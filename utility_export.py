@@ -0,0 +1,508 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: A module with utility functionality for exporting sky samples.
+# ====================================================================
+import os
+import csv
+import json
+import math
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from colormath.color_objects import sRGBColor, HSVColor, HSLColor, LabColor
+from colormath.color_conversions import convert_color
+import common
+import utility_data
+import utility_angles
+
+
+'''
+Sidecar index of the samples in an export file, so samples already exported can be found w/out reading the file.
+The index file (<export file>.idx) has one key per exported row, in the same order as the rows. A key is made of the
+capture date, time, sample pattern index, exposure(s), and a hash of the export options. The size of the export file is
+appended after each batch of rows. If it doesn't match the export file (e.g. file edited by hand), the index is rebuilt.
+Keys only hold what the export file holds, so rebuilt keys match. Without the SamplePatternIndex and Exposure features,
+rows of a capture can't be told apart, so samples already exported aren't looked up at all (see dedupe and warning).
+An index can be kept and reused for many exports to the same file with the same options (see refresh).
+'''
+class ExportIndex:
+
+    Extension = ".idx"
+
+    def __init__(self, fileout, options):
+        self.fileout = fileout
+        self.path = fileout + ExportIndex.Extension
+        self.optionsHash = ExportIndex.hashOptions(options)
+        features = [common.SampleFeatures[i][0] for i in options["Features"]]
+        self.hasSample = "SamplePatternIndex" in features
+        self.hasExposure = "Exposure" in features
+        self.dedupe = True  # False if rows can't be told apart, see load
+        self.keys = []      # one per row of export file (in order)
+        self.lookup = set()
+        self.rebuilt = False
+        self.valid = True   # False if file isn't an export file (see rebuild)
+        self.stat = None    # (size, modification time) of export file when index was last in sync with it
+        self.load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self.dedupe and key in self.lookup
+
+    '''
+    :return: Warning (str) if samples already exported can't be found in export file, empty str otherwise.
+    '''
+    def warning(self):
+        if self.dedupe:
+            return ""
+        return "Warning: " + self.fileout + " doesn't have SamplePatternIndex and Exposure features, so samples already exported can't be skipped or replaced."
+
+    '''
+    Hash the export options that change what is exported (not where or how duplicates are handled).
+    '''
+    @staticmethod
+    def hashOptions(options):
+        relevant = {k: options[k] for k in options if k not in ["Filename", "Duplicates"]}
+        return hashlib.md5(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:12]
+
+    '''
+    Delete the index of an export file (if one exists).
+    '''
+    @staticmethod
+    def delete(fileout):
+        path = fileout + ExportIndex.Extension
+        if os.path.exists(path):
+            os.unlink(path)
+
+    '''
+    :param fileout: Path of export file.
+    :param options: Export options.
+    :return: True if this is the index of export file w/ export options.
+    '''
+    def matches(self, fileout, options):
+        return self.fileout == fileout and self.optionsHash == ExportIndex.hashOptions(options)
+
+    '''
+    :param capture: Capture (datetime) timestamp.
+    :param sampleidx: Sample pattern index.
+    :param exposures: List of exposures exported with the sample.
+    :return: Key of the sample (str).
+    '''
+    def key(self, capture, sampleidx, exposures):
+        return self.makeKey(str(capture.date()), str(capture.time()), str(sampleidx), [str(e) for e in exposures])
+
+    '''
+    Make a key from the text of the key columns, as written in export file (see key and rebuild).
+    Sample index and exposures are left out if not exported, so keys of rebuilt and live rows are the same.
+    '''
+    def makeKey(self, date, time, sampleidx, exposures):
+        return ",".join([date, time, sampleidx if self.hasSample else "", ";".join(exposures) if self.hasExposure else "", self.optionsHash])
+
+    def fileStat(self):
+        if not os.path.exists(self.fileout):
+            return None
+        stat = os.stat(self.fileout)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    '''
+    Reload the index only if the export file changed since the index was last in sync with it (e.g. by another program).
+    This is cheap otherwise, so call it before reusing an index.
+    '''
+    def refresh(self):
+        self.rebuilt = False
+        if self.fileStat() != self.stat:
+            self.load()
+
+    def load(self):
+        self.keys = []
+        self.lookup = set()
+        self.valid = True
+        self.dedupe = self.hasSample and self.hasExposure
+        if not os.path.exists(self.fileout):
+            ExportIndex.delete(self.fileout)
+            self.stat = None
+            return
+
+        size = -1
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as file:
+                for line in file:
+                    line = line.rstrip("\n")
+                    if line.startswith("#"):
+                        size = int(line[1:])
+                    elif len(line) > 0:
+                        self.keys.append(line)
+        if size != os.path.getsize(self.fileout):
+            self.rebuild()
+        self.lookup = set(self.keys)
+        self.stat = self.fileStat()
+
+    '''
+    Rebuild the index by reading the key columns of the export file.
+    :note: The export options of rows can't be recovered from the file, so current export options are assumed.
+    :note: If the file has no 'Date' and 'Time' columns it isn't an export file, and the index is marked invalid.
+    '''
+    def rebuild(self):
+        self.keys = []
+        with open(self.fileout, 'r') as file:
+            reader = csv.reader(file, delimiter=',')
+            header = next(reader, None)
+            if header is not None and ("Date" not in header or "Time" not in header):
+                self.valid = False
+                return
+            if header is not None:
+                idt = header.index("Date")
+                itm = header.index("Time")
+                isi = header.index("SamplePatternIndex") if "SamplePatternIndex" in header else -1
+                iexp = [i for i in range(0, len(header)) if header[i].startswith("Exposure")]
+                # file written w/ other features than current export options? rows can't be told apart
+                if (self.hasSample and isi < 0) or (self.hasExposure and len(iexp) <= 0):
+                    self.dedupe = False
+                for row in reader:
+                    if len(row) <= 0:
+                        continue
+                    self.keys.append(self.makeKey(row[idt], row[itm], row[isi] if isi >= 0 else "", [row[i] for i in iexp]))
+        self.save()
+        self.rebuilt = True
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as file:
+            for key in self.keys:
+                file.write(key + "\n")
+            file.write("#" + str(os.path.getsize(self.fileout)) + "\n")
+        os.replace(tmp, self.path)
+        self.stat = self.fileStat()
+
+    '''
+    Record rows just appended to the export file.
+    :param keys: List of keys, one per appended row (in order).
+    '''
+    def append(self, keys):
+        with open(self.path, 'a') as file:
+            for key in keys:
+                file.write(key + "\n")
+            file.write("#" + str(os.path.getsize(self.fileout)) + "\n")
+        self.keys.extend(keys)
+        self.lookup.update(keys)
+        self.stat = self.fileStat()
+
+    '''
+    Remove rows from the export file (and index). The export file is rewritten by streaming it once.
+    :param keys: List of keys of rows to remove.
+    :return: Number of rows removed.
+    '''
+    def remove(self, keys):
+        keys = set(keys)
+        kept = []
+        tmp = self.fileout + ".tmp"
+        with open(self.fileout, 'rb') as filein, open(tmp, 'wb') as fileout:
+            fileout.write(filein.readline())  # header
+            for key, line in zip(self.keys, filein):
+                if key not in keys:
+                    fileout.write(line)
+                    kept.append(key)
+        os.replace(tmp, self.fileout)
+        removed = len(self.keys) - len(kept)
+        self.keys = kept
+        self.lookup = set(kept)
+        self.save()
+        return removed
+
+
+'''
+Function to find the photos of every exposure to export for a capture.
+:param datadir: The data directory.
+:param capture: Capture (datetime) timestamp.
+:param exposure: Exposure (seconds) to export (ignored if exporting HDR, all exposures are exported).
+:param options: Export options.
+:return: A tuple of lists (exposures, photos, error). Lists are empty and error is a str if a photo wasn't found.
+'''
+def findExportPhotos(datadir, capture, exposure, options):
+    exposures = []  # list of exposures to export
+    expphotos = []  # list of photos per exposure
+    ext = common.SourceExt(options["SourceExt"]).name.lower()
+    for exp in (common.Exposures if options["IsHDR"] else [exposure]):
+        photo = utility_data.findHDRFile(datadir, capture, exp, ext)
+        if not photo or len(photo) <= 0:
+            return [], [], "Photo for exposure '" + str(exp) + "' not found."
+        exposures.append(exp)
+        expphotos.append(photo)
+    return exposures, expphotos, None
+
+'''
+Function to write the header row of a new export file (creating its directory if needed).
+:param fileout: Path of export file.
+:param options: Export options.
+'''
+def writeExportHeader(fileout, options):
+    if len(os.path.dirname(fileout)) > 0 and not os.path.exists(os.path.dirname(fileout)):
+        os.makedirs(os.path.dirname(fileout))
+    delimiter = ","
+    resolution = options["SpectrumResolution"]
+    with open(fileout, "w") as file:
+        for fidx in options["Features"]:
+            feature = common.SampleFeatures[fidx][0]
+            if feature == "Exposure":
+                if options["IsHDR"]:
+                    for j in range(0, len(common.Exposures)):
+                        file.write("Exposure" + str(j+1) + delimiter)
+                else:
+                    file.write("Exposure" + delimiter)
+            elif feature == "PixelColor":
+                if options["IsHDR"]:
+                    for j in range(0, len(common.Exposures)):
+                        file.write("ColorA" + str(j+1) + delimiter + "ColorB" + str(j+1) + delimiter + "ColorC" + str(j+1) + delimiter)
+                else:
+                    file.write("ColorA" + delimiter + "ColorB" + delimiter + "ColorC" + delimiter)
+            elif feature == "Radiance":
+                file.write(str(options["SpectrumStart"]))  # first wavelength, no delimiter
+                for w in range(options["SpectrumStart"] + resolution, options["SpectrumEnd"] + 1, resolution):
+                    file.write(delimiter + str(w))  # delimiter plus next wavelength
+            else:
+                file.write(feature)
+                file.write(delimiter)
+        file.write("\n")
+
+'''
+Function to compute the export rows of samples of a capture.
+This doesn't touch the export file, so it is safe to call from parallel workers.
+:param capture: Capture (datetime) timestamp.
+:param samples: List of sample pattern indices to export.
+:param exposures: List of exposures to export (see findExportPhotos).
+:param expphotos: List of photos, one per exposure (see findExportPhotos).
+:param asdfiles: List of ASD files of capture, one per sample of sampling pattern.
+:param options: Export options.
+:return: A list of rows (str), one per sample, each ending in a newline.
+'''
+def computeExportRows(capture, samples, exposures, expphotos, asdfiles, options):
+    # compute sun position
+    sunpos = utility_data.interpolateSunPosition(common.SPASiteData, capture)
+
+    # compute locations in photo to sample from
+    # NOTE: assumes same positions for all files! (speed up) could be recomputed per file
+    filesamplepoints = utility_data.computePointsInImage(expphotos[0], common.SamplingPattern)
+    points = [filesamplepoints[i] for i in samples]
+    coords = [common.SamplingPattern[i] for i in samples]  # sample coordinates
+
+    # determine pixel regions and weighting
+    pixweight = common.PixelWeighting(options["PixelWeighting"])
+    pixregions = []
+    if options["ComputePixelRegion"]:
+        pixregions = [common.AltitudeRegionMap[c[1]] for c in coords]
+    else:
+        reg = options["PixelRegion"]
+        pixregions = [reg for i in range(0, len(points))]
+
+    # compute pixels, list of lists of pixels per exposure
+    # photos of exposures are decoded concurrently (decoding releases the GIL), a bounded number at a time to limit memory
+    collect = lambda photo: utility_data.collectPixels(points, pixregions, file=photo, weighting=pixweight)
+    threads = min(len(exposures), max(1, common.AppSettings["ExportDecodeThreads"]))
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            exppixels = list(executor.map(collect, expphotos[:len(exposures)]))
+    else:
+        exppixels = [collect(expphotos[i]) for i in range(0, len(exposures))]
+
+    # modify pixels per color model
+    color = common.ColorModel(options["ColorModel"])
+    colorclass = {common.ColorModel.HSV: HSVColor, common.ColorModel.HSL: HSLColor, common.ColorModel.LAB: LabColor}.get(color)
+    if colorclass is not None:
+        for pixels in exppixels:
+            for i in range(0, len(samples)):
+                rgb = sRGBColor(pixels[i][0], pixels[i][1], pixels[i][2], is_upscaled=True)
+                pixels[i] = convert_color(rgb, colorclass).get_value_tuple()
+
+    # modify coordinates per coordinate system
+    coordsys = common.CoordSystem(options["CoordSystem"])
+    if coordsys == common.CoordSystem.Polar:
+        coordsfinal = coords
+        sunposfinal = sunpos
+    elif coordsys == common.CoordSystem.PolarNorm:
+        coordsfinal = [(c[0]/360.0, c[1]/90.0) for c in coords]
+        sunposfinal = (sunpos[0]/360.0, sunpos[1]/90.0)
+    elif coordsys == common.CoordSystem.UV:
+        coordsfinal = [(utility_angles.SkyCoord2FisheyeUV(c[0], c[1])) for c in coords]
+        sunposfinal = (utility_angles.SkyCoord2FisheyeUV(sunpos[0], sunpos[1]))
+
+    # init
+    delimiter = ","
+    speccount = options["SpectrumEnd"] - options["SpectrumStart"] + 1
+    resolution = options["SpectrumResolution"]
+    skycover = utility_data.findCaptureSkyCover(capture, common.SkyCoverData)
+
+    rows = []
+    for i, sIdx in enumerate(samples):
+        row = []
+
+        # export each required attribute
+        row.append(str(capture.date()) + delimiter)  # date
+        row.append(str(capture.time()) + delimiter)  # time
+        row.append(str(coordsys.value) + delimiter)  # space
+
+        # export each optional attribute
+        for aIdx in options["Features"]:
+            feature = common.SampleFeatures[aIdx][0]
+
+            # export sun azimuth
+            if feature == "SunAzimuth":
+                row.append('{0:.4f}'.format(sunposfinal[0]) + delimiter)
+            # export sun altitude
+            elif feature == "SunAltitude":
+                row.append('{0:.4f}'.format(sunposfinal[1]) + delimiter)
+            # export sky cover
+            elif feature == "SkyCover":
+                row.append(str(skycover.value) + delimiter)
+            # export index
+            elif feature == "SamplePatternIndex":
+                row.append(str(sIdx) + delimiter)
+            # export sample azimuth
+            elif feature == "SampleAzimuth":
+                row.append('{0:.4f}'.format(coordsfinal[i][0]) + delimiter)
+            # export sample altitude
+            elif feature == "SampleAltitude":
+                row.append('{0:.4f}'.format(coordsfinal[i][1]) + delimiter)
+            # export sun point/sample angle
+            elif feature == "SunPointAngle":
+                angle = math.degrees(utility_angles.CentralAngle(sunpos, coords[i]))
+                row.append('{0:.3f}'.format(angle) + delimiter)
+            # export pixel neighborhood
+            elif feature == "PixelRegion":
+                row.append(str(pixregions[i]) + delimiter)
+            # export pixel weighting method
+            elif feature == "PixelWeighting":
+                row.append(str(pixweight.value) + delimiter)
+            # export pixel color model
+            elif feature == "ColorModel":
+                row.append(str(color.value) + delimiter)
+            # export photo exposure time(s)
+            elif feature == "Exposure":
+                for exp in exposures:
+                    row.append(str(exp) + delimiter)
+            # export sample pixel color(s)
+            elif feature == "PixelColor":
+                for pixels in exppixels:
+                    row.append(str(pixels[i][0]) + delimiter)  # color component 1
+                    row.append(str(pixels[i][1]) + delimiter)  # color component 2
+                    row.append(str(pixels[i][2]) + delimiter)  # color component 3
+            # export spectral radiance
+            elif feature == "Radiance":
+                xs, ys = utility_data.loadASDFile(asdfiles[sIdx])
+                row.append(str(max(ys[0],0)))  # first wavelength, no delimiter
+                for j in range(resolution, speccount, resolution):
+                    row.append(delimiter + str(max(ys[j],0)))  # delimiter plus next wavelength
+
+        # next sample
+        row.append("\n")
+        rows.append("".join(row))
+
+    return rows
+
+'''
+Function to append rows to an export file, writing its header first if it's a new file.
+:param fileout: Path of export file.
+:param options: Export options.
+:param index: ExportIndex of export file.
+:param keys: List of keys of rows (see ExportIndex.key).
+:param rows: List of rows (see computeExportRows).
+'''
+def appendExportRows(fileout, options, index, keys, rows):
+    if not os.path.exists(fileout):
+        writeExportHeader(fileout, options)
+    with open(fileout, "a") as file:
+        file.writelines(rows)
+    index.append(keys)
+
+'''
+Function to export samples of a capture to an export file.
+Samples already in the export file are skipped or replaced, per export options (see ExportIndex).
+:param datadir: The data directory.
+:param fileout: Path of export file.
+:param capture: Capture (datetime) timestamp.
+:param samples: List of sample pattern indices to export.
+:param exposure: Exposure (seconds) to export (ignored if exporting HDR).
+:param options: Export options.
+:param asdfiles: List of ASD files of capture (found if not specified).
+:param log: Function to log messages with.
+:param verbose: Log info messages (errors are always logged).
+:param index: ExportIndex of export file w/ export options, kept by caller to reuse across exports (loaded if not specified).
+:return: Number of samples exported.
+'''
+def exportCapture(datadir, fileout, capture, samples, exposure, options, asdfiles=None, log=print, verbose=True, index=None):
+    # find photos for every exposure we intend to export
+    exposures, expphotos, error = findExportPhotos(datadir, capture, exposure, options)
+    if error:
+        log("Error: " + error + " Export canceled.")
+        return 0
+
+    # skip or replace samples already in export file
+    if index is None:
+        index = ExportIndex(fileout, options)
+    else:
+        index.refresh()
+    if not index.valid:
+        log("Error: " + fileout + " is not an export file (no Date and Time columns). Export canceled.")
+        return 0
+    if index.rebuilt:
+        log("Info: Rebuilt export index of " + fileout)
+    if verbose and len(index.warning()) > 0 and common.ExportDuplicates(options["Duplicates"]) != common.ExportDuplicates.Append:
+        log(index.warning())
+    keys = {sIdx: index.key(capture, sIdx, exposures) for sIdx in samples}
+    existing = [sIdx for sIdx in samples if keys[sIdx] in index]
+    duplicates = common.ExportDuplicates(options["Duplicates"])
+    if len(existing) > 0 and duplicates == common.ExportDuplicates.Skip:
+        samples = [sIdx for sIdx in samples if keys[sIdx] not in index]
+        if verbose:
+            log("Info: Skipping " + str(len(existing)) + " sample(s) already exported.")
+        if len(samples) <= 0:
+            return 0
+    elif len(existing) > 0 and duplicates == common.ExportDuplicates.Replace:
+        removed = index.remove([keys[sIdx] for sIdx in existing])
+        if verbose:
+            log("Info: Replacing " + str(removed) + " sample(s) already exported.")
+
+    # find ASD files for every sample in sampling pattern (otherwise indexing will be off)
+    if asdfiles is None:
+        asdfiles = utility_data.findASDFiles(datadir, capture)
+    if len(asdfiles) <= 0:
+        log("Error: No ASD files found for " + str(capture) + ". Export canceled.")
+        return 0
+    if len(asdfiles) != len(common.SamplingPattern):
+        log("Error: Found " + str(len(asdfiles)) + " ASD files for " + str(capture) +". Sample pattern should have " + str(len(common.SamplingPattern)) + ". Export canceled.")
+        return 0
+
+    # compute and write
+    if verbose:
+        log("Exporting... ")
+    rows = computeExportRows(capture, samples, exposures, expphotos, asdfiles, options)
+    appendExportRows(fileout, options, index, [keys[sIdx] for sIdx in samples], rows)
+    return len(rows)
+
+'''
+Function to read the captures of a dataset (export file) so they can be re-exported (converted).
+Consecutive rows of the same capture timestamp are grouped into one capture.
+:param filepath: Path of dataset. 'Date' 'Time' and 'SamplePatternIndex' features are required, 'Exposure' is optional.
+:return: A list of [capture, samples, exposure] lists, where exposure is 0 if dataset has no 'Exposure' feature.
+'''
+def readDatasetCaptures(filepath):
+    captures = []
+    with open(filepath, 'r') as file:
+        reader = csv.reader(file, delimiter=",")
+        header = next(reader, None)
+        if header is None:
+            return captures
+        mapping = {header[i]: i for i in range(0, len(header))}
+        for row in reader:
+            if len(row) <= 0:
+                continue
+            ts = datetime.strptime(row[mapping['Date']] + ' ' + row[mapping['Time']], "%m/%d/%Y %H:%M:%S")
+            if len(captures) <= 0 or captures[-1][0] != ts:
+                captures.append([ts, [], 0])
+            captures[-1][1].append(int(row[mapping["SamplePatternIndex"]]))
+            if "Exposure" in mapping:
+                captures[-1][2] = float(row[mapping["Exposure"]])
+    return captures
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: A module with spatial indexing of 2D points (screen coordinates, etc.).
+# ====================================================================
+import math
+import numpy as np
+
+
+'''
+A uniform grid over a set of 2D points, used for fast hit-testing and rect selection.
+Points are bucketed into square cells and stored contiguously per cell (sorted by cell id), so that any rect of
+cells can be gathered with a handful of slices instead of scanning every point.
+:note: Rebuild the grid whenever the points move (e.g. widget resize). Building is O(n log n).
+'''
+class PointGrid:
+
+    def __init__(self, points, cellsize):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.cellsize = max(float(cellsize), 1.0)
+        self.origin = np.zeros(2)
+        self.dims = np.zeros(2, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)   # point indices sorted by cell id
+        self.starts = np.zeros(1, dtype=np.int64)  # offset into order for each cell id (plus one at the end)
+        if len(self.points) <= 0:
+            return
+
+        # bucket points into cells
+        self.origin = self.points.min(axis=0)
+        cells = np.floor((self.points - self.origin) / self.cellsize).astype(np.int64)
+        self.dims = cells.max(axis=0) + 1
+        ids = cells[:, 1] * self.dims[0] + cells[:, 0]
+        self.order = np.argsort(ids, kind='mergesort')
+        self.starts = np.searchsorted(ids[self.order], np.arange(self.dims[0] * self.dims[1] + 1))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, x, y):
+        return (int(math.floor((x - self.origin[0]) / self.cellsize)),
+                int(math.floor((y - self.origin[1]) / self.cellsize)))
+
+    def _gather(self, c1, r1, c2, r2):
+        # clip cell rect to grid
+        c1 = max(c1, 0)
+        r1 = max(r1, 0)
+        c2 = min(c2, self.dims[0] - 1)
+        r2 = min(r2, self.dims[1] - 1)
+        if c1 > c2 or r1 > r2:
+            return np.zeros(0, dtype=np.int64)
+        # each row of cells is a contiguous run in the sorted order
+        runs = []
+        for r in range(r1, r2 + 1):
+            first = r * self.dims[0] + c1
+            last = r * self.dims[0] + c2
+            runs.append(self.order[self.starts[first]:self.starts[last + 1]])
+        return np.concatenate(runs)
+
+    '''
+    Find all points within an inclusive rect.
+    :return: A sorted numpy array of point indices.
+    '''
+    def queryRect(self, x1, y1, x2, y2):
+        if len(self.points) <= 0:
+            return np.zeros(0, dtype=np.int64)
+        c1, r1 = self._cell(x1, y1)
+        c2, r2 = self._cell(x2, y2)
+        candidates = self._gather(c1, r1, c2, r2)
+        pts = self.points[candidates]
+        inside = (pts[:, 0] >= x1) & (pts[:, 0] <= x2) & (pts[:, 1] >= y1) & (pts[:, 1] <= y2)
+        return np.sort(candidates[inside])
+
+    '''
+    Find the point closest to (x, y).
+    :return: A tuple of (index, distance). Index is -1 if there are no points.
+    '''
+    def nearest(self, x, y):
+        if len(self.points) <= 0:
+            return -1, math.inf
+        c, r = self._cell(x, y)
+        # how many rings of cells until we've covered the entire grid
+        ringmax = max(abs(c), abs(r), abs(self.dims[0] - 1 - c), abs(self.dims[1] - 1 - r))
+        best = -1
+        bestdist = math.inf
+        for ring in range(0, ringmax + 1):
+            candidates = self._gather(c - ring, r - ring, c + ring, r + ring)
+            if len(candidates) > 0:
+                d = np.hypot(self.points[candidates, 0] - x, self.points[candidates, 1] - y)
+                dmin = float(d.min())
+                if dmin <= bestdist:
+                    best = int(candidates[d == dmin].min())  # ties go to lowest index
+                    bestdist = dmin
+            # anything outside this ring of cells is at least this far away
+            if best >= 0 and bestdist <= ring * self.cellsize:
+                break
+        return best, bestdist
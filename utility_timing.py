@@ -0,0 +1,158 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: Lightweight timing of hot paths (spans), aggregated into rolling percentiles.
+# ====================================================================
+import time
+import functools
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+
+Enabled = False    # when disabled, spans do nothing (no clock reads, no allocations)
+Window = 200       # number of most recent timings of each span kept for percentiles
+Levels = [50, 95]  # percentiles reported
+Spans = {}         # span name -> SpanStats
+
+
+'''
+Class that holds the rolling timings of a single span.
+'''
+class SpanStats:
+
+    def __init__(self):
+        self.count = 0
+        self.last = 0
+        self.timings = deque(maxlen=Window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.last = seconds
+        self.timings.append(seconds)
+
+    def percentiles(self, levels=Levels):
+        if len(self.timings) <= 0:
+            return [0] * len(levels)
+        return list(np.percentile(np.asarray(self.timings), levels))
+
+
+'''
+Class of a no-op span, returned when timing is disabled.
+'''
+class NoSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+'''
+Class of a span being timed (see span).
+'''
+class Span:
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+NoSpanInstance = NoSpan()
+
+
+'''
+Function to enable or disable timing. Timings collected so far are kept.
+:param state: True to enable, False to disable.
+'''
+def enable(state):
+    global Enabled
+    Enabled = bool(state)
+
+'''
+Function to time a block of code. Use as: with utility_timing.span("name"): ...
+:param name: Name of span. Use "parent.stage" names for stages of a larger span.
+:return: A context manager. A shared no-op one if timing is disabled.
+'''
+def span(name):
+    if not Enabled:
+        return NoSpanInstance
+    return Span(name)
+
+'''
+Function decorator to time every call of a function.
+:param name: Name of span.
+'''
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+'''
+Function to record a timing of a span.
+:param name: Name of span.
+:param seconds: Duration.
+'''
+def record(name, seconds):
+    stats = Spans.get(name)
+    if stats is None:
+        stats = Spans[name] = SpanStats()
+    stats.add(seconds)
+
+'''
+Function to clear all timings collected.
+'''
+def reset():
+    Spans.clear()
+
+'''
+Function to summarize a span.
+:param name: Name of span.
+:return: A str like "name: last 12.3ms, p50 10.1ms, p95 20.4ms (n=42)", or empty str if span has no timings.
+'''
+def summary(name):
+    stats = Spans.get(name)
+    if stats is None:
+        return ""
+    text = name + ": last " + "{0:.1f}ms".format(stats.last * 1000)
+    for level, value in zip(Levels, stats.percentiles()):
+        text += ", p" + str(level) + " " + "{0:.1f}ms".format(value * 1000)
+    return text + " (n=" + str(stats.count) + ")"
+
+'''
+Function to summarize all spans.
+:return: A list of str, one per span, sorted by name (so stages follow their parent).
+'''
+def report():
+    return [summary(name) for name in sorted(Spans.keys())]
+
+'''
+Function to append a summary of all spans to a log file.
+:param filepath: Path to log file.
+'''
+def dump(filepath):
+    with open(filepath, 'a') as file:
+        file.write("# " + str(datetime.now()) + "\n")
+        for line in report():
+            file.write(line + "\n")
+        file.write("\n")
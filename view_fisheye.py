@@ -9,14 +9,36 @@ import os
 import math
 from enum import Enum
 from datetime import datetime
-from PyQt5.QtCore import Qt, QRect, QPoint, QPointF, QLine, QLineF
-from PyQt5.QtGui import QFont, QFontMetrics, QPainter, QPen, QBrush, QImage, QPixmap, QPainterPath, QTransform, QColor
+from PyQt5.QtCore import Qt, QRect, QSize, QPoint, QPointF, QLine, QLineF, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QFont, QFontMetrics, QPainter, QPen, QBrush, QImage, QImageReader, QPixmap, QPainterPath, QTransform, QColor, QGuiApplication
 from PyQt5.QtWidgets import QWidget, QStyle
 import numpy as np
 import common
 import utility
 import utility_angles
 import utility_data
+import utility_spatial
+import utility_timing
+
+
+class PhotoPixelsSignals(QObject):
+    # generation, pixels (numpy array), error message (empty if succeeded)
+    done = pyqtSignal(int, object, str)
+
+
+class PhotoPixelsTask(QRunnable):
+
+    def __init__(self, signals, generation, path):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.path = path
+
+    def run(self):
+        try:
+            self.signals.done.emit(self.generation, utility_data.loadPhotoPixels(self.path), "")
+        except Exception as ex:
+            self.signals.done.emit(self.generation, np.zeros(shape=(1, 1, 4)), "Error: Failed to load pixels of " + self.path + ": " + str(ex))
 
 
 class ViewFisheye(QWidget):
@@ -33,8 +55,11 @@ class ViewFisheye(QWidget):
 
         # members
         self.parent = parent
-        self.myPhoto = QImage()
-        self.myPhotoPixels = np.zeros(shape=(1, 1, 4))
+        self.myPhoto = QImage()          # photo decoded at (about) screen resolution, for display
+        self.myPhotoSize = QSize()       # resolution of photo on file
+        self.myPhotoPixels = None        # full resolution pixels of photo on file, loaded on demand (see requestPhotoPixels)
+        self.myPhotoPixelsPending = False
+        self.myPhotoGeneration = 0       # incremented every time photo changes, so stale pixels are ignored
         self.myPhotoPath = ""
         self.myPhotoTime = datetime(1,1,1)
         self.myPhotoSrcRect = QRect()
@@ -48,13 +73,18 @@ class ViewFisheye(QWidget):
         self.sunPosition = (0, 0)        # (azimuth (theta), altitude (phi)(90-zenith))
         self.sunPositionVisible = (0,0)  # point (x,y) of sun location rendered on screen (scaled)
         self.sunPathPoints = []          # [(azimuth (theta), altitude (phi)(90-zenith), datetime)]
+        self.sunPathHours = []           # indices of sun path points on the hour (labeled)
+        self.sunTimes = (None, None, None)  # (sunrise, transit, sunset) datetimes
         self.compassTicks = []           # [[x1, y1, x2, y2, x1lbl, y1lbl, angle]]
         self.lensIdealRadii = []         # list of radii for ideal lens latitudes to draw
         self.lensRealRadii = []          # list of radii for real/warped lens latitudes to draw
         self.samplePoints = []           # (x,y) coords of all samples on the photo rendered on screen (scaled)
         self.sampleAreaVisible = []      # area of 4 points for each sample rendered on screen (scaled)
         self.samplePointsInFile = []     # points (x,y) of all samples in the photo on file
-        self.samplesSelected = []        # indices of selected samples
+        self.samplesSelected = []        # indices of selected samples (ordered view of samplesMask)
+        self.samplesMask = np.zeros(0, dtype=bool)          # selection state of each sample in sampling pattern
+        self.sampleGrid = utility_spatial.PointGrid([], 1)  # spatial index over samplePoints
+        self.sampleSunAngles = np.zeros(0)                  # central angle (radians) between sun and each sample
         self.skyCover = common.SkyCover.UNK
 
         # members - preloaded graphics
@@ -75,11 +105,17 @@ class ViewFisheye(QWidget):
         self.fontMetrics = QFontMetrics(self.fontScaled)
         self.iconWarning = self.style().standardIcon(QStyle.SP_MessageBoxWarning).pixmap(ViewFisheye.SelectedPixelBox / 2)
 
+        # full resolution pixels are decoded in the background, one photo at a time
+        self.pixelsPool = QThreadPool()
+        self.pixelsPool.setMaxThreadCount(1)
+        self.pixelsSignals = PhotoPixelsSignals()
+        self.pixelsSignals.done.connect(self.photoPixelsReady)
+
     def dataLoaded(self):
         # Note - this function only runs once the data directory has been loaded
         self.setMouseTracking(True)
         color = QColor(255, 255, 255)
-        self.samplesSelected.clear()
+        self.setSelection(np.zeros(len(common.SamplingPattern), dtype=bool))
         self.samplePoints.clear()
         self.sampleAreaVisible.clear()
         self.samplePointsInFile.clear()
@@ -90,12 +126,32 @@ class ViewFisheye(QWidget):
             self.sampleAreaVisible.append([])
             color.setHsv(t, int(utility.normalize(p, 0, 90) * 127 + 128), 255)
             self.penSelected.append(QPen(color, 3, Qt.SolidLine))
+        self.setSunPosition(self.sunPosition)
 
+    @utility_timing.timed("setPhoto")
     def setPhoto(self, path, exif=None):
+        # drop pixels of previous photo still being loaded
+        self.myPhotoGeneration += 1
+        self.myPhotoPixelsPending = False
+        self.pixelsPool.clear()
+
         # if photo is valid
         if path is not None and os.path.exists(path):
             self.myPhotoPath = path
-            self.myPhoto = QImage(path)
+            self.myPhotoPixels = None
+            # decode for display at no more than screen resolution (JPEGs are scaled while decoding, which is much cheaper)
+            reader = QImageReader(path)
+            reader.setAutoTransform(False)
+            self.myPhotoSize = reader.size()
+            screen = QGuiApplication.primaryScreen()
+            if screen is not None and self.myPhotoSize.isValid():
+                limit = screen.size() * screen.devicePixelRatio()
+                if self.myPhotoSize.width() > limit.width() or self.myPhotoSize.height() > limit.height():
+                    reader.setScaledSize(self.myPhotoSize.scaled(limit, Qt.KeepAspectRatio))
+            with utility_timing.span("setPhoto.decode"):
+                self.myPhoto = reader.read()
+            if not self.myPhotoSize.isValid():
+                self.myPhotoSize = self.myPhoto.size()
             self.myPhotoSrcRect = QRect(0, 0, self.myPhoto.width(), self.myPhoto.height())
             self.myPhotoDestRect = QRect(0, 0, self.width(), self.height())
             self.rawAvailable = utility_data.isHDRRawAvailable(path)
@@ -106,27 +162,14 @@ class ViewFisheye(QWidget):
 
             # cache each sample's coordinate in the photo
             # note: technically doesn't need to be recalculated if all photos have same resolution!
-            self.samplePointsInFile = utility_data.computePointsInImage(path, common.SamplingPattern)
-
-            # keep a copy the image's pixels in memory (used later for exporting, etc.)
-            ptr = self.myPhoto.bits()
-            ptr.setsize(self.myPhoto.byteCount())
-            pixbgr = np.asarray(ptr).reshape(self.myPhoto.height(), self.myPhoto.width(), 4)
-            # HACKAROONIE: byte order is not the same as image format, so swapped it around :/
-            # TODO: should handle this better
-            self.myPhotoPixels = np.copy(pixbgr)
-            red = np.copy(self.myPhotoPixels[:, :, 0])
-            self.myPhotoPixels[:, :, 0] = self.myPhotoPixels[:, :, 2]
-            self.myPhotoPixels[:, :, 2] = red
-            # rgba = self.myPhoto.pixelColor(center[0], center[1])
-            # print((rgba.red(), rgba.green(), rgba.blue()))
-            # rgba = pixrgb[center[1], center[0]]
-            # print(rgba)
+            with utility_timing.span("setPhoto.points"):
+                self.samplePointsInFile = utility_data.computePointsInImage(path, common.SamplingPattern)
 
         # photo is null or missing
         else:
             self.myPhoto = QImage()
-            self.myPhotoPixels = np.zeros(shape=(1,1,4))
+            self.myPhotoSize = QSize()
+            self.myPhotoPixels = None
             self.myPhotoPath = ""
             self.myPhotoTime = datetime(1, 1, 1)
             self.myPhotoSrcRect = QRect()
@@ -134,13 +177,35 @@ class ViewFisheye(QWidget):
             self.rawAvailable = False
 
         # precompute as much as we can before any drawing
-        self.computeBounds()
+        with utility_timing.span("setPhoto.bounds"):
+            self.computeBounds()
+
+    def requestPhotoPixels(self):
+        # full resolution pixels are only decoded the first time they're needed (e.g. HUD pixel readout), in the background
+        if self.myPhotoPixels is not None or self.myPhotoPixelsPending or len(self.myPhotoPath) <= 0:
+            return
+        self.myPhotoPixelsPending = True
+        self.pixelsPool.start(PhotoPixelsTask(self.pixelsSignals, self.myPhotoGeneration, self.myPhotoPath))
 
-    def setSunPath(self, sunpath):
+    def photoPixelsReady(self, generation, pixels, error):
+        if generation != self.myPhotoGeneration:
+            return
+        if len(error) > 0:
+            self.parent.log(error)
+        self.myPhotoPixelsPending = False
+        self.myPhotoPixels = pixels
+        self.update()
+
+    def setSunPath(self, sunpath, suntimes=(None, None, None)):
         self.sunPathPoints = sunpath
+        # first point of every hour (on the hour if path has one), whatever the step between points
+        self.sunPathHours = [i for i, p in enumerate(sunpath) if (p[2].hour != sunpath[i-1][2].hour if i > 0 else p[2].minute == 0 and p[2].second == 0)]
+        self.sunTimes = suntimes
 
     def setSunPosition(self, pos):
         self.sunPosition = pos
+        # cache the angle between sun and every sample (used for circumsolar avoidance)
+        self.sampleSunAngles = utility_angles.CentralAngles(pos, common.SamplingPattern)
 
     def setSkycover(self, sc):
         self.skyCover = sc
@@ -154,27 +219,30 @@ class ViewFisheye(QWidget):
     def resetRotation(self, angles=0):
         self.myPhotoRotation = angles
 
+    def setSelection(self, mask):
+        self.samplesMask = mask
+        self.samplesSelected = np.flatnonzero(mask).tolist()  # sorted for easier searching later
+
     def selectSamples(self, message="none"):
         # nothing to do if no photo loaded
         if self.myPhoto.isNull():
             return
 
         # handle selection message
+        mask = np.copy(self.samplesMask)
         if message == "none":
-            self.samplesSelected.clear()
+            mask[:] = False
         elif message == "all":
-            self.samplesSelected[:] = [i for i in range(0, len(common.SamplingPattern))]
+            mask[:] = True
         elif message == "inverse":
-            allidx = set([i for i in range(0, len(common.SamplingPattern))])
-            selidx = set(self.samplesSelected)
-            self.samplesSelected[:] = list(allidx - selidx)
+            mask = np.logical_not(mask)
 
         # remove samples in circumsolar avoidance region if necessary
         sunAvoid = common.AppSettings["AvoidSunAngle"]
         if sunAvoid > 0:
             sunAvoidRads = math.radians(common.AppSettings["AvoidSunAngle"])
-            sunPosRads = (math.radians(self.sunPosition[0]), math.radians(self.sunPosition[1]))
-            self.samplesSelected[:] = [idx for idx in self.samplesSelected if utility_angles.CentralAngle(sunPosRads, common.SamplingPatternRads[idx], inRadians=True) > sunAvoidRads]
+            mask &= self.sampleSunAngles > sunAvoidRads
+        self.setSelection(mask)
 
         # update
         self.repaint()
@@ -209,6 +277,8 @@ class ViewFisheye(QWidget):
 
         # lastly, cache mouse coordinates and update
         self.coordsMouse = (event.x(), event.y())
+        if common.AppSettings["ShowHUD"]:
+            self.requestPhotoPixels()  # for pixel readout
         self.repaint()
 
     def mousePressEvent(self, event):
@@ -234,6 +304,8 @@ class ViewFisheye(QWidget):
 
         # detect primary mouse button release for stopping sample selection
         if event.button() == Qt.LeftButton:
+            self.parent.recordInteraction("select", start=self.normalizedPoint(self.dragSelectRect.x(), self.dragSelectRect.y()),
+                                          end=self.normalizedPoint(event.x(), event.y()), modifiers=int(event.modifiers()))
             # read modifier keys for user desired selection mode
             mode = ViewFisheye.SelectionMode.Select
             if event.modifiers() == Qt.ControlModifier:
@@ -285,86 +357,66 @@ class ViewFisheye(QWidget):
 
         self.parent.triggerContextMenu(self, event)
 
-    def computeSelectedSamples(self, type, mode):
-        px = 0
-        py = 0
-        x1 = 0
-        y1 = 0
-        x2 = 0
-        y2 = 0
+    def normalizedPoint(self, x, y):
+        # view point relative to photo circle (center is 0,0 and radius is 1), so it's independent of view size
+        radius = max(self.myPhotoRadius, 1)
+        return [(x - self.viewCenter[0]) / radius, (y - self.viewCenter[1]) / radius]
+
+    def viewPoint(self, normalized):
+        # inverse of normalizedPoint
+        return (int(self.viewCenter[0] + normalized[0] * self.myPhotoRadius), int(self.viewCenter[1] + normalized[1] * self.myPhotoRadius))
 
+    @utility_timing.timed("computeSelectedSamples")
+    def computeSelectedSamples(self, type, mode):
         # in select mode, clear current selection
+        mask = np.copy(self.samplesMask)
         if mode == ViewFisheye.SelectionMode.Select:
-            self.samplesSelected = []
+            mask[:] = False
+            self.setSelection(mask)
 
         # these are the samples we will be adding or removing
-        sampleAdjustments = []
+        sampleAdjustments = np.zeros(0, dtype=np.int64)
 
         # which single sample did user select by point
         if type == ViewFisheye.SelectionType.Exact:
             px = self.coordsMouse[0]
             py = self.coordsMouse[1]
-            for i in range(0, len(self.samplePoints)):
-                x, y = self.samplePoints[i]
-                x1 = x - ViewFisheye.SampleRadius
-                y1 = y - ViewFisheye.SampleRadius
-                x2 = x + ViewFisheye.SampleRadius
-                y2 = y + ViewFisheye.SampleRadius
-                if px >= x1 and px <= x2 and py >= y1 and py <= y2:
-                    sampleAdjustments.append(i)
-                    break
+            hits = self.sampleGrid.queryRect(px - ViewFisheye.SampleRadius, py - ViewFisheye.SampleRadius,
+                                             px + ViewFisheye.SampleRadius, py + ViewFisheye.SampleRadius)
+            sampleAdjustments = hits[:1]
         # which single sample is the closest to the mouse coordinate
         elif type == ViewFisheye.SelectionType.Closest:
             px = self.coordsMouse[0]
             py = self.coordsMouse[1]
             dist = math.sqrt((py-self.viewCenter[1])*(py-self.viewCenter[1]) + (px-self.viewCenter[0])*(px-self.viewCenter[0]))
             if dist <= self.myPhotoRadius:
-                close = math.inf
-                closest = -1
-                for i in range(0, len(self.samplePoints)):
-                    x, y = self.samplePoints[i]
-                    dist = math.sqrt((y-py)*(y-py) + (x-px)*(x-px))
-                    if dist < close:
-                        close = dist
-                        closest = i
+                closest, dist = self.sampleGrid.nearest(px, py)
                 if closest >= 0:
-                    sampleAdjustments.append(closest)
+                    sampleAdjustments = np.array([closest], dtype=np.int64)
         # which samples are in the drag selection rect
         elif type == ViewFisheye.SelectionType.Rect:
             x1 = self.dragSelectRect.x()
             y1 = self.dragSelectRect.y()
             x2 = self.dragSelectRect.x() + self.dragSelectRect.width()
             y2 = self.dragSelectRect.y() + self.dragSelectRect.height()
-            for i in range(0, len(self.samplePoints)):
-                x, y = self.samplePoints[i]
-                if x >= x1 and x <= x2 and y >= y1 and y <= y2:
-                    sampleAdjustments.append(i)
+            sampleAdjustments = self.sampleGrid.queryRect(x1, y1, x2, y2)
 
         # remove samples in circumsolar avoidance region
         sunAvoid = common.AppSettings["AvoidSunAngle"]
         if sunAvoid > 0:
             sunAvoidRads = math.radians(common.AppSettings["AvoidSunAngle"])
-            sunPosRads = (math.radians(self.sunPosition[0]), math.radians(self.sunPosition[1]))
-            sampleAdjustments[:] = [idx for idx in sampleAdjustments if utility_angles.CentralAngle(sunPosRads, common.SamplingPatternRads[idx], inRadians=True) > sunAvoidRads]
+            sampleAdjustments = sampleAdjustments[self.sampleSunAngles[sampleAdjustments] > sunAvoidRads]
 
         # no changes to be made
         if len(sampleAdjustments) <= 0:
             return
 
-        # finally modify sample selection and return difference
+        # finally modify sample selection
         if mode == ViewFisheye.SelectionMode.Select or mode == ViewFisheye.SelectionMode.Add:
-            for i in range(0, len(sampleAdjustments)):
-                if sampleAdjustments[i] not in self.samplesSelected:  # don't readd existing indices
-                    self.samplesSelected.append(sampleAdjustments[i])
+            mask[sampleAdjustments] = True
         elif mode == ViewFisheye.SelectionMode.Remove:
-            for i in range(0, len(sampleAdjustments)):
-                try:
-                    self.samplesSelected.remove(sampleAdjustments[i])
-                except:
-                    pass # ignore trying to remove indices that aren't currently selected
-
-        # sort selection for easier searching later
-        self.samplesSelected.sort()
+            mask[sampleAdjustments] = False  # ignores indices that aren't currently selected
+        self.setSelection(mask)
 
     def computeBounds(self):
         if self.myPhoto.isNull():
@@ -375,6 +427,7 @@ class ViewFisheye(QWidget):
             for i in range(0, len(common.SamplingPattern)):
                 self.samplePoints[i] = (0, 0)
                 self.sampleAreaVisible[i] = []
+            self.sampleGrid = utility_spatial.PointGrid([], 1)
             return
 
         # scale photo destination rect to fit photo on screen
@@ -422,6 +475,10 @@ class ViewFisheye(QWidget):
             p4 = QPoint(self.myPhotoTopLeft[0] + (p4[0] * self.myPhotoDiameter), self.myPhotoTopLeft[1] + (p4[1] * self.myPhotoDiameter))
             self.sampleAreaVisible[i] = [p1, p2, p3, p4]
 
+        # index on-screen sample points for hit-testing and selection
+        cellsize = self.myPhotoDiameter / max(1, int(math.sqrt(len(self.samplePoints))))
+        self.sampleGrid = utility_spatial.PointGrid(self.samplePoints, cellsize)
+
         # compute compass lines
         self.compassTicks.clear()
         tickLength = self.myPhotoRadius / 90
@@ -491,6 +548,7 @@ class ViewFisheye(QWidget):
         # compute new mask
         self.mask = QPixmap(self.width(), self.height()).toImage()
 
+    @utility_timing.timed("paintEvent")
     def paintEvent(self, event):
         super().paintEvent(event)
         painter = QPainter()
@@ -655,7 +713,7 @@ class ViewFisheye(QWidget):
                         self.pathSun.translate(1.0, 1.0)
                         painter.drawPath(self.pathSun)
                         self.pathSun.translate(-1.0, -1.0)
-                        for i in range(0, self.pathSun.elementCount()):
+                        for i in self.sunPathHours:
                             e = self.pathSun.elementAt(i)
                             destRect.setCoords(e.x, e.y + self.fontMetrics.height()/2 + 1, self.width(), self.height())
                             painter.drawText(destRect, Qt.AlignTop | Qt.AlignLeft, str(self.sunPathPoints[i][2].hour))
@@ -663,7 +721,7 @@ class ViewFisheye(QWidget):
                     painter.setPen(self.penSun)
                     painter.drawEllipse(QPoint(self.sunPositionVisible[0], self.sunPositionVisible[1]), sunradius, sunradius)
                     painter.drawPath(self.pathSun)
-                    for i in range(0, self.pathSun.elementCount()):
+                    for i in self.sunPathHours:
                         e = self.pathSun.elementAt(i)
                         destRect.setCoords(e.x, e.y + self.fontMetrics.height() / 2, self.width(), self.height())
                         painter.drawText(destRect, Qt.AlignTop | Qt.AlignLeft, str(self.sunPathPoints[i][2].hour))
@@ -696,6 +754,11 @@ class ViewFisheye(QWidget):
                 # draw sky cover assessment
                 destRect.setCoords(10, 25, self.width(), self.height())
                 painter.drawText(destRect, Qt.AlignTop | Qt.AlignLeft, self.skyCover.name + "/" + common.SkyCoverDesc[self.skyCover])
+                # draw sunrise, transit, sunset
+                if common.AppSettings["ShowSunPath"]:
+                    destRect.setCoords(10, 40, self.width(), self.height())
+                    times = [t.strftime("%H:%M:%S") if t is not None else "--:--:--" for t in self.sunTimes]
+                    painter.drawText(destRect, Qt.AlignTop | Qt.AlignLeft, "Sun: " + times[0] + " / " + times[1] + " / " + times[2])
                 # draw photo rotation
                 if self.myPhotoRotation != 0:
                     destRect.setCoords(10, self.height()-25, self.width(), self.height())
@@ -724,8 +787,8 @@ class ViewFisheye(QWidget):
                 if distance < self.myPhotoRadius:
                     coordsxy = (self.coordsMouse[0] - self.myPhotoDestRect.x(),
                                 self.coordsMouse[1] - self.myPhotoDestRect.y())
-                    coordsXY = (int(coordsxy[0] / self.myPhotoDestRect.width() * self.myPhoto.width()),
-                                int(coordsxy[1] / self.myPhotoDestRect.height() * self.myPhoto.height()))
+                    coordsXY = (int(coordsxy[0] / self.myPhotoDestRect.width() * self.myPhotoSize.width()),
+                                int(coordsxy[1] / self.myPhotoDestRect.height() * self.myPhotoSize.height()))
                     coordsUV = ((self.coordsMouse[0] - self.myPhotoTopLeft[0]) / self.myPhotoDiameter,
                                 (self.coordsMouse[1] - self.myPhotoTopLeft[1]) / self.myPhotoDiameter)
                     coordsTP = utility_angles.FisheyeUV2SkyCoord(coordsUV[0], coordsUV[1])
@@ -740,18 +803,21 @@ class ViewFisheye(QWidget):
                 colorsRegion = np.zeros((pixreg, pixreg, 4))
                 colorFinal = colorsRegion[0,0]  # RGBA of pixel under mouse of photo on disk
                 # colorFinal = self.myPhoto.pixelColor(coordsXY[0], coordsXY[1])
-                if distance < self.myPhotoRadius:
+                if distance < self.myPhotoRadius and self.myPhotoPixels is None:
+                    textPX = "... px"  # still loading (see requestPhotoPixels)
+                elif distance < self.myPhotoRadius:
+                    pixels = self.myPhotoPixels
                     halfdim = int(pixreg / 2)
                     rstart = coordsXY[1]-halfdim
                     rstop = coordsXY[1]+halfdim+1
                     cstart = coordsXY[0]-halfdim
                     cstop = coordsXY[0]+halfdim+1
-                    if (rstart >= 0 and rstop<=self.myPhotoPixels.shape[0] and
-                        cstart >= 0 and cstop<=self.myPhotoPixels.shape[1]):
-                        colorsRegion = self.myPhotoPixels[rstart:rstop, cstart:cstop]
+                    if (rstart >= 0 and rstop<=pixels.shape[0] and
+                        cstart >= 0 and cstop<=pixels.shape[1]):
+                        colorsRegion = pixels[rstart:rstop, cstart:cstop]
                         colorFinal = colorsRegion[halfdim, halfdim]
                         if pixreg > 1:  # with pixel weighting
-                            colorFinal = utility_data.collectPixels([coordsXY], [pixreg], pixels=self.myPhotoPixels, weighting=common.PixelWeighting(common.AppSettings["PixelWeighting"]))[0]
+                            colorFinal = utility_data.collectPixels([coordsXY], [pixreg], pixels=pixels, weighting=common.PixelWeighting(common.AppSettings["PixelWeighting"]))[0]
                     textPX = str(colorFinal[0]) + " " + str(colorFinal[1]) + " " + str(colorFinal[2]) + " px"
 
                 # draw HUD text strings
@@ -812,5 +878,13 @@ class ViewFisheye(QWidget):
                 #                        pixelY + ViewFisheye.SelectedPixelBox / 2,
                 #                        self.iconWarning)
 
+        # timings panel
+        if common.AppSettings["ShowTimings"]:
+            painter.setPen(self.penText)
+            painter.setFont(self.fontFixed)
+            painter.setBackgroundMode(Qt.TransparentMode)
+            destRect = QRect(0, 10, self.width() - 10, self.height())
+            painter.drawText(destRect, Qt.AlignTop | Qt.AlignRight, "\n".join(utility_timing.report()))
+
         # end draw
         painter.end()
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# ====================================================================
+# @author: Joe Del Rocco
+# @since: 10/19/2026
+# @summary: A widget for displaying a strip of thumbnails, one per capture of the selected date
+# ====================================================================
+import os
+from PyQt5.QtCore import Qt, QSize, QObject, QRunnable, QThread, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QListView, QAbstractItemView
+import common
+import utility
+import utility_data
+
+
+class ThumbnailSignals(QObject):
+    # generation, capture index, thumbnail path (empty if failed)
+    done = pyqtSignal(int, int, str)
+    # error message
+    failed = pyqtSignal(str)
+
+
+class ThumbnailTask(QRunnable):
+
+    def __init__(self, signals, generation, index, capturedir, exposure, size):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.index = index
+        self.capturedir = capturedir
+        self.exposure = exposure
+        self.size = size
+
+    def run(self):
+        thumb = ""
+        try:
+            photos = utility.findFiles(self.capturedir, mode=1, ext=["jpg"])
+            if self.exposure < len(photos):
+                path = utility_data.thumbnailPath(common.AppSettings["DataDirectory"], photos[self.exposure])
+                if utility_data.makeThumbnail(photos[self.exposure], path, self.size):
+                    thumb = path
+        except Exception as ex:
+            self.signals.failed.emit("Error: Thumbnail failed for " + self.capturedir + ": " + str(ex))
+        self.signals.done.emit(self.generation, self.index, thumb)
+
+
+class ViewTimeline(QListWidget):
+
+    ThumbSize = 96  # pixels, width and height
+
+    def __init__(self, parent):
+        super().__init__()
+
+        # members
+        self.parent = parent
+        self.generation = 0  # incremented every time captures change, so stale thumbnails are ignored
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, QThread.idealThreadCount() - 1))
+        self.signals = ThumbnailSignals()
+        self.signals.done.connect(self.thumbnailReady)
+        self.signals.failed.connect(self.parent.log)
+
+        # horizontal strip of icons
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setIconSize(QSize(ViewTimeline.ThumbSize, ViewTimeline.ThumbSize))
+        self.setFixedHeight(ViewTimeline.ThumbSize + self.fontMetrics().height() + 30)
+        self.itemClicked.connect(lambda item: self.parent.timelineSelected(self.row(item)))
+
+    def setCaptures(self, capturedirs, exposure):
+        # drop any thumbnails still being generated for previous captures
+        self.generation += 1
+        self.pool.clear()
+        self.clear()
+
+        # one item per capture, thumbnails are filled in as they are generated in the background
+        for i, dir in enumerate(capturedirs):
+            item = QListWidgetItem(os.path.basename(dir))
+            item.setTextAlignment(Qt.AlignHCenter | Qt.AlignBottom)
+            self.addItem(item)
+            if exposure >= 0:
+                self.pool.start(ThumbnailTask(self.signals, self.generation, i, dir, exposure, ViewTimeline.ThumbSize))
+
+    def setCurrentCapture(self, index):
+        if index < 0 or index >= self.count():
+            return
+        self.setCurrentRow(index)
+        self.scrollToItem(self.item(index), QAbstractItemView.PositionAtCenter)
+
+    def thumbnailReady(self, generation, index, thumb):
+        if generation != self.generation or index >= self.count() or len(thumb) <= 0:
+            return
+        self.item(index).setIcon(QIcon(thumb))